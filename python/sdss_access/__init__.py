@@ -3,8 +3,8 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 import os
-from sdsstools import get_config, get_logger, get_package_version
-from tree import Tree
+import threading
+from importlib import import_module
 
 
 # check if posix-based operating system
@@ -13,21 +13,64 @@ is_posix = (os.name == "posix")
 
 NAME = 'sdss_access'
 
-# init the logger
-log = get_logger(NAME)
+# The logger, tree, config and all classes are loaded lazily, on first access, so that
+# importing sdss_access does not plant the tree or import the sync and http packages.
 
-# set up the TREE, but match the TREE_VER if it is already there
-config = os.environ.get('TREE_VER', 'sdsswork')
-tree = Tree(config=config)
-log.debug("SDSS_ACCESS> Using {0}".format(tree))
+# the module defining each lazily imported class
+_lazy_imports = {'Path': 'sdss_access.path', 'AccessError': 'sdss_access.path',
+                 'HttpAccess': 'sdss_access.sync', 'Access': 'sdss_access.sync',
+                 'BaseAccess': 'sdss_access.sync', 'RsyncAccess': 'sdss_access.sync',
+                 'CurlAccess': 'sdss_access.sync', 'AsyncHttpAccess': 'sdss_access.sync'}
 
+_lazy_lock = threading.RLock()
 
-# Loads config
-config = get_config(NAME)
 
+def _load_log():
+    ''' init the logger '''
+    from sdsstools import get_logger
+    return get_logger(NAME)
 
-__version__ = get_package_version(path=__file__, package_name=NAME)
 
+def _load_tree():
+    ''' set up the TREE, but match the TREE_VER if it is already there '''
+    from tree import Tree
+    config = os.environ.get('TREE_VER', 'sdsswork')
+    tree = Tree(config=config)
+    __getattr__('log').debug("SDSS_ACCESS> Using {0}".format(tree))
+    return tree
 
-from .path import Path, AccessError
-from .sync import HttpAccess, Access, BaseAccess, RsyncAccess, CurlAccess
+
+def _load_config():
+    ''' Loads config '''
+    from sdsstools import get_config
+    return get_config(NAME)
+
+
+def _load_version():
+    ''' Loads the package version '''
+    from sdsstools import get_package_version
+    return get_package_version(path=__file__, package_name=NAME)
+
+
+_lazy_loaders = {'log': _load_log, 'tree': _load_tree, 'config': _load_config,
+                 '__version__': _load_version}
+
+
+def __getattr__(name):
+    ''' Loads the lazy module attributes on first access '''
+    if name not in _lazy_loaders and name not in _lazy_imports:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+    with _lazy_lock:
+        if name in globals():
+            return globals()[name]
+        if name in _lazy_loaders:
+            value = _lazy_loaders[name]()
+        else:
+            value = getattr(import_module(_lazy_imports[name]), name)
+        globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_loaders) | set(_lazy_imports))
@@ -0,0 +1,252 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: cache.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from fnmatch import filter as fnfilter
+from glob import glob, has_magic
+
+"""
+Module for in-process caches used by sdss_access paths.
+
+Provides a generic bounded `LRUCache`, with an optional time-to-live on each entry and
+hit/miss counters, and a `DirectoryCache` of directory listings, used to resolve file
+existence, compression suffixes and wildcards without repeatedly querying the filesystem,
+and a `PathCache` of resolved paths.
+"""
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+CacheInfo.__doc__ = ''' Statistics of a cache, in the style of functools.lru_cache '''
+
+_missing = object()
+
+
+class LRUCache(object):
+    """ A bounded least-recently-used cache, with an optional time-to-live
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of entries to hold.  The least recently used entries are evicted
+        first.  If None, the cache is unbounded.
+    ttl : float
+        The number of seconds an entry remains valid.  If None, entries never expire.
+    timer : callable
+        The clock used to expire entries.  Default is `time.monotonic`.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups found in the cache
+    misses : int
+        The number of lookups not found in the cache, or found expired
+    """
+
+    def __init__(self, maxsize=128, ttl=None, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return '<{0}(maxsize={1}, ttl={2}, currsize={3}, hits={4}, misses={5})>'.format(
+            type(self).__name__, self.maxsize, self.ttl, len(self), self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            item = self._data.get(key, _missing)
+            return item is not _missing and not self._expired(item)
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def _expired(self, item):
+        ''' Check if a cache entry has expired '''
+        return item[1] is not None and self._timer() >= item[1]
+
+    def get(self, key, default=None):
+        ''' Get a value from the cache, counting the hit or miss
+
+        Parameters:
+            key (hashable):
+                The cache key
+            default (object):
+                The value to return if the key is not cached or has expired
+
+        Returns:
+            The cached value, or the default
+        '''
+        with self._lock:
+            item = self._data.get(key, _missing)
+            if item is _missing or self._expired(item):
+                if item is not _missing:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        ''' Set a value in the cache, evicting the least recently used entries if full
+
+        Parameters:
+            key (hashable):
+                The cache key
+            value (object):
+                The value to cache
+        '''
+        expires = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, func):
+        ''' Get a value from the cache, or compute and cache it with a function
+
+        Parameters:
+            key (hashable):
+                The cache key
+            func (callable):
+                A function of no arguments returning the value to cache on a miss
+
+        Returns:
+            The cached or computed value
+        '''
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = func()
+            self.set(key, value)
+        return value
+
+    def pop(self, key, default=None):
+        ''' Remove a key from the cache, returning its value or the default '''
+        with self._lock:
+            item = self._data.pop(key, _missing)
+        return default if item is _missing else item[0]
+
+    def clear(self):
+        ''' Clear all entries and reset the hit/miss counters '''
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self):
+        ''' Return the cache statistics as a `CacheInfo` '''
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+
+def list_dir(dirname):
+    ''' List a directory with a single os.scandir call
+
+    Parameters:
+        dirname (str):
+            The directory to list
+
+    Returns:
+        A tuple of the sorted names in the directory, and a dictionary of whether each
+        name is a file.  A missing or unreadable directory is listed as empty.
+    '''
+    try:
+        with os.scandir(dirname) as entries:
+            isfile = {entry.name: entry.is_file() for entry in entries}
+    except OSError:
+        isfile = {}
+    return sorted(isfile), isfile
+
+
+class DirectoryCache(LRUCache):
+    """ A bounded cache of directory listings
+
+    Each directory is listed once with `os.scandir`, and the listing is reused to check
+    for files, compression suffixes, and wildcard matches within the directory until it
+    is evicted or expires.  Files created after a directory is listed are not seen until
+    then; use a ``ttl``, or `clear`, when files are being written concurrently.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of directory listings to hold.  Default is 1024.
+    ttl : float
+        The number of seconds a listing remains valid.  If None, listings never expire.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        super(DirectoryCache, self).__init__(maxsize=maxsize, ttl=ttl, timer=timer)
+
+    def listing(self, dirname):
+        ''' Get the listing of a directory, as returned by `list_dir` '''
+        return self.get_or_set(dirname or os.curdir, lambda: list_dir(dirname or os.curdir))
+
+    def isfile(self, path):
+        ''' Check if a path is a file, as with os.path.isfile '''
+        dirname, name = os.path.split(path)
+        return bool(name and self.listing(dirname)[1].get(name))
+
+    def glob(self, pattern):
+        ''' Expand a wildcard pattern, as with glob.glob
+
+        Patterns with wildcards only in the file name are matched against the cached
+        listing of their directory.  Any others are passed to glob.glob.
+
+        Parameters:
+            pattern (str):
+                The wildcard pattern to expand
+
+        Returns:
+            A list of the matching paths
+        '''
+        dirname, name = os.path.split(pattern)
+        if not name or has_magic(dirname):
+            return glob(pattern)
+
+        names, isfile = self.listing(dirname)
+        if not has_magic(name):
+            return [pattern] if name in isfile else []
+        if not name.startswith('.'):
+            names = [n for n in names if not n.startswith('.')]
+        return [os.path.join(dirname, n) for n in fnfilter(names, name)]
+
+
+class PathCache(LRUCache):
+    """ A bounded cache of resolved paths
+
+    Memoizes the paths resolved by `.BasePath.full` and `.BasePath.resolve`, keyed on the
+    release, path template and keyword arguments, with integer keyword values keyed by their
+    string form.  Paths are cached before any check for a compressed version of the file,
+    so the filesystem is still checked on each call unless the path is ``pure``.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of resolved paths to hold.  Default is 4096.
+    ttl : float
+        The number of seconds a resolved path remains valid.  If None, paths never expire.
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, timer=time.monotonic):
+        super(PathCache, self).__init__(maxsize=maxsize, ttl=ttl, timer=timer)
@@ -0,0 +1,196 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: classifier.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+from collections import namedtuple
+
+"""
+Module for identifying the path name of arbitrary SAS filepaths.
+
+Indexes the compiled extractors of all path templates in a trie over the literal
+directory prefixes of their expanded templates.  A filepath is classified by walking
+down the trie along its directories, and only matching the templates found along the
+way, rather than matching every template of the release.
+"""
+
+Classification = namedtuple('Classification', ['name', 'kwargs'])
+Classification.__doc__ = ''' A path name matching a filepath
+
+Parameters:
+    name (str):
+        The path name of the matching template
+    kwargs (dict):
+        The keyword values extracted from the filepath
+'''
+
+# characters ending the literal prefix of an expanded template
+_nonliteral = re.compile(r'[{(*?\[$]')
+
+# matches the keyword fields of a template
+_fields = re.compile(r'{.*?}')
+
+
+class _Node(object):
+    ''' A node in the template trie, with the templates ending at this directory '''
+
+    __slots__ = ('children', 'extractors')
+
+    def __init__(self):
+        self.children = {}
+        self.extractors = []
+
+
+class PathClassifier(object):
+    """ An index of path templates for classifying filepaths
+
+    Parameters
+    ----------
+    extractors : iterable
+        Tuples of the `.CompiledExtractor` of each path template to index, and the
+        expanded template it was compiled from
+    """
+
+    def __init__(self, extractors=()):
+        self._root = _Node()
+        self._literals = {}
+        self.size = 0
+        for extractor, template in extractors:
+            self.add(extractor, template)
+
+    def __repr__(self):
+        return '<PathClassifier(n_templates={0})>'.format(self.size)
+
+    @staticmethod
+    def _split(path):
+        ''' Split a path into its directory segments '''
+        return path.split(os.sep)[:-1]
+
+    def add(self, extractor, template):
+        ''' Add a compiled template extractor to the index
+
+        The template is placed in the trie at the deepest directory of its literal
+        prefix, i.e. the part of the expanded template before any keywords.  Templates
+        with more literal text are considered more specific.
+
+        Parameters:
+            extractor (CompiledExtractor):
+                The extractor of the path template
+            template (str):
+                The expanded template the extractor was compiled from
+        '''
+        match = _nonliteral.search(template)
+        prefix = template[:match.start()] if match else template
+        node = self._root
+        for segment in self._split(prefix):
+            node = node.children.setdefault(segment, _Node())
+
+        # rank templates by the length of their literal text
+        specificity = len(_fields.sub('', template))
+        node.extractors.append((specificity, extractor))
+        self.size += 1
+
+    def add_literal(self, name, template):
+        ''' Add a path template without any keywords to the index
+
+        Parameters:
+            name (str):
+                The path name of the template
+            template (str):
+                The expanded template
+        '''
+        self._literals.setdefault(template, []).append(name)
+        self.size += 1
+
+    def candidates(self, dirname):
+        ''' Find the templates that may match any file in a directory
+
+        Parameters:
+            dirname (str):
+                The directory of the filepaths
+
+        Returns:
+            A list of the candidate extractors, most specific first
+        '''
+        found = list(self._root.extractors)
+        node = self._root
+        for segment in self._split(dirname + os.sep):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            found.extend(node.extractors)
+        found.sort(key=lambda x: -x[0])
+        return [extractor for __, extractor in found]
+
+    @staticmethod
+    def match(extractors, path, literals=()):
+        ''' Match a filepath against a list of candidate extractors
+
+        Parameters:
+            extractors (list):
+                The candidate extractors
+            path (str):
+                The filepath, with any compression suffix removed
+            literals (list):
+                The names of any templates without keywords equal to the filepath
+
+        Returns:
+            A list of the matching `Classification`, ranked by the number of characters of
+            the filepath matched by the literal text of their template, rather than by any
+            keywords
+        '''
+        ranked = [(len(path), Classification(name, {})) for name in literals]
+        for extractor in extractors:
+            found = extractor.pattern.match(path)
+            if not found:
+                continue
+            try:
+                kwargs = extractor.parse(found.groups(0))
+            except (ValueError, AttributeError, IndexError, AssertionError):
+                continue
+            literal = len(path) - sum(len(value) for value in found.groups('') if value)
+            ranked.append((literal, Classification(extractor.name, kwargs)))
+        ranked.sort(key=lambda x: -x[0])
+        return [match for __, match in ranked]
+
+    def classify(self, path):
+        ''' Classify a filepath
+
+        Parameters:
+            path (str):
+                The filepath, with any compression suffix removed
+
+        Returns:
+            A list of the matching `Classification`, most specific first
+        '''
+        return self.classify_many([path])[0]
+
+    def classify_many(self, paths):
+        ''' Classify many filepaths
+
+        As `classify`, but looks up the candidate templates only once per directory,
+        e.g. for the files of a whole directory walk.
+
+        Parameters:
+            paths (iterable):
+                The filepaths, with any compression suffix removed
+
+        Returns:
+            A list of the matching `Classification` of each filepath
+        '''
+        candidates = {}
+        results = []
+        for path in paths:
+            dirname = os.path.dirname(path)
+            if dirname not in candidates:
+                candidates[dirname] = self.candidates(dirname)
+            results.append(self.match(candidates[dirname], path,
+                                      literals=self._literals.get(path, ())))
+        return results
@@ -0,0 +1,321 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: compiled.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+from string import Formatter
+
+"""
+Module for precompiling sdss_access path templates.
+
+A path template is compiled once per release into a `CompiledTemplate`, with its
+environment variables expanded, its special functions bound, and its format fields
+parsed into a single format string.  Resolving a compiled template is then a single
+``str.format`` call plus any special function calls.
+"""
+
+_formatter = Formatter()
+
+# matches environment variables, as in os.path.expandvars
+_envvar_regex = re.compile(r'\$(\w+|\{[^}]*\})', re.ASCII)
+
+
+def expand_envvars(template, environ=None):
+    ''' Expand the environment variables in a string
+
+    Behaves like `os.path.expandvars`, leaving any undefined variables unchanged, but
+    can read the variables from any given environment mapping.
+
+    Parameters:
+        template (str):
+            The string to expand
+        environ (dict):
+            The environment variables to expand.  Defaults to os.environ.
+
+    Returns:
+        The string with expanded environment variables
+    '''
+    if environ is None:
+        return os.path.expandvars(template)
+    if '$' not in template:
+        return template
+
+    def replace(match):
+        name = match.group(1)
+        if name.startswith('{'):
+            name = name[1:-1]
+        return environ.get(name, match.group(0))
+
+    return _envvar_regex.sub(replace, template)
+
+
+class CompiledTemplate(object):
+    """ A path template precompiled into a fast resolver
+
+    Parameters
+    ----------
+    name : str
+        The path name of the template
+    template : str
+        The raw path template, as defined in the tree
+    format_string : str
+        The template with expanded environment variables, and each special function
+        replaced by a positional format field
+    specials : tuple
+        The special function objects, in positional field order
+    keys : frozenset
+        The keyword arguments required to resolve the template
+    """
+
+    __slots__ = ('name', 'template', 'format_string', 'specials', 'keys')
+
+    def __init__(self, name, template, format_string, specials, keys):
+        self.name = name
+        self.template = template
+        self.format_string = format_string
+        self.specials = specials
+        self.keys = keys
+
+    def __repr__(self):
+        return '<CompiledTemplate(name="{0}", specials={1})>'.format(
+            self.name, [s.__name__ for s in self.specials])
+
+    def resolve(self, path, filetype, kwargs):
+        ''' Resolve the template into a path string
+
+        Formats the template keywords and calls any special functions.  This does
+        not normalize the path or check for compression.
+
+        Parameters:
+            path (BasePath):
+                The path instance used to call any special functions
+            filetype (str):
+                The template name passed into the special functions
+            kwargs (dict):
+                The path template keyword arguments
+
+        Returns:
+            The resolved path string
+        '''
+        if self.specials:
+            values = [special(path, filetype, **kwargs) for special in self.specials]
+            return self.format_string.format(*values, **kwargs)
+        return self.format_string.format(**kwargs)
+
+
+def compile_template(name, template, cls, keys, expandvars, special_pattern, environ=None):
+    ''' Compile a path template
+
+    Parses the template once into literal text and format fields.  Environment variables
+    in the literal text are expanded, and any special functions, e.g. ``@platedir|``,
+    are looked up on the path class and replaced with positional format fields.
+
+    Parameters:
+        name (str):
+            The path name of the template
+        template (str):
+            The raw path template
+        cls (type):
+            The path class on which to look up special functions
+        keys (list):
+            The keyword arguments required by the template
+        expandvars (callable):
+            The function used to expand environment variables in the template
+        special_pattern (str):
+            The regex pattern matching special function names
+        environ (dict):
+            The environment variables to expand.  Defaults to os.environ.
+
+    Returns:
+        A `CompiledTemplate`, or None if the template cannot be compiled, in which
+        case the template should be resolved the uncompiled way.
+    '''
+    try:
+        parsed = list(_formatter.parse(template))
+    except ValueError:
+        return None
+
+    special_regex = re.compile(special_pattern)
+    specials = []
+    parts = []
+    for index, (literal, field, spec, conversion) in enumerate(parsed):
+        # expand any environment variables; recursion only applies to the leading part
+        literal = expandvars(literal) if index == 0 else expand_envvars(literal, environ)
+        literal = literal.replace('{', '{{').replace('}', '}}')
+
+        # swap special functions for positional fields
+        pos = 0
+        for match in special_regex.finditer(literal):
+            method = getattr(cls, match.group(0)[1:-1], None)
+            if not callable(method):
+                return None
+            parts.append(literal[pos:match.start()])
+            parts.append('{{{0}}}'.format(len(specials)))
+            specials.append(method)
+            pos = match.end()
+        parts.append(literal[pos:])
+
+        if field is None:
+            continue
+
+        # positional or nested fields are left to the uncompiled formatting
+        if not field or field[0].isdigit() or '{' in (spec or ''):
+            return None
+
+        parts.append('{' + field + ('!' + conversion if conversion else '') +
+                     (':' + spec if spec else '') + '}')
+
+    return CompiledTemplate(name, template, ''.join(parts), tuple(specials), frozenset(keys))
+
+
+# keys computed by special functions, which are not extracted
+_suppressed_keys = ('sptypefolder', 'fieldgrp', 'spcoaddfolder', 'spcoaddgrp')
+
+# matches a whole directory of a template computed by a special function
+_suppressed_dirs = re.compile('/({{(?:{0})}})/'.format('|'.join(_suppressed_keys)))
+
+
+class CompiledExtractor(object):
+    """ A path template precompiled into a reverse parser
+
+    Parameters
+    ----------
+    name : str
+        The path name of the template
+    template : str
+        The raw path template, as defined in the tree
+    pattern : re.Pattern
+        The compiled regex matching a path, with a group per template keyword
+    groups : tuple
+        The template keyword names matched by each regex group
+    """
+
+    __slots__ = ('name', 'template', 'pattern', 'groups')
+
+    def __init__(self, name, template, pattern, groups):
+        self.name = name
+        self.template = template
+        self.pattern = pattern
+        self.groups = groups
+
+    def __repr__(self):
+        return '<CompiledExtractor(name="{0}", pattern="{1}")>'.format(self.name,
+                                                                       self.pattern.pattern)
+
+    def extract(self, example):
+        ''' Extract the keyword values from an example path
+
+        Parameters:
+            example (str):
+                The full path, with any compression suffix removed
+
+        Returns:
+            A dictionary of path keyword values, or an empty dictionary if the path does
+            not match the template
+        '''
+        match = self.pattern.search(example)
+        if not match:
+            return {}
+        return self.parse(match.groups(0))
+
+    def parse(self, values):
+        ''' Parse the regex group values of a matched path into keyword values '''
+        assert len(self.groups) == len(values), \
+            'pattern and template matches must have same length'
+        path_dict = {}
+        for keys, value in zip(self.groups, values):
+            if not keys:
+                continue
+            # handle double bracket edge cases; remove this when better solution found
+            if len(keys) > 1:
+                if keys[0] == 'dr':
+                    # for {dr}{version}
+                    drval = re.match('^DR[1-9][0-9]', value).group(0)
+                    otherval = value.split(drval)[-1]
+                    pdict = {keys[0]: drval, keys[1]: otherval}
+                elif keys == ('fieldid', 'isplate'):
+                    # for {fieldid}{isplate} as isplate is calculated automatically
+                    if value.endswith('p') and value[:-1].isdigit():
+                        value = value[:-1]
+                    pdict = {keys[0]: value}
+                elif keys == ('run2d', 'epochflag'):
+                    # for {run2d}{epochflag} as epochflag is calculated automatically
+                    pdict = {keys[0]: value.replace('-epoch', '')}
+                elif keys == ('coadd', 'obs'):
+                    value = value.split('_')
+                    if len(value) == 1:
+                        value.append('')
+                    pdict = {keys[0]: value[0], keys[1]: value[1]}
+                elif keys[0] in ['rc', 'br', 'filter', 'camrow']:
+                    # for {camrow}{camcol}, {filter}{camcol}, {br}{id}, etc
+                    pdict = {keys[0]: value[0], keys[1]: value[1:]}
+                else:
+                    raise ValueError('This case has not yet been accounted for.')
+                path_dict.update(pdict)
+            elif self.name.startswith('mos_target') and keys[0] == 'num':
+                # The num parameter in mos_target paths will be a zero-padded
+                # suffix like "-010". Strip expected prefixes and convert the
+                # remaining numeric suffix to an integer when present.
+                cleaned = value.lstrip('-_')
+                if cleaned:
+                    path_dict[keys[0]] = int(cleaned)
+            elif keys[0] in _suppressed_keys:
+                # supress the keys since they are automatically calculated
+                continue
+            else:
+                path_dict[keys[0]] = value
+        return path_dict
+
+
+def compile_extractor(name, template, raw_template=None, special_pattern=None):
+    ''' Compile a path template into a reverse parser for extracting keywords
+
+    Builds the regex used to match example paths, replacing each template keyword with a
+    regex group, and records which keywords each group captures.  This is done once per
+    template, rather than on every extraction.
+
+    Parameters:
+        name (str):
+            The path name of the template
+        template (str):
+            The template with any special functions replaced, environment variables
+            expanded, and compression suffix removed
+        raw_template (str):
+            The raw path template, as defined in the tree
+        special_pattern (str):
+            The regex pattern matching special function names
+
+    Returns:
+        A `CompiledExtractor`, or None if the template has no keywords, or has special
+        functions without an extraction template, as the keywords cannot be extracted
+    '''
+    # check if template has any brackets
+    if not re.search('[{}]', template):
+        return None
+
+    # special functions left in the template cannot be matched against a path
+    if special_pattern and re.search(special_pattern, template):
+        return None
+
+    # escape the envvar $ and any dots (use re in case of @platedir sub)
+    subtemp = template.replace('$', '\\$')
+    subtemp = re.sub(r'[.](?!\*)', '\\.', subtemp)
+    # directories computed by special functions may be empty, and so dropped from the path
+    subtemp = _suppressed_dirs.sub(r'/(?:\1/)?', subtemp)
+    # define search pattern; replace all template keywords with regex "(.*)" group
+    research = re.sub('{(.*?)}', '(.*?)', subtemp)
+    research += '$'  # mark the end of a search string (captures cases when {} at end of string)
+    pattern = re.compile(research)
+
+    # match the template to find the keywords in each group
+    pmatch = pattern.search(template)
+    groups = tuple(tuple(k.split(':')[0] for k in re.findall('{(.*?)}', part))
+                   if isinstance(part, str) else () for part in pmatch.groups(0)) if pmatch else ()
+    return CompiledExtractor(name, raw_template or template, pattern, groups)
@@ -0,0 +1,102 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: parallel.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Module for resolving sdss_access paths over a pool of processes.
+
+`map_paths` sends the compact state of a `.Path`, from `.Path.get_state`, holding its
+release, templates, compiled templates and release environment variables, once to each
+worker, where the path is rebuilt with `.Path.from_state` without replanting the tree.
+The paths are then resolved in chunks of keyword arguments.
+"""
+
+# the path of each worker process, set by the pool initializer
+_worker_path = None
+
+
+def _init_worker(cls, state):
+    ''' Set the path used by a worker process, from its class and compact state '''
+    global _worker_path
+    _worker_path = cls.from_state(state)
+
+
+def _resolve_chunk(method, filetype, rows, state=None):
+    ''' Resolve a chunk of paths in a worker process
+
+    Parameters:
+        method (str):
+            The path method to call, e.g. "full" or "url"
+        filetype (str):
+            The path name of the template
+        rows (list):
+            The keyword arguments of each path
+        state (tuple):
+            The class and compact state of the path to resolve with.  Defaults to the path
+            set for the worker.
+
+    Returns:
+        The list of resolved paths
+    '''
+    path = _worker_path if state is None else state[0].from_state(state[1])
+    func = getattr(path, method)
+    return [func(filetype, **row) for row in rows]
+
+
+def map_paths(path, filetype, rows, method='full', chunksize=1000, max_workers=None,
+              executor=None):
+    ''' Resolve paths over a pool of processes
+
+    Splits the keyword arguments into chunks, resolved in parallel by the workers of a
+    `~concurrent.futures.ProcessPoolExecutor`.  Only worthwhile for many paths, or paths
+    checked against the filesystem, as each chunk is pickled to and from the workers.
+
+    Parameters:
+        path (BasePath):
+            The path to resolve with
+        filetype (str):
+            The path name of the template
+        rows (iterable):
+            The keyword arguments of each path, as dictionaries
+        method (str):
+            The path method to call, e.g. "full", "url" or "location".  Default is "full".
+        chunksize (int):
+            The number of paths resolved per task.  Default is 1000.
+        max_workers (int):
+            The number of worker processes.  Defaults to the number of CPUs.
+        executor (Executor):
+            An existing executor to submit the chunks to, e.g. a Dask client executor.  The
+            path state is then sent with each chunk, rather than once to each worker.
+
+    Returns:
+        The list of resolved paths, in the order of the keyword arguments
+
+    Example:
+        >>> from sdss_access.path import Path
+        >>> from sdss_access.path.parallel import map_paths
+        >>> path = Path(release='dr17')
+        >>> rows = [dict(drpver='v3_1_1', plate=8485, ifu=ifu, wave='LOG') for ifu in ifus]
+        >>> cubes = map_paths(path, 'mangacube', rows)
+    '''
+    rows = list(rows)
+    chunks = [rows[i:i + chunksize] for i in range(0, len(rows), chunksize)]
+
+    state = (type(path), path.get_state())
+    if executor is not None:
+        func = functools.partial(_resolve_chunk, method, filetype, state=state)
+        results = executor.map(func, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=state) as pool:
+            results = list(pool.map(functools.partial(_resolve_chunk, method, filetype), chunks))
+
+    return [full for chunk in results for full in chunk]
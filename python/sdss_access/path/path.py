@@ -2,17 +2,27 @@ from __future__ import division, print_function
 
 import os
 import re
-import requests
 import ast
 import inspect
 import six
 import datetime
-from glob import glob
+from collections import namedtuple
+import fnmatch
+import threading
+import functools
+from types import MappingProxyType
+from bisect import bisect_left
+from glob import glob, has_magic
 from os.path import join, sep
-from random import choice, sample
+import random as _random
 from tree import Tree
 from sdss_access import tree, log, config
 from sdss_access import is_posix
+from sdss_access.path.compiled import (compile_template, compile_extractor, expand_envvars,
+                                       _envvar_regex)
+from sdss_access.path import vectorized
+from sdss_access.path.cache import DirectoryCache, PathCache, list_dir
+from sdss_access.path.classifier import PathClassifier
 from typing import Union
 
 pathlib = None
@@ -39,6 +49,283 @@ Depends on the tree product. In particular requires path templates in:
   $TREE_DIR/data/sdss_paths.ini
 """
 
+# incremented whenever sdss_access replants the tree or otherwise modifies the os environ;
+# used to invalidate any state derived from the environment, e.g. compiled templates
+_env_generation = 0
+
+# matches any svn software product tags in a path
+_tag_regex = re.compile(r'tags/(v?[0-9._]+)')
+
+# matches a path template prefix consisting of a single environment variable
+_prefix_regex = re.compile(r'\$(\w+|\{[^}]*\})', re.ASCII)
+
+
+def _bump_env_generation():
+    ''' Mark any state derived from the os environment as out-of-date '''
+    global _env_generation
+    _env_generation += 1
+
+
+class _TreeCache(object):
+    ''' The caches shared by all paths, of the planted trees and anything derived from them
+
+    Attributes:
+        planted (dict):
+            Planted tree states and the os environ they set, keyed by release and
+            environment inputs
+        release_dates (dict):
+            Release dates of any releases other than the planted one, keyed by release
+        snapshot_keys (dict):
+            Template keywords loaded from a snapshot, keyed by release and path class
+        snapshot_checked (bool):
+            Whether the snapshot file set in the config has been loaded
+        prefixes (dict):
+            Expanded environment variable prefixes of path templates, keyed by (envvar,
+            value), with the values of any other envvars each expansion depends on
+        special_kwargs (dict):
+            Keyword arguments referenced by each special function, keyed by (class,
+            method name)
+    '''
+
+    def __init__(self, prefix_size=4096):
+        self.prefix_size = prefix_size
+        self.clear()
+
+    def __repr__(self):
+        return '<_TreeCache(n_planted={0}, n_prefixes={1})>'.format(len(self.planted),
+                                                                  len(self.prefixes))
+
+    def clear(self):
+        ''' Clear all the caches '''
+        self.planted = {}
+        self.release_dates = {}
+        self.snapshot_keys = {}
+        self.snapshot_checked = False
+        self.prefixes = {}
+        self.special_kwargs = {}
+
+    def add_prefix(self, key, entry):
+        ''' Add an expanded prefix, evicting the oldest prefixes if full '''
+        while len(self.prefixes) >= self.prefix_size:
+            self.prefixes.pop(next(iter(self.prefixes)), None)
+        self.prefixes[key] = entry
+
+
+_tree_cache = _TreeCache()
+
+# serializes any replanting of the global tree
+_plant_lock = threading.RLock()
+
+
+def _plant_tree(release, preserve_envvars=None, isolated=False):
+    ''' Replant the tree for a release, reusing any previously planted state
+
+    The first time a release is planted, the tree is replanted as normal, and its
+    state and the values of all the environment variables it sets are saved.  Planting
+    the same release again restores the saved state, rather than re-reading the tree
+    configuration files.  An isolated first plant grows a separate tree instead, so
+    never touches the global tree or os.environ.
+
+    Parameters:
+        release (str):
+            The release to plant the tree for
+        preserve_envvars (bool|list):
+            Flag to indicate some or all original environment variables to preserve
+        isolated (bool):
+            If True, leaves the global tree and os.environ as they were, and only returns
+            the planted state
+
+    Returns:
+        A tuple of the planted tree attributes, and the values of the environment
+        variables set by the tree, with None for any unset variables
+    '''
+    with _plant_lock:
+        key = _planted_key(release, preserve_envvars)
+        planted = _tree_cache.planted.get(key)
+        if planted is None and _load_config_snapshot():
+            planted = _tree_cache.planted.get(key)
+        if planted is None and isolated:
+            grown, environ = _grow_tree(release, preserve_envvars=preserve_envvars)
+            planted = _tree_cache.planted[key] = (vars(grown), environ)
+            if release:
+                _tree_cache.release_dates.setdefault(release, grown.release_date)
+        elif planted is None:
+            before = os.environ.copy()
+            tree.replant_tree(release, preserve_envvars=preserve_envvars)
+            after = os.environ.copy()
+
+            # all envvars defined by the tree, or otherwise modified by replanting
+            envvars = {k.upper() for k in tree.to_dict()}
+            envvars.update(k for k in after if before.get(k) != after[k])
+            envvars.update(k for k in before if k not in after)
+            envvars.add('PRODUCT_ROOT')
+
+            # the tree attributes, excluding any patched methods
+            state = {k: v for k, v in vars(tree).items() if not callable(v)}
+            state['paths'] = tree.paths.copy()
+            planted = _tree_cache.planted[key] = (state, {k: after.get(k) for k in envvars})
+            if release:
+                _tree_cache.release_dates.setdefault(release, getattr(tree, 'release_date', None))
+        elif not isolated:
+            vars(tree).update(planted[0])
+            _set_environ(planted[1])
+
+        # each planted tree gets its own copy of the templates, as they may be modified
+        if not isolated:
+            tree.paths = planted[0]['paths'].copy()
+    return planted
+
+
+def _grow_tree(release, preserve_envvars=None):
+    ''' Grow a separate tree for a release, without modifying the global tree or os.environ
+
+    Mirrors ``Tree.replant_tree``, but collects the environment variables the tree sets
+    into a dictionary, rather than setting them in os.environ.
+
+    Parameters:
+        release (str):
+            The release to grow the tree for
+        preserve_envvars (bool|list):
+            Flag to indicate some or all original environment variables to preserve
+
+    Returns:
+        A tuple of the new tree, and the values of the environment variables set by it
+    '''
+    grown = Tree.__new__(Tree)
+    grown.config_name = release or 'sdsswork'
+    grown.release = grown.get_release_from_config()
+    grown.exclude = []
+    grown._keys = tree._keys
+    grown._file_replace = tree._file_replace
+    grown.set_roots()
+    grown.load_config()
+    grown.branch_out(limb=grown._keys)
+    grown.productroot_dir = grown.get_product_root()
+
+    environ = {k.upper(): os.path.normpath(v) for k, v in grown.to_dict().items()}
+    environ['PRODUCT_ROOT'] = grown.productroot_dir
+    preserve_envvars = preserve_envvars or grown._get_preserved_envvars()
+    orig = grown.get_orig_os_environ()
+    if preserve_envvars is True:
+        environ.update(orig)
+    elif isinstance(preserve_envvars, (list, tuple)):
+        environ.update((k, orig[k]) for k in preserve_envvars if k in orig)
+    return grown, environ
+
+
+def _planted_key(release, preserve_envvars=None):
+    ''' The key of a planted tree, from the release and the environment inputs to the tree '''
+    preserve = tuple(preserve_envvars) if isinstance(preserve_envvars, list) else preserve_envvars
+    inputs = ('TREE_DIR', 'SAS_BASE_DIR') + tuple(tree._product_roots)
+    return (release, preserve) + tuple(os.environ.get(i) for i in inputs)
+
+
+def _load_config_snapshot():
+    ''' Load the snapshot file set in the config, once per process
+
+    Returns:
+        True if any releases were loaded from the snapshot
+    '''
+    filename = config.get('snapshot')
+    if _tree_cache.snapshot_checked or not filename:
+        return False
+    _tree_cache.snapshot_checked = True
+
+    from sdss_access.path.snapshot import load_snapshot
+    return bool(load_snapshot(filename))
+
+
+def _set_environ(environ):
+    ''' Set or unset a dictionary of variables in os.environ '''
+    for envvar, value in environ.items():
+        if value is None:
+            os.environ.pop(envvar, None)
+        elif os.environ.get(envvar) != value:
+            os.environ[envvar] = value
+
+
+def _overlay_environ(base, environ):
+    ''' Create an immutable copy of an environment, with variables set or unset '''
+    merged = dict(base)
+    merged.update((k, v) for k, v in environ.items() if v is not None)
+    for envvar in [k for k, v in environ.items() if v is None]:
+        merged.pop(envvar, None)
+    return MappingProxyType(merged)
+
+
+def _get_cache_options(cache):
+    ''' The size and expiry of a cache, or None if there is no cache '''
+    return None if cache is None else (cache.maxsize, cache.ttl)
+
+
+def clear_tree_cache():
+    ''' Clear the cache of planted trees
+
+    Forces the next replanting of any release to re-read its tree configuration, e.g.
+    after modifying any tree environment variables by hand.  Also clears everything
+    derived from the planted trees, see `_TreeCache`.
+    '''
+    _tree_cache.clear()
+
+
+SpecialFunction = namedtuple('SpecialFunction', ['name', 'keys', 'extract', 'array'])
+SpecialFunction.__doc__ = ''' A registered path template special function
+
+Parameters:
+    name (str):
+        The name of the special function method
+    keys (tuple):
+        The keyword arguments required by the special function
+    extract (str):
+        The template replacement used when extracting keywords from a path, or None
+    array (callable):
+        The array form of the special function, used by `.BasePath.full_many`, or None
+'''
+
+ResolvedPath = namedtuple('ResolvedPath', ['full', 'location', 'sas_module', 'url'])
+ResolvedPath.__doc__ = ''' A path resolved to all of its local and remote forms at once
+
+Parameters:
+    full (str):
+        The full local path to the file
+    location (str):
+        The relative path location (to the base_dir), or None
+    sas_module (str):
+        The top-level SAS module or product directory of the location, or None
+    url (str):
+        The url to the file, or None if no location could be extracted
+'''
+
+
+def special_function(*keys, extract=None, array=None):
+    ''' Register a method as a path template special function
+
+    Declares the keyword arguments a special function, e.g. ``@platedir|``, requires
+    from the path template kwargs.  Registered functions are collected into the
+    ``_special_functions`` registry of the path class, which is used by
+    `.BasePath.lookup_keys` and `.BasePath.extract` instead of parsing the method source.
+
+    Parameters:
+        keys (str):
+            The keyword arguments required by the special function
+        extract (str):
+            A template string to drop in for the special function when extracting
+            keywords from an example path, e.g. ``{plateid:0>6}``
+        array (callable):
+            An array form of the special function, accepting the filetype and columns
+            of keyword values as arrays, and returning an array of strings
+
+    Example:
+        >>> class MyPath(Path):
+        >>>     @special_function('plateid', extract='{plateid}')
+        >>>     def myplate(self, filetype, **kwargs):
+        >>>         return str(kwargs['plateid'])
+    '''
+    def decorator(func):
+        func._special_function = SpecialFunction(func.__name__, tuple(keys), extract, array)
+        return func
+    return decorator
+
 
 def check_public_release(release: str = None, public: bool = False) -> bool:
     """ Check if a release is public
@@ -67,10 +354,13 @@ def check_public_release(release: str = None, public: bool = False) -> bool:
     today = datetime.datetime.now().date()
 
     # get the release date from the tree
-    if release and release != tree.release:
-        # grab the release date from a new tree
-        t = Tree(release.lower())
-        release_date = getattr(t, 'release_date', None)
+    if release and release != tree.release and release.lower() != tree.config_name:
+        # grab the release date from a new tree, once per release
+        release_dates = _tree_cache.release_dates
+        if release.lower() not in release_dates:
+            t = Tree(release.lower())
+            release_dates[release.lower()] = getattr(t, 'release_date', None)
+        release_date = release_dates[release.lower()]
     else:
         # use the release from global tree
         release_date = getattr(tree, 'release_date', None)
@@ -105,29 +395,74 @@ class BasePath(object):
         environment paths, e.g. PLATEDESIGN_DIR
     preserve_envvars : bool | list
         Flag(s) to indicate some or all original environment variables to preserve
+    pure : bool
+        If True, resolves paths purely as strings, without checking the filesystem for
+        compressed versions of each file.  Default is False.
+    dir_cache : bool | `.DirectoryCache`
+        If True, caches directory listings used to check for files, compression and
+        wildcards.  Can also be a `.DirectoryCache` to set its size and expiry, or to share
+        it between paths.  Default is False.
+    path_cache : bool | `.PathCache`
+        If True, memoizes the full paths resolved from each template and set of keyword
+        arguments.  Can also be a `.PathCache` to set its size and expiry, or to share it
+        between paths.  Default is False.
+    isolated : bool
+        If True, holds the environment variables and templates of the release on the
+        instance, without replanting the global tree or modifying os.environ, so paths
+        for several releases can be resolved concurrently.  Default is False.
 
     Attributes
     ----------
     templates : dict
         The set of templates read from the configuration file.
+    environ : dict
+        The environment variables used to resolve paths.  This is os.environ, or an
+        immutable mapping of the release environment when isolated.
     """
 
     _netloc = {"dtn": "dtn.sdss.org", "sdss": "data.sdss.org", "sdss5": "data.sdss5.org",
                "mirror": "data.mirror.sdss.org", "svn": "svn.sdss.org"}
     _s5cfgs = ['sdss', 'ipl']  # SDSS-V releases start with sdss or ipl.
+    _special_functions = {}  # registry of special functions, by method name
+    # attributes kept in the compact state of a path, see get_state
+    _state_attrs = ('public', 'mirror', 'verbose', 'pure', 'force_modules', 'preserve_envvars',
+                    'netloc', 'remote_base', '_base_dir')
+
+    def __init_subclass__(cls, **kwargs):
+        ''' Collects the registered special functions of a path class '''
+        super().__init_subclass__(**kwargs)
+        registry = dict(cls._special_functions)
+        for name, attr in vars(cls).items():
+            special = getattr(attr, '_special_function', None)
+            if special:
+                registry[name] = special
+            elif name in registry:
+                # an undecorated override falls back to parsing the method source
+                registry.pop(name)
+        cls._special_functions = registry
 
     def __init__(self, release=None, public=False, mirror=False, verbose=False,
-                 force_modules=None, preserve_envvars=None):
+                 force_modules=None, preserve_envvars=None, pure=None, dir_cache=None,
+                 isolated=None, path_cache=None):
         # set release
         self.release = release or os.getenv('TREE_VER', 'sdsswork')
+        self.isolated = isolated or config.get('isolated')
+        self._environ = None
         self.verbose = verbose
+        path_cache = config.get('path_cache') if path_cache is None else path_cache
+        if not isinstance(path_cache, PathCache):
+            path_cache = PathCache() if path_cache else None
+        self.path_cache = path_cache
         self.force_modules = force_modules or config.get('force_modules')
         self.preserve_envvars = preserve_envvars or config.get('preserve_envvars')
+        self.pure = pure or config.get('pure')
+        dir_cache = config.get('dir_cache') if dir_cache is None else dir_cache
+        if not isinstance(dir_cache, DirectoryCache):
+            dir_cache = DirectoryCache() if dir_cache else None
+        self.dir_cache = dir_cache
 
         # set attributes
-        self._special_fxn_pattern = r"\@\w+[|]"
-        self._compressions = ['.gz', '.bz2', '.zip', '.fz']
-        self._comp_regex = r'({0})$'.format('|'.join(self._compressions))
+        self._set_attributes()
 
         # set the path templates from the tree
         self.templates = tree.paths
@@ -145,7 +480,109 @@ class BasePath(object):
     def __repr__(self):
         return '<BasePath(release="{0}", public={1}, n_paths={2})'.format(self.release.lower(), self.public, len(self.templates))
 
-    def replant_tree(self, release=None):
+    def _set_attributes(self):
+        ''' Set the internal attributes and empty caches of a new path '''
+        self._special_fxn_pattern = r"\@\w+[|]"
+        self._compressions = ['.gz', '.bz2', '.zip', '.fz']
+        self._comp_regex = r'({0})$'.format('|'.join(self._compressions))
+        self._compiled = {}
+        self._env_depends = {}
+        self._extractors = {}
+        self._classifier = None
+        self._classifier_env = ((), ())
+        self._compiled_generation = None
+        self._lookup_cache = {}
+        self._root_index = None
+        self._base_dir = None
+
+    def get_state(self):
+        ''' Return a compact, picklable state of the path
+
+        Holds the release, templates, options, compiled templates and the environment
+        variables of the release, rather than the global tree, any caches or other
+        process state, so a path can be cheaply sent to other processes and rebuilt
+        there with `from_state`.  Pickling or copying a path is unaffected.
+
+        Returns:
+            A dictionary of the path state
+        '''
+        __, planted = _plant_tree(self.release, preserve_envvars=self.preserve_envvars,
+                                  isolated=True)
+        envvars = set(planted).union(tree._product_roots, ['SAS_BASE_DIR'])
+        envvars.update(t.split('/', 1)[0].lstrip('$').strip('{}') for t in self.templates.values())
+
+        # include any variables referred to by the values of others
+        environ = self.environ
+        names = list(envvars)
+        while names:
+            value = environ.get(names.pop()) or ''
+            for name in _envvar_regex.findall(value):
+                name = name.strip('{}')
+                if name not in envvars:
+                    envvars.add(name)
+                    names.append(name)
+
+        state = {attr: getattr(self, attr) for attr in self._state_attrs}
+        state.update(
+            release=self.release, templates=dict(self.templates),
+            environ={k: environ[k] for k in envvars if k and environ.get(k) is not None},
+            compiled={k: v for k, v in self._compiled.items() if v[3] is not None},
+            lookup={name: v for (release, name), v in self._lookup_cache.items()
+                    if release == self.release},
+            dir_cache=_get_cache_options(self.dir_cache),
+            path_cache=_get_cache_options(self.path_cache))
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        ''' Create a path from the compact state of `get_state`, without replanting the tree
+
+        The path is isolated, with an environment of only the release environment
+        variables, rather than a copy of os.environ.
+
+        Parameters:
+            state (dict):
+                The path state, from `get_state`
+
+        Returns:
+            A new path of this class
+        '''
+        path = cls.__new__(cls)
+        path._set_state(state)
+        return path
+
+    def _set_state(self, state):
+        ''' Set the attributes of a new path from its compact state '''
+        self._set_attributes()
+        self.release = state['release']
+        self.isolated = True
+        self._environ = MappingProxyType(state['environ'])
+        self.templates = state['templates']
+        self.dir_cache = DirectoryCache(*state['dir_cache']) if state['dir_cache'] else None
+        self.path_cache = PathCache(*state['path_cache']) if state['path_cache'] else None
+        for attr in self._state_attrs:
+            setattr(self, attr, state[attr])
+
+        self._compiled.update(state['compiled'])
+        self._compiled_generation = _env_generation
+        self._lookup_cache.update(((self.release, name), v) for name, v in state['lookup'].items())
+
+    @property
+    def environ(self):
+        ''' The environment variables used to resolve paths '''
+        return os.environ if self._environ is None else self._environ
+
+    @property
+    def force_modules(self):
+        ''' If True, forces software products to use any existing Module environment paths '''
+        return self._force_modules
+
+    @force_modules.setter
+    def force_modules(self, value):
+        self._force_modules = value
+        self._clear_path_cache()
+
+    def replant_tree(self, release=None, clear_cache=None):
         ''' Replants the tree based on release
 
         Resets the path definitions given a specified release
@@ -154,13 +591,30 @@ class BasePath(object):
         ----------
             release : str
                 A release to use when replanting the tree
+            clear_cache : bool
+                If True, first clears the cache of planted trees and everything derived
+                from them, re-reading the tree configuration, see `clear_tree_cache`
         '''
+        if clear_cache:
+            _tree_cache.clear()
         release = release or self.release
         if release:
             release = release.lower().replace('-', '')
-        tree.replant_tree(release, preserve_envvars=self.preserve_envvars)
-        self.templates = tree.paths
+        state, environ = _plant_tree(release, preserve_envvars=self.preserve_envvars,
+                                     isolated=self.isolated)
+        if self.isolated:
+            self.templates = state['paths'].copy()
+            self._environ = _overlay_environ(os.environ, environ)
+        else:
+            self.templates = tree.paths
         self.release = release
+        self._lookup_cache.clear()
+        self._clear_path_cache()
+        if self.isolated:
+            # only this instance is affected
+            self._compiled_generation = None
+        else:
+            _bump_env_generation()
 
     @staticmethod
     def get_available_releases(public=None):
@@ -186,8 +640,17 @@ class BasePath(object):
 
         assert name, 'Must specify a path name'
         assert name in self.templates.keys(), '{0} must be defined in the path templates'.format(name)
+
+        # return the cached keys, unless the template has since been modified
+        template = self.templates[name]
+        cached = self._lookup_cache.get((self.release, name))
+        if cached is None:
+            cached = _tree_cache.snapshot_keys.get((self.release, type(self)), {}).get(name)
+        if cached is not None and cached[0] == template:
+            return list(cached[1])
+
         # find all words inside brackets
-        keys = list(set(re.findall(r'{(.*?)}', self.templates[name])))
+        keys = list(set(re.findall(r'{(.*?)}', template)))
         # lookup any keys referenced inside special functions
         skeys = self._check_special_kwargs(name)
         keys.extend(skeys)
@@ -195,6 +658,7 @@ class BasePath(object):
         keys = list(set(keys))
         # remove the type : descriptor
         keys = [k.split(':')[0] for k in keys]
+        self._lookup_cache[(self.release, name)] = (template, tuple(keys))
         return keys
 
     def _check_special_kwargs(self, name):
@@ -218,20 +682,31 @@ class BasePath(object):
 
         # loop over special method names and extract keywords
         for function in functions:
+            # use the declared keywords of any registered special function
+            special = self._special_functions.get(function[1:-1])
+            if special:
+                keys.extend(special.keys)
+                continue
+
             method = getattr(self, function[1:-1])
-            # get source code of special method
-            source = self._find_source(method)
 
-            # matches on kwargs.get("xxx"), kwargs.get("xxx", None), or kwargs["xxx"]
-            # on either single or double quoted string, with or without a default value
-            patt = r"kwargs.get\(\W(\w+)\W,*\s*.*\)|kwargs\[\W(\w+)\W\]"
-            fkeys = re.findall(patt, source)
+            # the source of a method does not change, so only parse it once per class
+            cache_key = (type(self), method.__name__)
+            fkeys = _tree_cache.special_kwargs.get(cache_key)
+            if fkeys is None:
+                # get source code of special method
+                source = self._find_source(method)
+
+                # matches on kwargs.get("xxx"), kwargs.get("xxx", None), or kwargs["xxx"]
+                # on either single or double quoted string, with or without a default value
+                patt = r"kwargs.get\(\W(\w+)\W,*\s*.*\)|kwargs\[\W(\w+)\W\]"
+                fkeys = re.findall(patt, source)
 
-            if fkeys:
                 # condense gorups down to proper string list
                 fkeys = [str(i) for k in fkeys for i in k if i]
+                _tree_cache.special_kwargs[cache_key] = fkeys
 
-                keys.extend(fkeys)
+            keys.extend(fkeys)
         return keys
 
     @staticmethod
@@ -310,7 +785,8 @@ class BasePath(object):
                 The absolute filepath to the example file
 
         Returns:
-            A dictionary of path keyword values
+            A dictionary of path keyword values, or None if the template has no keywords, or
+            has special functions without an extraction template
 
         Example:
             >>> from sdss_access.path import Path
@@ -329,131 +805,167 @@ class BasePath(object):
             example = str(example)
         assert isinstance(example, six.string_types), 'example file must be a string'
 
-        # get the template
         assert name in self.lookup_names(), '{0} must be a valid template name'.format(name)
-        template = self.templates[name]
+        extractor = self._get_extractor(name)
+        if not extractor:
+            return None
 
-        # expand the environment variable
-        template = _expandvars(template)
+        return extractor.extract(self._remove_compression(example))
 
-        # handle special functions; perform a drop in replacement
-        if re.match('@spectrodir[|]', template):
-            template = re.sub('@spectrodir[|]', os.environ['BOSS_SPECTRO_REDUX'], template)
-        if re.search('@platedir[|]', template):
-            template = re.sub('@platedir[|]', r'(.*)/{plateid:0>6}', template)
-        if re.search('@definitiondir[|]', template):
-            template = re.sub('@definitiondir[|]', '{designid:0>6}', template)
-        if re.search('@apgprefix[|]', template):
-            template = re.sub('@apgprefix[|]', '{prefix}', template)
-        if re.search('@healpixgrp[|]', template):
-            template = re.sub('@healpixgrp[|]', '{healpixgrp}', template)
-        if re.search('@configgrp[|]', template):
-            template = re.sub('@configgrp[|]', '{configgrp}', template)
-        if re.search('@isplate[|]', template):
-            template = re.sub('@isplate[|]', '{isplate}', template)
-        if re.search('@pad_fieldid[|]', template):
-           template = re.sub('@pad_fieldid[|]', '{fieldid}', template)
-        if re.search('@spcoaddfolder[|]',template):
-           template = re.sub('@spcoaddfolder[|]', '{spcoaddfolder}', template)
-        if re.search('@sptypefolder[|]',template):
-           template = re.sub('@sptypefolder[|]', '{sptypefolder}', template)
-        if re.search('@epochflag[|]', template):
-           template = re.sub('@epochflag[|]', '{epochflag}', template)
-        if re.search('@spcoaddobs[|]',template):
-           template = re.sub('@spcoaddobs[|]', '{obs}', template)
-        if re.search('@spcoaddgrp[|]',template):
-           template = re.sub('@spcoaddgrp[|]', '{spcoaddgrp}', template)
-        if re.search('@fieldgrp[|]',template):
-           template = re.sub('@fieldgrp[|]', '{fieldgrp}', template)
-        if re.search('@plateid6[|]', template):
-            template = re.sub('@plateid6[|]', '{plateid:0>6}', template)
-        if re.search('@component_default[|]', template):
-            template = re.sub('@component_default[|]', '{component_default}', template)
-        if re.search('@cat_id_groups[|]', template):
-            template = re.sub('@cat_id_groups[|]', '{cat_id_groups}', template)
-        if re.search('@sdss_id_groups[|]', template):
-            template = re.sub('@sdss_id_groups[|]', '{sdss_id_groups}', template)
-        if re.search('@tilegrp[|]', template):
-            template = re.sub('@tilegrp[|]', '{tilegrp}', template)
-        if re.search('@mos_target_num[|]', template):
-            template = re.sub('@mos_target_num[|]', '{num}', template)
-        if re.search('@mos_target_num2[|]', template):
-            template = re.sub('@mos_target_num2[|]', '{num}', template)
-        if re.search('@mos_target_num3[|]', template):
-            template = re.sub('@mos_target_num3[|]', '{num}', template)
-        if re.search('@mos_target_num_underscore[|]', template):
-            template = re.sub('@mos_target_num_underscore[|]', '{num}', template)
-
-        # check if template has any brackets
-        haskwargs = re.search('[{}]', template)
-        if not haskwargs:
+    def extract_many(self, name, examples):
+        ''' Extract keywords from many example paths
+
+        Parses a list of filepaths for a given path name into columns of keyword values,
+        using the compiled template regex for all of them.  Any paths which do not match
+        the template have None values.
+
+        Parameters:
+            name (str):
+                The name of the path definition
+            examples (list):
+                The absolute filepaths to the example files
+
+        Returns:
+            A dictionary of the lists of each path keyword value, in the order of the
+            examples, or None if the template has no keywords
+
+        Example:
+            >>> from sdss_access.path import Path
+            >>> path = Path(release='dr17')
+            >>> path.extract_many('mangacube', filepaths)
+            >>> {'drpver': ['v3_1_1', 'v3_1_1'], 'plate': ['8485', '7443'],
+            >>>  'ifu': ['1901', '12701'], 'wave': ['LOG', 'LOG']}
+        '''
+        assert name in self.lookup_names(), '{0} must be a valid template name'.format(name)
+        extractor = self._get_extractor(name)
+        if not extractor:
             return None
 
-        # escape the envvar $ and any dots (use re in case of @platedir sub)
-        template = self._remove_compression(template)
-        subtemp = template.replace('$', '\\$')
-        subtemp = re.sub(r'[.](?!\*)', '\\.', subtemp)
-        # define search pattern; replace all template keywords with regex "(.*)" group
-        research = re.sub('{(.*?)}', '(.*?)', subtemp)
-        research += '$'  # mark the end of a search string (captures cases when {} at end of string)
-        # look for matches in template and example
-        pmatch = re.search(research, self._remove_compression(template))
-        tmatch = re.search(research, self._remove_compression(example))
-
-        path_dict = {}
-        # if example match extract keys and values from the match groups
-        if tmatch:
-            values = tmatch.groups(0)
-            keys = pmatch.groups(0)
-            assert len(keys) == len(values), 'pattern and template matches must have same length'
-            parts = zip(keys, values)
-            # parse into dictionary
-            for part in parts:
-                value = part[1]
-                if re.findall('{(.*?)}', part[0]):
-                    # get the key name inside the brackets
-                    keys = re.findall('{(.*?)}', part[0])
-                    # remove the type : designation
-                    keys = [k.split(':')[0] for k in keys]
-                    # handle double bracket edge cases; remove this when better solution found
-                    if len(keys) > 1:
-                        if keys[0] == 'dr':
-                            # for {dr}{version}
-                            drval = re.match('^DR[1-9][0-9]', value).group(0)
-                            otherval = value.split(drval)[-1]
-                            pdict = {keys[0]: drval, keys[1]: otherval}
-                        elif keys == ['fieldid','isplate']:
-                            # for {fieldid}{isplate} as isplate is calculated automatically
-                            if value.endswith('p') and value[:-1].isdigit():
-                                value = value[:-1]
-                            pdict = {keys[0]:value}
-                        elif keys == ['run2d','epochflag']:
-                            # for {run2d}{epochflag} as epochflag is calculated automatically
-                            pdict = {keys[0]:value.replace('-epoch','')}
-                        elif keys == ['coadd', 'obs']:
-                            value = value.split('_')
-                            if len(value) == 1:
-                                value.append('')
-                            pdict = {keys[0]: value[0], keys[1]: value[1]}
-                        elif keys[0] in ['rc', 'br', 'filter', 'camrow']:
-                            # for {camrow}{camcol}, {filter}{camcol}, {br}{id}, etc
-                            pdict = {keys[0]: value[0], keys[1]: value[1:]}
-                        else:
-                            raise ValueError('This case has not yet been accounted for.')
-                        path_dict.update(pdict)
-                    elif name.startswith('mos_target') and keys[0] == 'num':
-                        # The num parameter in mos_target paths will be a zero-padded
-                        # suffix like "-010". Strip expected prefixes and convert the
-                        # remaining numeric suffix to an integer when present.
-                        cleaned = value.lstrip('-_')
-                        if cleaned:
-                            path_dict[keys[0]] = int(cleaned)
-                    elif keys[0] in ['sptypefolder','fieldgrp','spcoaddfolder','spcoaddgrp']:
-                        # supress the keys since they are automatically calculated
-                        continue
-                    else:
-                        path_dict[keys[0]] = value
-        return path_dict
+        search = extractor.pattern.search
+        parse = extractor.parse
+        comp_regex = re.compile(self._comp_regex)
+        rows = []
+        for example in examples:
+            match = search(comp_regex.sub('', str(example), count=1))
+            rows.append(parse(match.groups(0)) if match else None)
+
+        # collect the rows into columns
+        keys = {}
+        for row in rows:
+            if row:
+                keys.update(dict.fromkeys(row))
+        return {key: [row.get(key) if row else None for row in rows] for key in keys}
+
+    def _get_extractor(self, name):
+        ''' Get the compiled extractor for a given path name
+
+        Compiles the template regex on first use, and caches it for the release, in the
+        same way as `_get_compiled`.
+
+        Parameters:
+            name (str):
+                The path name of the template
+
+        Returns:
+            A `.CompiledExtractor`, or None if the template has no keywords, or has special
+            functions without an extraction template
+        '''
+        return self._get_extract_template(name)[1]
+
+    def _get_extract_template(self, name):
+        ''' Get the compiled extractor for a given path name, and its expanded template '''
+        self._check_env_generation()
+        raw = self.templates[name]
+        __, values = self._get_env_depends(raw)
+        cached = self._extractors.get(name)
+        if cached is not None and cached[0] == raw and cached[1] == values:
+            return cached[2:]
+
+        # handle special functions; perform a drop in replacement
+        template = raw
+        for function in set(re.findall(self._special_fxn_pattern, template)):
+            special = self._special_functions.get(function[1:-1])
+            if special and special.extract is not None:
+                template = template.replace(function, special.extract)
+
+        # expand the environment variable
+        template = self._remove_compression(_expandvars(template, self._environ))
+        extractor = compile_extractor(name, template, raw_template=raw,
+                                      special_pattern=self._special_fxn_pattern)
+        self._extractors[name] = (raw, values, template, extractor)
+        return template, extractor
+
+    def classify(self, path):
+        ''' Identify the path names matching a filepath
+
+        Finds the path templates of the release which match a given filepath, e.g. from a
+        disk scan or a log, and extracts their keyword values.  The templates are indexed
+        in a trie over their literal directory prefixes, so only the templates along the
+        directories of the filepath are matched.  Templates with special functions that
+        cannot be extracted are not matched, while directories computed by special
+        functions, e.g. ``@sptypefolder|``, also match where they are empty.
+
+        Parameters:
+            path (str):
+                The absolute filepath to classify
+
+        Returns:
+            A list of `.Classification` tuples of (name, kwargs), the template matching
+            the most characters of the filepath literally first, or an empty list if no
+            template matches
+
+        Example:
+            >>> from sdss_access.path import Path
+            >>> path = Path(release='dr17')
+            >>> path.classify('/Users/Brian/Work/sdss/sas/dr17/manga/spectro/redux/v3_1_1/8485/'
+            >>>               'stack/manga-8485-1901-LOGCUBE.fits.gz')
+            >>> [Classification(name='mangacube', kwargs={'drpver': 'v3_1_1', 'plate': '8485',
+            >>>                                           'ifu': '1901', 'wave': 'LOG'})]
+        '''
+        return self.classify_many([path])[0]
+
+    def classify_many(self, paths):
+        ''' Identify the path names matching many filepaths
+
+        As `classify`, but looks up the candidate templates only once per directory,
+        e.g. for the files of a whole directory walk.
+
+        Parameters:
+            paths (list):
+                The absolute filepaths to classify
+
+        Returns:
+            A list of the `.Classification` matches of each filepath
+        '''
+        comp_regex = re.compile(self._comp_regex)
+        return self._get_classifier().classify_many(
+            comp_regex.sub('', str(path), count=1) for path in paths)
+
+    def _get_classifier(self):
+        ''' Get the template index used to classify filepaths, building it on first use '''
+        self._check_env_generation()
+        # rebuild the index when any environment variable of the templates has changed
+        if self._classifier is not None:
+            names, values = self._classifier_env
+            if tuple([self.environ.get(name) for name in names]) != values:
+                self._classifier = None
+
+        if self._classifier is None:
+            classifier = PathClassifier()
+            for name in self.templates:
+                template, extractor = self._get_extract_template(name)
+                # special functions without an extract replacement cannot be matched
+                if re.search(self._special_fxn_pattern, template):
+                    continue
+                if extractor:
+                    classifier.add(extractor, template)
+                else:
+                    classifier.add_literal(name, template)
+            self._classifier = classifier
+            names = sorted({name for template in self.templates.values()
+                            for name in self._env_depends.get(template, ((),))[0]})
+            self._classifier_env = (names, tuple([self.environ.get(name) for name in names]))
+        return self._classifier
 
     def dir(self, filetype, **kwargs):
         """Return the directory containing a file of a given type.
@@ -519,6 +1031,7 @@ class BasePath(object):
 
         if remote:
             # check for remote existence using a HEAD request
+            import requests
             url = self.url('', full=full)
             verify = kwargs.get('verify', True)
             try:
@@ -527,6 +1040,8 @@ class BasePath(object):
                 raise AccessError('Cannot check for remote file existence for {0}: {1}'.format(url, e))
             else:
                 return resp.ok
+        elif self.dir_cache is not None:
+            return self.dir_cache.isfile(full)
         else:
             return os.path.isfile(full)
 
@@ -557,7 +1072,7 @@ class BasePath(object):
             full = self.full(filetype, **kwargs)
 
         # assert '*' in full, 'Wildcard must be present in full path'
-        files = glob(self._add_compression_wild(full))
+        files = self._glob(self._add_compression_wild(full))
 
         # return as urls?
         as_url = kwargs.get('as_url', None)
@@ -570,6 +1085,51 @@ class BasePath(object):
 
         return newfiles
 
+    def iexpand(self, filetype, **kwargs):
+        ''' Lazily expand a wildcard path locally
+
+        A generator version of `expand`.  Walks the wildcard path one directory level at
+        a time with os.scandir, only descending into directories matching each level,
+        and yields each file as it is found, so large expansions need not be held in
+        memory and can be stopped early.  Files are yielded in directory order.
+
+        Parameters
+        ----------
+        filetype : str
+            File type parameter.
+
+        as_url: bool
+            Boolean to yield SAS urls
+
+        refine: str
+            Regular expression string to filter the files by
+
+        filterdir: {'in', 'out'}
+            The filter direction of the refine regular expression, as in `refine`
+
+        Returns
+        -------
+        iexpand : generator
+            A generator of expanded full paths of the given type.
+
+        '''
+
+        full = kwargs.get('full', None)
+        if not full:
+            full = self.full(filetype, **kwargs)
+
+        # the refine regex applies to the full file path, so is checked on each file
+        refine = kwargs.get('refine', None)
+        regex = re.compile(refine) if refine else None
+        filterdir = kwargs.get('filterdir', 'out')
+        assert filterdir in ['in', 'out'], 'Filter direction must be either "in" or "out"'
+
+        as_url = kwargs.get('as_url', None)
+        for file in _iterglob(self._add_compression_wild(full)):
+            if regex and bool(regex.search(file)) != (filterdir == 'out'):
+                continue
+            yield self.url('', full=file) if as_url else file
+
     def any(self, filetype, **kwargs):
         ''' Checks if the local directory contains any of the type of file
 
@@ -584,8 +1144,7 @@ class BasePath(object):
             Boolean indicating if the any files exist in the expanded path on disk.
 
         '''
-        expanded_files = self.expand(filetype, **kwargs)
-        return any(expanded_files)
+        return next(self.iexpand(filetype, **kwargs), None) is not None
 
     def one(self, filetype, **kwargs):
         ''' Returns random one of the given type of file
@@ -602,15 +1161,20 @@ class BasePath(object):
             Regular expression string to filter the list of files by
             before random selection
 
+        seed: int
+            A seed for the random selection, for a reproducible result
+
+        rng: `random.Random`
+            A random number generator to use for the random selection
+
         Returns
         -------
         one : str
             Random file selected from the expanded list of full paths on disk.
 
         '''
-        expanded_files = self.expand(filetype, **kwargs)
-        isany = self.any(filetype, **kwargs)
-        return choice(expanded_files) if isany else None
+        files = _reservoir_sample(self.iexpand(filetype, **kwargs), 1, rng=self._get_rng(kwargs))
+        return files[0] if files else None
 
     def random(self, filetype, **kwargs):
         ''' Returns random number of the given type of file
@@ -630,21 +1194,35 @@ class BasePath(object):
             Regular expression string to filter the list of files by
             before random selection
 
+        seed: int
+            A seed for the random selection, for a reproducible result
+
+        rng: `random.Random`
+            A random number generator to use for the random selection
+
         Returns
         -------
         random : list
             Random file selected from the expanded list of full paths on disk.
 
         '''
-        expanded_files = self.expand(filetype, **kwargs)
-        isany = self.any(filetype, **kwargs)
-        if isany:
-            # get the desired number
-            num = kwargs.get('num', 1)
-            assert num <= len(expanded_files), 'Requested number must be larger the sample.  Reduce your number.'
-            return sample(expanded_files, num)
-        else:
+        # get the desired number
+        num = kwargs.get('num', 1)
+        files = _reservoir_sample(self.iexpand(filetype, **kwargs), num, rng=self._get_rng(kwargs))
+        if not files:
             return None
+        assert num <= len(files), \
+            'Requested number must be larger the sample.  Reduce your number.'
+        return files
+
+    @staticmethod
+    def _get_rng(kwargs):
+        ''' Get the random number generator for a random file selection '''
+        rng = kwargs.get('rng', None)
+        seed = kwargs.get('seed', None)
+        if rng is None and seed is not None:
+            rng = _random.Random(seed)
+        return rng
 
     def refine(self, filelist, regex, filterdir='out', **kwargs):
         ''' Returns a list of files filterd by a regular expression
@@ -689,6 +1267,9 @@ class BasePath(object):
             File type parameter.
         force_module: bool
             If True, forces software products to use any existing Module environment paths
+        pure: bool
+            If True, skips checking the filesystem for a compressed version of the file.
+            Defaults to the instance ``pure`` attribute.
         kwargs: dict
             Any path template keyword arguments
 
@@ -702,10 +1283,199 @@ class BasePath(object):
         if 'full' in kwargs:
             return kwargs.get('full')
 
+        # check for filetype in template
+        self._check_filetype(filetype)
+
+        # resolve the template, or look up a previously resolved path
+        if self.path_cache is None:
+            template = self._resolve_full(filetype, kwargs)
+        else:
+            template = self._memoize_full(filetype, kwargs)
+        return template if self._is_pure(kwargs) else self._check_compression(template)
+
+    def _check_filetype(self, filetype):
+        ''' Check a filetype is one of the templates in the currently loaded tree '''
+        assert filetype in self.templates, ('No entry {0} found. Filetype must '
+                                            'be one of the designated templates '
+                                            'in the currently loaded tree'.format(filetype))
+
+    def _resolve_full(self, filetype, kwargs):
+        ''' Resolve the full path of a given type of file, before any compression check
+
+        Parameters:
+            filetype (str):
+                The path name of the template
+            kwargs (dict):
+                Any path template keyword arguments
+
+        Returns:
+            The full local path to the file
+        '''
+        # module paths modify the template itself, so are resolved uncompiled
+        force_module = kwargs.get('force_module', None)
+        compiled = None if force_module or self.force_modules else self._get_compiled(filetype)
+        if not compiled:
+            return self._full_uncompiled(filetype, **dict(kwargs, pure=True))
+
+        # check for missing keyword arguments
+        missing_keys = compiled.keys.difference(kwargs)
+        if missing_keys:
+            raise KeyError('Missing required keyword arguments: {0}'.format(list(missing_keys)))
+
+        # format the keywords and call any special functions
+        template = compiled.resolve(self, filetype, kwargs)
+
+        # Now match on any software product tags
+        if 'tags/' in template and not kwargs.get('skip_tag_check', None):
+            template = _tag_regex.sub(r'\1', template, count=1)
+
+        return os.path.normpath(template)
+
+    def _memoize_full(self, filetype, kwargs):
+        ''' Resolve a full path, before any compression check, through the path cache
+
+        Keyword arguments that cannot be hashed are never cached.
+
+        Parameters:
+            filetype (str):
+                The path name of the template
+            kwargs (dict):
+                Any path template keyword arguments
+
+        Returns:
+            The full local path to the file
+        '''
+        try:
+            key = self._path_cache_key(filetype, kwargs)
+            full = self.path_cache.get(key)
+        except TypeError:
+            return self._resolve_full(filetype, kwargs)
+
+        if full is None:
+            full = self._resolve_full(filetype, kwargs)
+            self.path_cache.set(key, full)
+        return full
+
+    def _path_cache_key(self, filetype, kwargs, *options):
+        ''' The key of a path in the path cache
+
+        Paths are keyed on the release, the template, the values of its environment
+        variables and the keyword arguments, so a template modified in place, or an
+        environment variable changed in os.environ, is resolved again.  Integer keyword
+        values are keyed by their string form, so e.g. ``plate=8485`` and ``plate='8485'``
+        share an entry.
+
+        Parameters:
+            filetype (str):
+                The path name of the template
+            kwargs (dict):
+                Any path template keyword arguments
+            options (tuple):
+                Any other inputs to the cached value
+
+        Returns:
+            A hashable key, or raises a TypeError for any unhashable keyword arguments
+        '''
+        preserve = self.preserve_envvars
+        template = self.templates[filetype]
+        values = frozenset([(k, str(v)) if isinstance(v, int) else (k, v)
+                            for k, v in kwargs.items() if k != 'pure'])
+        return (self.release, filetype, template, self._get_env_depends(template)[1],
+                self._force_modules, tuple(preserve) if isinstance(preserve, list) else preserve,
+                options, values)
+
+    def full_many(self, filetype, table=None, pure=None, **columns):
+        """Return the full local paths of a given type of file, for columns of keywords.
+
+        Resolves the path template over whole columns of keyword values at once,
+        rather than looping over `full`.  Keyword values can be arrays, lists or
+        scalars, or columns of an input table.  Special functions with an array form,
+        e.g. ``@plategrp|`` or ``@sdss_id_groups|``, are evaluated as array operations.
+        Requires numpy.
+
+        Parameters
+        ----------
+        filetype : str
+            File type parameter.
+        table : table-like
+            A pandas DataFrame, astropy Table, numpy structured array or dictionary, whose
+            columns provide any path template keyword arguments.
+        pure : bool
+            If True, skips checking the filesystem for compressed versions of the files.
+            Otherwise the compression is resolved in one batch with `resolve_compression`.
+            Defaults to the instance ``pure`` attribute.
+        force_module: bool
+            If True, forces software products to use any existing Module environment paths
+        columns: dict
+            Any path template keyword arguments, as arrays, lists or scalars.  These
+            override any columns of the same name in the table.
+
+        Returns
+        -------
+        full : `~numpy.ndarray`
+            An array of full local paths to the files.
+
+        Example
+        -------
+        >>> path.full_many('mwmStar', v_astra='0.5.0', component='', sdss_id=[1, 23, 456])
+        """
+
         # check for filetype in template
         assert filetype in self.templates, ('No entry {0} found. Filetype must '
                                             'be one of the designated templates '
                                             'in the currently loaded tree'.format(filetype))
+
+        force_module = columns.pop('force_module', None)
+        skip_tag_check = columns.pop('skip_tag_check', None)
+        pure = self._is_pure({'pure': pure})
+        np = vectorized.import_numpy()
+        columns, size = vectorized.get_columns(table, **columns)
+
+        # module paths and uncompiled templates are resolved one at a time
+        compiled = None if force_module or self.force_modules else self._get_compiled(filetype)
+        if not compiled:
+            rows = vectorized.get_rows(columns, size)
+            paths = [self.full(filetype, force_module=force_module, skip_tag_check=skip_tag_check,
+                               pure=True, **row) for row in rows]
+            return np.array(paths if pure else self.resolve_compression(paths), dtype=str)
+
+        # check for missing keyword arguments
+        missing_keys = compiled.keys.difference(columns)
+        if missing_keys:
+            raise KeyError('Missing required keyword arguments: {0}'.format(list(missing_keys)))
+
+        # format the keyword columns and call any special functions
+        paths = vectorized.resolve_columns(compiled, self, filetype, columns, size)
+
+        # Now match on any software product tags
+        if not skip_tag_check:
+            index = np.flatnonzero(np.char.find(paths, 'tags/') >= 0)
+            if index.size:
+                paths[index] = [_tag_regex.sub(r'\1', p, count=1) for p in paths[index].tolist()]
+
+        paths = vectorized.normpath(paths)
+        if not pure:
+            paths = np.array(self.resolve_compression(paths.tolist()), dtype=str)
+        return paths
+
+    def _full_uncompiled(self, filetype, **kwargs):
+        """Return the full local path of a given type of file, without a compiled template.
+
+        Resolves the raw template string directly on each call.  Used for any templates
+        that cannot be compiled, or when forcing module paths.
+
+        Parameters
+        ----------
+        filetype : str
+            File type parameter.
+        kwargs: dict
+            Any path template keyword arguments
+
+        Returns
+        -------
+        full : str
+            The full local path to the file.
+        """
         template = self.templates[filetype]
         if not is_posix:
             template = template.replace('/', sep)
@@ -713,7 +1483,9 @@ class BasePath(object):
         # Check if forcing module paths
         force_module = kwargs.get('force_module', None)
         if force_module or self.force_modules:
-            template = self.check_modules(template, permanent=self.force_modules)
+            template = self.check_modules(template,
+                                          permanent=self.force_modules and not self.isolated,
+                                          environ=self._environ)
 
         # Now replace {} items
         # check for missing keyword arguments
@@ -727,7 +1499,7 @@ class BasePath(object):
             template = template.format(**kwargs)
 
         # Now replace environmental variables
-        template = _expandvars(template)
+        template = _expandvars(template, self._environ)
 
         # Now call special functions as appropriate
         template = self._call_special_functions(filetype, template, **kwargs)
@@ -737,10 +1509,88 @@ class BasePath(object):
         if not skip_tag_check:
             template = re.sub(r'tags/(v?[0-9._]+)', r'\1', template, count=1)
 
-        return self._check_compression(os.path.normpath(template))
+        template = os.path.normpath(template)
+        return template if self._is_pure(kwargs) else self._check_compression(template)
+
+    def _is_pure(self, kwargs):
+        ''' Check if a path should be resolved without any filesystem checks '''
+        pure = kwargs.get('pure', None)
+        return self.pure if pure is None else pure
+
+    def _get_compiled(self, filetype):
+        ''' Get the compiled template for a given path name
+
+        Compiles the template on first use, and caches it for the release.  The cache is
+        reset whenever the environment is changed by a tree replant, and any template
+        modified in place, or whose environment variables have changed, is recompiled.
+
+        Parameters:
+            filetype (str):
+                The path name of the template
+
+        Returns:
+            A `.CompiledTemplate`, or None if the template cannot be compiled
+        '''
+        self._check_env_generation()
+        template = self.templates[filetype]
+        cached = self._compiled.get(filetype)
+        if cached is not None and cached[0] == template:
+            environ = self.environ
+            if tuple([environ.get(name) for name in cached[1]]) == cached[2]:
+                return cached[3]
+
+        raw = template if is_posix else template.replace('/', sep)
+        compiled = compile_template(filetype, raw, type(self), self.lookup_keys(filetype),
+                                    functools.partial(_expandvars, environ=self._environ),
+                                    self._special_fxn_pattern, environ=self._environ)
+        self._compiled[filetype] = (template,) + self._get_env_depends(template) + (compiled,)
+        return compiled
+
+    def _get_env_depends(self, template):
+        ''' Get the environment variables a template expands through, and their values
+
+        The variables of each template, including any referred to by their values, are
+        found once, and found again whenever any of their values change.
+
+        Parameters:
+            template (str):
+                The path template
+
+        Returns:
+            A tuple of the names of the variables, and a tuple of their current values
+        '''
+        environ = self.environ
+        entry = self._env_depends.get(template)
+        if entry is not None and tuple([environ.get(name) for name in entry[0]]) == entry[1]:
+            return entry
+
+        depends = []
+        names = _envvar_regex.findall(template)
+        while names:
+            name = names.pop().strip('{}')
+            if name not in depends:
+                depends.append(name)
+                names.extend(_envvar_regex.findall(environ.get(name) or ''))
+        entry = (tuple(depends), tuple([environ.get(name) for name in depends]))
+        self._env_depends[template] = entry
+        return entry
+
+    def _check_env_generation(self):
+        ''' Reset any compiled templates if the environment has changed '''
+        if self._compiled_generation != _env_generation:
+            self._compiled.clear()
+            self._env_depends.clear()
+            self._extractors.clear()
+            self._classifier = None
+            self._compiled_generation = _env_generation
+
+    def _clear_path_cache(self):
+        ''' Clear any memoized paths '''
+        if self.path_cache is not None:
+            self.path_cache.clear()
 
     @staticmethod
-    def check_modules(template, permanent=None):
+    def check_modules(template, permanent=None, environ=None):
         ''' Check for any existing Module path environment
 
         For software product paths, overrides the tree environment paths with existing
@@ -756,13 +1606,16 @@ class BasePath(object):
                 The path template to check
             permanent (bool):
                 If True, sets the original module environment variable into os.environ
+            environ (dict):
+                The environment variables used to expand the template.  Defaults to os.environ.
 
         Returns:
             The template with updated environment variable path
         '''
         # if template starts with $SAS_BASE_DIR, then do nothing
-        expanded_template = _expandvars(template)
-        if expanded_template.startswith(os.getenv("SAS_BASE_DIR")):
+        expanded_template = _expandvars(template, environ)
+        sas_base_dir = (os.environ if environ is None else environ).get("SAS_BASE_DIR")
+        if expanded_template.startswith(sas_base_dir):
             return template
 
         # match template against envvar $ENVVAR_DIR
@@ -776,6 +1629,7 @@ class BasePath(object):
                 # update the real os environment
                 if permanent:
                     os.environ[envvar_name] = orig_envvar
+                    _bump_env_generation()
                 return template.replace(envvar, orig_envvar)
             else:
                 log.info('No existing envvar found for {0}. Returning input template'.format(envvar_name))
@@ -799,9 +1653,84 @@ class BasePath(object):
             template = template + '*'
         return template
 
+    def resolve_compression(self, paths):
+        ''' Resolve the compression of a batch of paths
+
+        Performs the same check as `full` on each path, i.e. whether the file on disk is
+        compressed, or uncompressed, compared to its path template, but lists each parent
+        directory only once for the whole batch, rather than probing the filesystem two
+        or three times per path.  Use it with paths resolved with ``pure=True``.  With a
+        directory cache enabled, the listings are shared across batches.
+
+        Parameters:
+            paths (list):
+                A list of full local paths
+
+        Returns:
+            A list of the paths with any compression suffix resolved
+        '''
+        listings = {}
+        resolved = []
+        for path in paths:
+            # wildcard paths are checked with glob as before
+            if has_magic(path):
+                resolved.append(self._check_compression(path))
+                continue
+
+            dirname, name = os.path.split(path)
+            if dirname not in listings:
+                listings[dirname] = self._list_dir(dirname)
+            resolved.append(self._resolve_listed_compression(path, name, *listings[dirname]))
+        return resolved
+
+    def _list_dir(self, dirname):
+        ''' List a directory, through the directory cache if enabled '''
+        if self.dir_cache is not None:
+            return self.dir_cache.listing(dirname)
+        return list_dir(dirname or os.curdir)
+
+    def _glob(self, pattern):
+        ''' Expand a wildcard pattern, through the directory cache if enabled '''
+        if self.dir_cache is not None:
+            return self.dir_cache.glob(pattern)
+        return glob(pattern)
+
+    def _resolve_listed_compression(self, path, name, names, isfile):
+        ''' check if a filepath is actually compressed, against a listing of its directory '''
+
+        if isfile.get(name):
+            return path
+
+        # check if file is not compressed compared to template
+        if re.search(self._comp_regex, name):
+            base = os.path.splitext(name)[0]
+            if isfile.get(base):
+                return os.path.splitext(path)[0]
+
+        # check if file on disk is actually compressed compared to template
+        suffixes = set()
+        for index in range(bisect_left(names, name), len(names)):
+            if not names[index].startswith(name):
+                break
+            is_comp = re.search(self._comp_regex, names[index])
+            if is_comp:
+                suffixes.add(is_comp.group(0))
+        if suffixes:
+            assert len(suffixes) == 1, 'should only be one suffix per file template '
+            suffix = suffixes.pop()
+            if not path.endswith(suffix):
+                path = path + suffix
+
+        return path
+
     def _check_compression(self, template):
         ''' check if filepath is actually compressed '''
 
+        # use the cached directory listing
+        if self.dir_cache is not None and not has_magic(template):
+            dirname, name = os.path.split(template)
+            return self._resolve_listed_compression(template, name, *self._list_dir(dirname))
+
         exists = self.exists('', full=template)
         if exists:
             return template
@@ -815,7 +1744,7 @@ class BasePath(object):
                 return base
 
         # check if file on disk is actually compressed compared to template
-        alternates = glob(template + '*')
+        alternates = self._glob(template + '*')
         if alternates:
             suffixes = list(set([re.search(self._comp_regex, c).group(0)
                                  for c in alternates if re.search(self._comp_regex, c)]))
@@ -967,13 +1896,20 @@ class BasePath(object):
                 A directory path to use as the base
 
         '''
-        if base_dir:
-            self.base_dir = join(base_dir, '')
-        else:
-            try:
-                self.base_dir = join(os.environ['SAS_BASE_DIR'], '')
-            except Exception:
-                pass
+        self._base_dir = join(base_dir, '') if base_dir else None
+        self._clear_path_cache()
+
+    @property
+    def base_dir(self):
+        ''' The base directory of all local paths.  Defaults to $SAS_BASE_DIR. '''
+        if self._base_dir:
+            return self._base_dir
+        sas_base_dir = self.environ.get('SAS_BASE_DIR')
+        return join(sas_base_dir, '') if sas_base_dir else None
+
+    @base_dir.setter
+    def base_dir(self, base_dir):
+        self.set_base_dir(base_dir=base_dir)
 
     @staticmethod
     def yield_product_root():
@@ -986,9 +1922,9 @@ class BasePath(object):
         ''' Finds a relative location of a product path
 
         Attempts to find a relative path location for a software product path.
-        Loops over all product_roots defined in the tree and tests if a relative location
-        can be extracted, i.e. if the path starts with a given root path.  The root environment
-        paths searched are the following in order of precendence:
+        Looks up the longest product_root defined in the tree that the path starts with,
+        and extracts the relative location from it.  The root environment
+        paths searched are the following, with ties in order of precendence:
         PRODUCT_ROOT, SDSS_SVN_ROOT, SDSS_INSTALL_PRODUCT_ROOT, SDSS_PRODUCT_ROOT,
         SDSS4_PRODUCT_ROOT. If no root is found uses one directory up from SAS_BASE_DIR.
 
@@ -1004,16 +1940,52 @@ class BasePath(object):
             The relative path location (to the base_dir)
 
         '''
+        full = kwargs.get('full', None)
+        if not full:
+            full = self.full(filetype, **kwargs)
 
-        # loop over all potential git/svn product roots
-        loc = None
-        for root in tree._product_roots:
-            loc = self._extract_location(filetype, base_dir=os.getenv(root), **kwargs)
-            if loc:
-                self.product_root = os.getenv(root)
-                break
+        root, loc = self._match_product_root(full)
+        if loc:
+            self.product_root = root
         return loc
 
+    def _get_root_index(self):
+        ''' Get the product root directories, as a prefix index sorted longest first
+
+        The index is rebuilt whenever any of the product root environment variables change.
+
+        Returns:
+            A list of tuples of each product root directory, with a trailing separator, and
+            the directory itself
+        '''
+        roots = tuple(self.environ.get(root) for root in tree._product_roots)
+        if self._root_index is None or self._root_index[0] != roots:
+            prefixes = {}
+            for root in roots:
+                if root:
+                    # equal prefixes keep the root of highest precedence
+                    prefixes.setdefault(join(root, ''), root)
+            index = sorted(prefixes.items(), key=lambda item: -len(item[0]))
+            self._root_index = (roots, index)
+        return self._root_index[1]
+
+    def _match_product_root(self, full):
+        ''' Match a path to its longest product root
+
+        Parameters:
+            full (str):
+                The full local path to the file
+
+        Returns:
+            A tuple of the matching product root directory and the relative location, or
+            (None, None) if the path is not under any product root
+        '''
+        if full:
+            for prefix, root in self._get_root_index():
+                if full.startswith(prefix) and len(full) > len(prefix):
+                    return root, full[len(prefix):]
+        return None, None
+
     def _extract_location(self, filetype, base_dir=None, **kwargs):
         ''' Extracts the relative path location of the file
 
@@ -1033,8 +2005,11 @@ class BasePath(object):
         if not full:
             full = self.full(filetype, **kwargs)
 
-        self.set_base_dir(base_dir=base_dir)
-        location = full[len(self.base_dir):] if full and full.startswith(self.base_dir) else None
+        base_dir = base_dir or self.environ.get('SAS_BASE_DIR')
+        if not base_dir:
+            return None
+        base_dir = join(base_dir, '')
+        location = full[len(base_dir):] if full and full.startswith(base_dir) else None
         return location
 
     def location(self, filetype, base_dir=None, **kwargs):
@@ -1051,13 +2026,27 @@ class BasePath(object):
         -------
             The relative path location (to the base_dir)
         """
+        return self._locate(self.full(filetype, **kwargs), base_dir=base_dir)
+
+    def _locate(self, full, base_dir=None):
+        ''' Extract the relative location of a full path
+
+        Parameters:
+            full (str):
+                The full local path to the file
+            base_dir (str):
+                A root directory to use as the base.  Defaults to SAS_BASE_DIR.
+
+        Returns:
+            The relative path location (to the base_dir)
+        '''
 
         # extract the location using SAS_BASE_DIR as the base
-        location = self._extract_location(filetype, base_dir=base_dir, **kwargs)
+        location = self._extract_location('', base_dir=base_dir, full=full)
 
         # attempt to find a product location
         if not location:
-            location = self.find_location(filetype, **kwargs)
+            location = self.find_location('', full=full)
 
         if location and '//' in location:
             location = location.replace('//', '/')
@@ -1079,20 +2068,150 @@ class BasePath(object):
         full : str
             The sas url to the file.
         """
+        kwargs['skip_tag_check'] = True
+        url = self.resolve(filetype, base_dir=base_dir, sasdir=sasdir, **kwargs).url
+        if not url:
+            raise AccessError('Cannot construct url.  A path.location could not extracted. ')
+        return url
+
+    def resolve(self, filetype, base_dir=None, sasdir='sas', **kwargs):
+        """Return the full path, location and url of a given type of file.
+
+        Resolves the path template only once, and derives the relative location,
+        SAS module and url from the same resolved path, rather than resolving the
+        template again in each of ``full``, ``location`` and ``url``.
+
+        Parameters
+        ----------
+        filetype : str
+            File type parameter.
+        base_dir : str
+            A root directory to use as the base.  Defaults to SAS_BASE_DIR.
+        sasdir : str
+            The top-level directory of the url on the SAS.  Defaults to "sas".
+        kwargs: dict
+            Any path template keyword arguments
+
+        Returns
+        -------
+        resolved : `ResolvedPath`
+            A tuple of the full path, location, sas module and url of the file.
+        """
+
+        if 'full' in kwargs:
+            return self._resolve_located(kwargs['full'], kwargs['full'], base_dir, sasdir)
+
+        # resolve the template once, before any compression checks
+        self._check_filetype(filetype)
+        if self.path_cache is None:
+            raw, resolved = self._resolve_pure(filetype, kwargs, base_dir, sasdir)
+        else:
+            raw, resolved = self._memoize_resolve(filetype, kwargs, base_dir, sasdir)
+        if self._is_pure(kwargs):
+            return resolved
+
+        full = self._check_compression(resolved.full)
+        raw = full if raw == resolved.full else self._check_compression(raw)
+        if full == resolved.full and raw == resolved.full:
+            return resolved
+        return self._resolve_located(raw, full, base_dir, sasdir)
+
+    def _resolve_pure(self, filetype, kwargs, base_dir=None, sasdir='sas'):
+        ''' Resolve the full path, location, sas module and url, before any compression check
+
+        Parameters:
+            filetype (str):
+                The path name of the template
+            kwargs (dict):
+                Any path template keyword arguments
+            base_dir (str):
+                A root directory to use as the base.  Defaults to SAS_BASE_DIR.
+            sasdir (str):
+                The top-level directory of the url on the SAS
+
+        Returns:
+            A tuple of the full path before any tag check, and the `ResolvedPath`
+        '''
+        raw = self._resolve_full(filetype, dict(kwargs, skip_tag_check=True))
+        full = raw if kwargs.get('skip_tag_check', None) else \
+            _tag_regex.sub(r'\1', raw, count=1)
+        return raw, self._resolve_located(raw, full, base_dir, sasdir)
+
+    def _memoize_resolve(self, filetype, kwargs, base_dir=None, sasdir='sas'):
+        ''' Resolve a path, before any compression check, through the path cache
+
+        Resolved paths are also keyed on the base directories of their location and url.
+        Paths located against a product root, rather than the base directory, are resolved
+        again whenever the product roots change.  Keyword arguments that cannot be hashed
+        are never cached.
+
+        Parameters:
+            filetype (str):
+                The path name of the template
+            kwargs (dict):
+                Any path template keyword arguments
+            base_dir (str):
+                A root directory to use as the base.  Defaults to SAS_BASE_DIR.
+            sasdir (str):
+                The top-level directory of the url on the SAS
+
+        Returns:
+            A tuple of the full path before any tag check, and the `ResolvedPath`
+        '''
+        sas_base_dir = self.environ.get('SAS_BASE_DIR')
+        try:
+            key = self._path_cache_key(filetype, kwargs, base_dir, sasdir, self.remote_base,
+                                       sas_base_dir)
+            cached = self.path_cache.get(key)
+        except TypeError:
+            return self._resolve_pure(filetype, kwargs, base_dir, sasdir)
+
+        if cached is None or (cached[0] is not None and cached[0] != self._get_root_index()):
+            raw, resolved = self._resolve_pure(filetype, kwargs, base_dir, sasdir)
+            base = join(base_dir or sas_base_dir or '', '')
+            if base != sep and raw.startswith(base) and resolved.full.startswith(base):
+                cached = (None, None, raw, resolved)
+            else:
+                root = self._match_product_root(resolved.full)[0]
+                cached = (self._get_root_index(), root, raw, resolved)
+            self.path_cache.set(key, cached)
+        elif cached[1]:
+            self.product_root = cached[1]
+        return cached[2:]
+
+    def _resolve_located(self, raw, full, base_dir=None, sasdir='sas'):
+        ''' Derive the location, sas module and url of a full path
+
+        Parameters:
+            raw (str):
+                The full path, before any tag check
+            full (str):
+                The full local path to the file
+            base_dir (str):
+                A root directory to use as the base.  Defaults to SAS_BASE_DIR.
+            sasdir (str):
+                The top-level directory of the url on the SAS
+
+        Returns:
+            The `ResolvedPath`
+        '''
+        # the url of software product paths keeps any tags
+        location = self._locate(full, base_dir=base_dir)
+        raw_location = location if raw == full else self._locate(raw, base_dir=base_dir)
+        sas_module = location.split(sep, 1)[0] if location else None
+        url = self._get_url(raw, raw_location, sasdir) if raw_location else None
+        return ResolvedPath(full, location, sas_module, url)
+
+    def _get_url(self, full, location, sasdir='sas'):
+        ''' Construct the url of a full path from its relative location '''
 
         # determine the remote domain location
-        remote_base = self.remote_base
-        full = self.full(filetype, skip_tag_check=True, **kwargs)
         # if not on the SAS, assume it is an SVN product path
-        if not full.startswith(os.getenv("SAS_BASE_DIR")):
+        remote_base = self.remote_base
+        if not full.startswith(self.environ.get("SAS_BASE_DIR")):
             remote_base = self.get_remote_base(svn=True)
             sasdir = ''
 
-        # get the location and set the url
-        location = self.location(filetype, skip_tag_check=True, base_dir=base_dir, **kwargs)
-        if not location:
-            raise AccessError('Cannot construct url.  A path.location could not extracted. ')
-
         # create the url path
         url = join(remote_base, sasdir, location) if remote_base and location else None
         if not is_posix:
@@ -1101,7 +2220,7 @@ class BasePath(object):
         # handle edge case when a full path is passed in as path.url('', full=full)
         # sanity check on svn tags
         if 'svn.sdss.org' in url:
-            tag_match = re.search(r'tags/(v?[0-9._]+)', url)
+            tag_match = _tag_regex.search(url)
             if not tag_match:
                 url = re.sub(r'(/v?[0-9._]+/)', r'/tags\1', url, count=1)
         return url
@@ -1148,43 +2267,198 @@ class BasePath(object):
             raise ValueError('Template path must start with an environment variable, $ENVVAR_NAME.')
 
         # check envvar is in the local environment
-        if envvar[1:] not in os.environ:
+        if envvar[1:] not in self.environ:
             if not envvar_path:
                 raise ValueError('Template path envvar not defined in local '
                                  'environment. Please specify an envvar_path.')
 
             # add the envvar
             envvar_path = envvar_path.rstrip("/")
-            os.environ[envvar[1:]] = envvar_path
+            if self.isolated:
+                self._environ = _overlay_environ(self._environ, {envvar[1:]: envvar_path})
+                self._compiled_generation = None
+            else:
+                os.environ[envvar[1:]] = envvar_path
+                _bump_env_generation()
 
         # add the temporary path template
         self.templates[name] = path
+        self._lookup_cache.pop((self.release, name), None)
+        self._classifier = None
+        self._clear_path_cache()
 
 
-def _expandvars(template):
+def _expandvars(template, environ=None):
     ''' Recursively run os.path.expandvars
 
-    Recursively calls os.path.expandvars
+    Recursively calls os.path.expandvars.  A template starting with an environment
+    variable prefix, e.g. $MANGA_SPECTRO_REDUX, with no other variables, is expanded from a
+    table of expanded prefixes.
 
     Parameters:
         template (str):
             sdss_access path template
+        environ (dict):
+            The environment variables to expand.  Defaults to os.environ.
 
     Return:
         A path template with expanded environment variables
     '''
-    template = os.path.expandvars(template)
+    if template[:1] == '$':
+        prefix, slash, rest = template.partition('/')
+        if '$' not in rest:
+            expanded = _expand_prefix(prefix, os.environ if environ is None else environ)
+            if expanded is not None:
+                return expanded + slash + rest
+    return _expandvars_recursive(template, environ)
+
+
+def _expandvars_recursive(template, environ=None):
+    ''' Recursively expand the environment variables in a template
+
+    Parameters:
+        template (str):
+            sdss_access path template
+        environ (dict):
+            The environment variables to expand.  Defaults to os.environ.
+
+    Return:
+        A path template with expanded environment variables
+    '''
+    template = expand_envvars(template, environ)
     if template.startswith('$'):
         # if the envvar isn't in os.environ, then exit
         envvar = template.split('/', 1)[0]
-        if envvar[1:] not in os.environ:
+        if envvar[1:] not in (os.environ if environ is None else environ):
             return template
 
         # recurse down
-        return _expandvars(template)
+        return _expandvars_recursive(template, environ)
     return template
 
 
+def _expand_prefix(prefix, environ):
+    ''' Expand an environment variable prefix, from the table of expanded prefixes
+
+    Each prefix is expanded once per value, and the expansion reused for as long as the
+    value, and the values of any variables it refers to, are unchanged.
+
+    Parameters:
+        prefix (str):
+            A single environment variable, e.g. $SAS_BASE_DIR
+        environ (dict):
+            The environment variables to expand
+
+    Return:
+        The expanded prefix, or None if the prefix is not a single defined variable
+    '''
+    name = prefix[2:-1] if prefix[1:2] == '{' else prefix[1:]
+    value = environ.get(name)
+    if value is None:
+        return None
+
+    # only single variable prefixes are added to the table
+    entry = _tree_cache.prefixes.get((name, value))
+    if entry is not None and (not entry[1] or all(environ.get(k) == v for k, v in entry[1])):
+        return entry[0]
+    if not _prefix_regex.fullmatch(prefix):
+        return None
+
+    # the values of all variables the prefix expands through
+    depends = {}
+    names = _envvar_regex.findall(value)
+    while names:
+        var = names.pop()
+        var = var[1:-1] if var.startswith('{') else var
+        if var not in depends and var != name:
+            depends[var] = environ.get(var)
+            names.extend(_envvar_regex.findall(depends[var] or ''))
+
+    expanded = _expandvars_recursive(prefix, environ)
+    _tree_cache.add_prefix((name, value), (expanded, tuple(depends.items())))
+    return expanded
+
+
+def _reservoir_sample(items, num, rng=None):
+    ''' Randomly sample items from an iterable in a single pass
+
+    Uses reservoir sampling, so only holds ``num`` items in memory, however many items
+    the iterable yields.
+
+    Parameters:
+        items (iterable):
+            The items to sample from
+        num (int):
+            The number of items to sample
+        rng (random.Random):
+            The random number generator to use.  Defaults to the global random module.
+
+    Returns:
+        A list of up to ``num`` randomly selected items, in random order
+    '''
+    rng = rng or _random
+    reservoir = []
+    for index, item in enumerate(items):
+        if index < num:
+            reservoir.append(item)
+        else:
+            slot = rng.randrange(index + 1)
+            if slot < num:
+                reservoir[slot] = item
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def _iterglob(pattern, dironly=False):
+    ''' Lazily expand a wildcard pattern, as with glob.iglob
+
+    Walks the pattern one directory level at a time with os.scandir, only descending into
+    the directories matching each level of the pattern, and yields each match as soon as
+    it is found.
+
+    Parameters:
+        pattern (str):
+            The wildcard pattern to expand
+        dironly (bool):
+            If True, only yields matching directories
+
+    Returns:
+        A generator of the matching paths
+    '''
+    dirname, name = os.path.split(pattern)
+    if not has_magic(pattern):
+        if os.path.lexists(pattern):
+            yield pattern
+        return
+
+    if not name:
+        # a trailing separator only matches directories
+        for match in _iterglob(dirname, dironly=True):
+            if os.path.isdir(match):
+                yield os.path.join(match, '')
+        return
+
+    # expand the directory part of the pattern first
+    dirs = _iterglob(dirname, dironly=True) if has_magic(dirname) else [dirname]
+    for directory in dirs:
+        if not has_magic(name):
+            match = os.path.join(directory, name)
+            if os.path.lexists(match):
+                yield match
+            continue
+
+        regex = re.compile(fnmatch.translate(name))
+        hidden = name.startswith('.')
+        try:
+            with os.scandir(directory or os.curdir) as entries:
+                for entry in entries:
+                    if (hidden or not entry.name.startswith('.')) and regex.match(entry.name):
+                        if not dironly or entry.is_dir():
+                            yield os.path.join(directory, entry.name)
+        except OSError:
+            continue
+
+
 class Path(BasePath):
     """Class for construction of paths in general.  Sets a particular template file.
 
@@ -1202,6 +2476,13 @@ class Path(BasePath):
         If True, forces svn or github software products to use any existing local Module environment paths, e.g. PLATEDESIGN_DIR
     preserve_envvars : bool | list
         Flag(s) to indicate some or all original environment variables to preserve
+    pure : bool
+        If True, resolves paths purely as strings, without checking the filesystem for
+        compressed files
+    dir_cache : bool | `.DirectoryCache`
+        If True, caches directory listings used to check for files, compression and wildcards
+    path_cache : bool | `.PathCache`
+        If True, memoizes the full paths resolved from each template and set of keyword arguments
 
     Attributes
     ----------
@@ -1211,14 +2492,17 @@ class Path(BasePath):
     """
 
     def __init__(self, release=None, public=False, mirror=False, verbose=False, force_modules=None,
-                 preserve_envvars=None):
+                 preserve_envvars=None, pure=None, dir_cache=None, isolated=None, path_cache=None):
         super(Path, self).__init__(release=release, public=public, mirror=mirror, verbose=verbose,
-                                   force_modules=force_modules, preserve_envvars=preserve_envvars)
+                                   force_modules=force_modules, preserve_envvars=preserve_envvars,
+                                   pure=pure, dir_cache=dir_cache, isolated=isolated,
+                                   path_cache=path_cache)
 
     def __repr__(self):
         rep = super().__repr__()
         return rep.replace('BasePath', 'Path')
 
+    @special_function('plateid', extract='{plateid:0>6}', array=vectorized.plateid6)
     def plateid6(self, filetype, **kwargs):
         """Print plate ID, accounting for 5-6 digit plate IDs.
 
@@ -1240,6 +2524,7 @@ class Path(BasePath):
         else:
             return "{:d}".format(plateid)
 
+    @special_function('plateid', extract='(.*)/{plateid:0>6}', array=vectorized.platedir)
     def platedir(self, filetype, **kwargs):
         """Returns plate subdirectory in :envvar:`PLATELIST_DIR` of the form: ``NNNNXX/NNNNNN``.
 
@@ -1260,6 +2545,7 @@ class Path(BasePath):
         subdir = "{:0>4d}".format(plateid100) + "XX"
         return os.path.join(subdir, "{:0>6d}".format(plateid))
 
+    @special_function('plate', array=vectorized.plategrp)
     def plategrp(self, filetype, **kwargs):
         ''' Returns plate group subdirectory
 
@@ -1282,6 +2568,7 @@ class Path(BasePath):
             return 'XX'
         return '{:0>4d}XX'.format(int(plate) // 100)
 
+    @special_function('run2d', extract='$BOSS_SPECTRO_REDUX')
     def spectrodir(self, filetype, **kwargs):
         """Returns :envvar:`SPECTRO_REDUX` or :envvar:`BOSS_SPECTRO_REDUX`
         depending on the value of `run2d`.
@@ -1299,10 +2586,11 @@ class Path(BasePath):
             Value of the appropriate environment variable.
         """
         if str(kwargs['run2d']) in ('26', '103', '104'):
-            return os.environ['SPECTRO_REDUX']
+            return self.environ['SPECTRO_REDUX']
         else:
-            return os.environ['BOSS_SPECTRO_REDUX']
+            return self.environ['BOSS_SPECTRO_REDUX']
 
+    @special_function('designid', extract='{designid:0>6}')
     def definitiondir(self, filetype, **kwargs):
         """Returns definition subdirectory in :envvar:`PLATELIST_DIR` of the form: ``NNNNXX``.
 
@@ -1324,6 +2612,7 @@ class Path(BasePath):
         subdir = "{:0>4d}".format(designid100) + "XX"
         return subdir
 
+    @special_function('healpix', extract='{healpixgrp}', array=vectorized.healpixgrp)
     def healpixgrp(self, filetype, **kwargs):
         ''' Returns HEALPIX group subdirectory
 
@@ -1345,6 +2634,7 @@ class Path(BasePath):
         subdir = "{:d}".format(healpix // 1000)
         return subdir
 
+    @special_function('cat_id', extract='{cat_id_groups}', array=vectorized.cat_id_groups)
     def cat_id_groups(self, filetype, **kwargs):
         '''
         Return a folder structure to group data together based on their catalog
@@ -1372,6 +2662,8 @@ class Path(BasePath):
             cat_id = int(kwargs['cat_id'])
         return f"{(cat_id // k) % k:0>2.0f}/{cat_id % k:0>2.0f}"
 
+    @special_function('sdss_id', extract='{sdss_id_groups}',
+                      array=vectorized.sdss_id_groups)
     def sdss_id_groups(self, filetype, **kwargs):
         '''
         Return a folder structure to group data together based on their SDSS
@@ -1395,6 +2687,7 @@ class Path(BasePath):
         return f"{(sdss_id // k) % k:0>2.0f}/{sdss_id % k:0>2.0f}"
 
 
+    @special_function('component', extract='{component_default}')
     def component_default(self, filetype, **kwargs):
         ''' Return the component name, if given.
 
@@ -1430,6 +2723,7 @@ class Path(BasePath):
         comp = kwargs.get('component', '')
         return str(comp) if comp is not None else ''
 
+    @special_function(extract='{prefix}')
     def apgprefix(self, filetype, **kwargs):
         ''' Returns APOGEE prefix using telescope/instrument.
 
@@ -1470,6 +2764,7 @@ class Path(BasePath):
 
         return ''
 
+    @special_function('telescope')
     def apginst(self, filetype, **kwargs):
         ''' Returns APOGEE "instrument" from "telescope".
 
@@ -1495,6 +2790,7 @@ class Path(BasePath):
             return instrument[telescope]
         return ''
 
+    @special_function('configid', extract='{configgrp}', array=vectorized.configgrp)
     def configgrp(self, filetype, **kwargs):
         ''' Returns configuration summary file group subdirectory
 
@@ -1517,6 +2813,7 @@ class Path(BasePath):
             return '0000XX'
         return '{:0>4d}XX'.format(int(configid) // 100)
 
+    @special_function('configid', array=vectorized.configsubmodule)
     def configsubmodule(self, filetype, **kwargs):
         ''' Returns configuration summary submodule group subdirectory
 
@@ -1539,6 +2836,7 @@ class Path(BasePath):
             return '000XXX'
         return '{:0>3d}XXX'.format(int(configid) // 1000)
 
+    @special_function('run2d', extract='{isplate}')
     def isplate(self, filetype, **kwargs):
         ''' Returns the plate flag for BOSS idlspec2d run2d versions that utilize it
 
@@ -1562,6 +2860,7 @@ class Path(BasePath):
             return 'p'
         return ''
 
+    @special_function('fieldid', 'run2d', extract='{fieldid}', array=vectorized.pad_fieldid)
     def pad_fieldid(self, filetype, **kwargs):
         ''' Returns the fieldid zero padded to its proper length for the BOSS idlspec2d run2d version
 
@@ -1592,6 +2891,7 @@ class Path(BasePath):
             return str(fieldid).zfill(6)
         return fieldid
 
+    @special_function('run2d', 'coadd', extract='{spcoaddfolder}')
     def spcoaddfolder(self, filetype, **kwargs):
         ''' Returns the reorganized subfolder structure for the BOSS idlspec2d run2d version
 
@@ -1624,6 +2924,7 @@ class Path(BasePath):
         return 'fields'
 
 
+    @special_function('run2d', 'coadd', extract='{spcoaddgrp}')
     def spcoaddgrp(self, filetype, **kwargs):
         ''' Returns the coadd group (field group analog) subfolder structure for the BOSS idlspec2d run2d version
 
@@ -1649,6 +2950,7 @@ class Path(BasePath):
             return ''
         return coaddname
 
+    @special_function('run2d', extract='{sptypefolder}')
     def sptypefolder(self, filetype, **kwargs):
         ''' Returns the reorganized subfolder structure for the BOSS idlspec2d run2d version
 
@@ -1688,6 +2990,7 @@ class Path(BasePath):
             return 'daily'
         return 'fields'
 
+    @special_function('obs', 'run2d', extract='{obs}')
     def spcoaddobs(self, filetype, **kwargs):
         ''' Returns the formatted observatory flag for custom coadds for the BOSS idlspec2d
 
@@ -1717,6 +3020,7 @@ class Path(BasePath):
             return obs
         return '_{}'.format(obs.lower())
 
+    @special_function('run2d', extract='{epochflag}')
     def epochflag(self, filetype, **kwargs):
         ''' Returns the flag for epoch coadds for the BOSS idlspec2d
 
@@ -1738,6 +3042,7 @@ class Path(BasePath):
             return ''
         return '-epoch'
 
+    @special_function('fieldid', 'run2d', extract='{fieldgrp}', array=vectorized.fieldgrp)
     def fieldgrp(self, filetype, **kwargs):
         ''' Returns the fieldid group for the BOSS idlspec2d run2d version
 
@@ -1769,6 +3074,7 @@ class Path(BasePath):
             return '{:0>3d}XXX'.format(int(fieldid) // 1000)
         return fieldid
 
+    @special_function('tileid', extract='{tilegrp}', array=vectorized.tilegrp)
     def tilegrp(self, filetype, **kwargs):
         ''' Returns LVM tile id group subdirectory
 
@@ -1839,6 +3145,7 @@ class Path(BasePath):
 
         return ""
 
+    @special_function(extract='{num}', array=vectorized.mos_target_num)
     def mos_target_num(self, filetype, **kwargs):
         """Returns the target filetype for a given MOS filetype.
 
@@ -1849,6 +3156,7 @@ class Path(BasePath):
         return self._mos_target_num_helper(filetype, zp=None, **kwargs)
 
 
+    @special_function(extract='{num}', array=vectorized.mos_target_num2)
     def mos_target_num2(self, filetype, **kwargs):
         """Returns the target filetype for a given MOS filetype.
 
@@ -1858,6 +3166,7 @@ class Path(BasePath):
 
         return self._mos_target_num_helper(filetype, zp=2, **kwargs)
 
+    @special_function(extract='{num}', array=vectorized.mos_target_num3)
     def mos_target_num3(self, filetype, **kwargs):
         """Returns the target filetype for a given MOS filetype.
 
@@ -1867,6 +3176,7 @@ class Path(BasePath):
 
         return self._mos_target_num_helper(filetype, zp=3, **kwargs)
 
+    @special_function('num', extract='{num}', array=vectorized.mos_target_num_underscore)
     def mos_target_num_underscore(self, filetype, **kwargs):
         """Returns the target filetype for a given MOS filetype.
 
@@ -0,0 +1,157 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: snapshot.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+
+import datetime
+import json
+import os
+from collections import OrderedDict
+from importlib import import_module
+
+import tree as tree_package
+import sdss_access
+from sdss_access import log
+from sdss_access.path import path as path_module
+
+"""
+Module for saving and loading on-disk snapshots of planted releases.
+
+A snapshot is a JSON file holding, for each release, the tree template table, the values
+of the environment variables set by planting the tree, and the keyword arguments of every
+template.  Loading a snapshot fills in the in-process cache of planted trees, so any later
+`.Path` for those releases is created without reading the tree configuration files.
+
+A snapshot is only loaded if it was written by the same snapshot format, ``tree`` and
+``sdss_access`` versions, and with the same ``TREE_DIR`` and ``SAS_BASE_DIR``, otherwise it
+is ignored and the tree is planted as normal.
+"""
+
+SNAPSHOT_VERSION = 1
+
+# the environment variables a snapshot depends on
+_inputs = ('TREE_DIR', 'SAS_BASE_DIR')
+
+# tree attributes not stored in a snapshot
+_skipped = ('_cfg',)
+
+
+def _get_header():
+    ''' The versions and environment a snapshot is only valid for '''
+    return {'snapshot_version': SNAPSHOT_VERSION,
+            'tree_version': tree_package.__version__,
+            'sdss_access_version': sdss_access.__version__,
+            'inputs': {i: os.environ.get(i) for i in _inputs}}
+
+
+def write_snapshot(filename, releases=None, path_class=None, preserve_envvars=None):
+    ''' Write a snapshot of planted releases to a file
+
+    Plants each release without modifying the global tree or os.environ, and writes its
+    template table, environment variables and template keywords to a JSON file.  The
+    file is written atomically, so it may be safely read by other processes.
+
+    Parameters:
+        filename (str):
+            The snapshot file to write
+        releases (list):
+            The releases to include.  Defaults to all available releases.
+        path_class (type):
+            The path class used to look up the keywords of each template.  Defaults to `.Path`.
+        preserve_envvars (bool|list):
+            Flag to indicate some or all original environment variables to preserve
+
+    Returns:
+        The list of releases written
+    '''
+    path_class = path_class or path_module.Path
+    releases = releases or path_module.BasePath.get_available_releases()
+    releases = ['sdsswork' if release.upper() == 'WORK' else release.lower().replace('-', '')
+                for release in releases]
+
+    snapshot = _get_header()
+    snapshot['class'] = '{0}.{1}'.format(path_class.__module__, path_class.__qualname__)
+    snapshot['preserve_envvars'] = preserve_envvars
+    snapshot['releases'] = OrderedDict()
+    for release in releases:
+        path = path_class(release=release, isolated=True, preserve_envvars=preserve_envvars)
+        state, environ = path_module._plant_tree(release, preserve_envvars=preserve_envvars,
+                                                 isolated=True)
+        snapshot['releases'][release] = {
+            'tree': {k: v for k, v in state.items() if k not in _skipped},
+            'environ': environ,
+            'keys': {name: [template, path.lookup_keys(name)]
+                     for name, template in path.templates.items()}}
+
+    # write to a temporary file first, so readers never see a partial snapshot
+    filename = os.path.expanduser(filename)
+    tmpname = '{0}.{1}.tmp'.format(filename, os.getpid())
+    with open(tmpname, 'w') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    os.replace(tmpname, filename)
+    return releases
+
+
+def read_snapshot(filename):
+    ''' Read a snapshot file, if it is valid for the current environment
+
+    Parameters:
+        filename (str):
+            The snapshot file to read
+
+    Returns:
+        The snapshot dictionary, or None if the file is missing, unreadable or out-of-date
+    '''
+    try:
+        with open(os.path.expanduser(filename)) as f:
+            snapshot = json.load(f, object_pairs_hook=OrderedDict)
+    except (IOError, OSError, ValueError) as e:
+        log.debug('Cannot read sdss_access snapshot {0}: {1}'.format(filename, e))
+        return None
+
+    header = _get_header()
+    stale = [k for k in header if snapshot.get(k) != header[k]]
+    if stale:
+        log.debug('Ignoring out-of-date sdss_access snapshot {0}; {1} changed'.format(
+            filename, ', '.join(stale)))
+        return None
+    return snapshot
+
+
+def load_snapshot(filename):
+    ''' Load a snapshot file into the cache of planted trees
+
+    Parameters:
+        filename (str):
+            The snapshot file to load
+
+    Returns:
+        The list of releases loaded, which is empty if the snapshot is missing or out-of-date
+    '''
+    snapshot = read_snapshot(filename)
+    if not snapshot:
+        return []
+
+    module, __, name = snapshot['class'].rpartition('.')
+    path_class = getattr(import_module(module), name, None)
+    preserve = snapshot['preserve_envvars']
+
+    for release, planted in snapshot['releases'].items():
+        state = dict(planted['tree'])
+        state['paths'] = OrderedDict(state['paths'])
+        state['environ'] = OrderedDict(state['environ'])
+        key = path_module._planted_key(release, preserve)
+        path_module._tree_cache.planted[key] = (state, dict(planted['environ']))
+        release_date = state['environ'].get('default', {}).get('release_date', 'None')
+        path_module._tree_cache.release_dates[release] = (
+            None if release_date == 'None' else datetime.date.fromisoformat(release_date))
+        if path_class is not None:
+            path_module._tree_cache.snapshot_keys[(release, path_class)] = {
+                name: (template, tuple(keys))
+                for name, (template, keys) in planted['keys'].items()}
+    return list(snapshot['releases'])
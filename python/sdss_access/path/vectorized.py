@@ -0,0 +1,382 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: vectorized.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+from string import Formatter
+
+"""
+Module for building sdss_access paths over columns of keyword values.
+
+Provides the array forms of the path template special functions, which accept NumPy
+arrays of keyword values and return arrays of strings, and the routines used by
+`.BasePath.full_many` to resolve a compiled template over whole columns at once.  NumPy
+is only imported when these are first called, not when the module is imported.
+"""
+
+_formatter = Formatter()
+
+# matches a format spec that only pads a value, e.g. "0>6" or "0>6d"
+_pad_spec = re.compile(r'^(.)?([<>^])(\d+)(d?)$')
+
+# idlspec2d run2d versions which use plate-style field ids
+_plate_run2ds = ['v6_0_1', 'v6_0_2', 'v6_0_3', 'v6_0_4']
+
+
+def import_numpy():
+    ''' Import numpy on first use, raising an error if it is not installed '''
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('numpy is required for array path generation.  Please install it.')
+    return numpy
+
+
+def _truthy(values):
+    ''' Return a boolean array of which values are not empty or zero '''
+    np = import_numpy()
+    values = np.asarray(values)
+    if values.dtype.kind in 'US':
+        return np.char.str_len(values) > 0
+    if values.dtype.kind == 'O':
+        return np.array([bool(v) for v in values.ravel()]).reshape(values.shape)
+    return values != 0
+
+
+def _int(values):
+    ''' Convert an array of values to 64-bit integers '''
+    np = import_numpy()
+    return np.asarray(values).astype(np.int64)
+
+
+def _str(values):
+    ''' Convert an array of values to strings '''
+    np = import_numpy()
+    return np.asarray(values).astype(str)
+
+
+def _pad(values, width, fill='0'):
+    ''' Pad an array of values to a given width, as with the "0>N" format spec '''
+    np = import_numpy()
+    return np.char.rjust(_str(values), width, fill)
+
+
+def _grp(values, div, width, suffix, default):
+    ''' Group integer ids into zero-padded directories, e.g. "NNNNXX", or a default if empty '''
+    np = import_numpy()
+    values = np.asarray(values)
+    truthy = _truthy(values)
+    values = _int(np.where(truthy, values, '0' if values.dtype.kind in 'US' else 0))
+    return np.where(truthy, np.char.add(_pad(values // div, width), suffix), default)
+
+
+def plateid6(filetype, **columns):
+    ''' Array form of `.Path.plateid6` '''
+    np = import_numpy()
+    plateid = _int(columns['plateid'])
+    return np.where(plateid < 10000, _pad(plateid, 6), _str(plateid))
+
+
+def platedir(filetype, **columns):
+    ''' Array form of `.Path.platedir` '''
+    np = import_numpy()
+    plateid = _int(columns['plateid'])
+    subdir = np.char.add(_pad(plateid // 100, 4), 'XX' + os.sep)
+    return np.char.add(subdir, _pad(plateid, 6))
+
+
+def plategrp(filetype, **columns):
+    ''' Array form of `.Path.plategrp` '''
+    np = import_numpy()
+    plate = columns.get('plate', columns.get('plateid', None))
+    if plate is None:
+        return 'XX'
+    truthy = _truthy(plate)
+    plate = _int(np.where(truthy, plate, 0))
+    return np.where(truthy, np.char.add(_pad(plate // 100, 4), 'XX'), 'XX')
+
+
+def healpixgrp(filetype, **columns):
+    ''' Array form of `.Path.healpixgrp` '''
+    return _str(_int(columns['healpix']) // 1000)
+
+
+def configgrp(filetype, **columns):
+    ''' Array form of `.Path.configgrp` '''
+    return _grp(columns.get('configid', 0), 100, 4, 'XX', '0000XX')
+
+
+def configsubmodule(filetype, **columns):
+    ''' Array form of `.Path.configsubmodule` '''
+    return _grp(columns.get('configid', 0), 1000, 3, 'XXX', '000XXX')
+
+
+def tilegrp(filetype, **columns):
+    ''' Array form of `.Path.tilegrp` '''
+    np = import_numpy()
+    tileid = np.asarray(columns.get('tileid', 0))
+    if tileid.dtype.kind in 'iu':
+        return _grp(tileid, 1000, 4, 'XX', '0000XX')
+    wild = np.char.find(_str(tileid), '*') >= 0
+    tilegrp = _grp(np.where(wild, '0', tileid), 1000, 4, 'XX', '0000XX')
+    tilegrp = np.where(wild, np.char.add(_str(tileid), 'XX'), tilegrp)
+    return np.where(_truthy(tileid), tilegrp, '0000XX')
+
+
+def _id_groups(ids, k=100):
+    ''' Group ids into a two-level folder structure of ``k`` folders each '''
+    np = import_numpy()
+    ids = _int(ids)
+    return np.char.add(np.char.add(_pad((ids // k) % k, 2), '/'), _pad(ids % k, 2))
+
+
+def cat_id_groups(filetype, **columns):
+    ''' Array form of `.Path.cat_id_groups` '''
+    return _id_groups(columns['cat_id'] if 'cat_id' in columns else columns['catid'])
+
+
+def sdss_id_groups(filetype, **columns):
+    ''' Array form of `.Path.sdss_id_groups` '''
+    return _id_groups(columns['sdss_id'])
+
+
+def pad_fieldid(filetype, **columns):
+    ''' Array form of `.Path.pad_fieldid` '''
+    np = import_numpy()
+    fieldid = columns.get('fieldid', None)
+    run2d = columns.get('run2d', None)
+    empty = ~_truthy(fieldid if fieldid is not None else '') & \
+        ~_truthy(run2d if run2d is not None else '')
+    fieldid = _str(fieldid if fieldid is not None else 'None')
+    padded = np.where(np.char.isnumeric(fieldid), np.char.zfill(fieldid, 6), fieldid)
+    padded = np.where(np.isin(_str(run2d if run2d is not None else ''), _plate_run2ds),
+                      fieldid, padded)
+    return np.where(empty, '', padded)
+
+
+def _run2d_ungrouped(run2d):
+    ''' Return a boolean array of which run2d versions have no field groups '''
+    np = import_numpy()
+    run2d = np.asarray(run2d)
+    if run2d.dtype.kind not in 'US':
+        raise TypeError('run2d must be a string')
+    return ((np.char.find(run2d, 'v5') >= 0) | np.isin(run2d, ['26', '103', '104']) |
+            (np.char.find(run2d, 'v6_0') >= 0) | (np.char.find(run2d, 'v6_1') >= 0))
+
+
+def fieldgrp(filetype, **columns):
+    ''' Array form of `.Path.fieldgrp` '''
+    np = import_numpy()
+    fieldid = columns.get('fieldid', '')
+    ungrouped = _run2d_ungrouped(columns.get('run2d', None)) | ~_truthy(fieldid)
+    fieldid = _str(fieldid)
+    numeric = np.char.isnumeric(fieldid)
+    grouped = _grp(np.where(numeric, fieldid, '0'), 1000, 3, 'XXX', '')
+    return np.where(ungrouped, '', np.where(numeric, grouped, fieldid))
+
+
+def _mos_target_num(columns, zp=None, prefix='-'):
+    ''' Array form of `.Path._mos_target_num_helper` '''
+    np = import_numpy()
+    ftype = np.char.lower(_str(columns.get('ftype', 'fits')))
+    if not np.isin(ftype, ['fits', 'parquet']).all():
+        raise ValueError("Invalid ftype. Must be 'fits' or 'parquet'.")
+    num = columns.get('num', None)
+    if num is None:
+        raise ValueError("Missing required keyword argument 'num'.")
+
+    num = _str(num)
+    wild = num == '*'
+    num = _int(np.where(wild, '0', num))
+    padded = _pad(num, zp) if zp is not None else _str(num)
+    value = np.where(num > 0, np.char.add(prefix, padded), '')
+    value = np.where(wild, prefix + '*', value)
+    return np.where(ftype == 'fits', value, '')
+
+
+def mos_target_num(filetype, **columns):
+    ''' Array form of `.Path.mos_target_num` '''
+    return _mos_target_num(columns)
+
+
+def mos_target_num2(filetype, **columns):
+    ''' Array form of `.Path.mos_target_num2` '''
+    return _mos_target_num(columns, zp=2)
+
+
+def mos_target_num3(filetype, **columns):
+    ''' Array form of `.Path.mos_target_num3` '''
+    return _mos_target_num(columns, zp=3)
+
+
+def mos_target_num_underscore(filetype, **columns):
+    ''' Array form of `.Path.mos_target_num_underscore` '''
+    if columns.get('num', None) is None:
+        columns['num'] = 1
+    return _mos_target_num(columns, prefix='_')
+
+
+def format_column(values, spec='', conversion=None):
+    ''' Format an array of values with a given format spec
+
+    Common format specs, i.e. none or zero-padding, are applied as array operations,
+    while any other formatting is applied per value.
+
+    Parameters:
+        values (array):
+            The values to format
+        spec (str):
+            The format spec of the template field
+        conversion (str):
+            Any conversion flag of the template field, i.e. "r", "s" or "a"
+
+    Returns:
+        An array of formatted strings
+    '''
+    np = import_numpy()
+    values = np.asarray(values)
+    if not conversion:
+        if not spec:
+            return _str(values)
+
+        match = _pad_spec.match(spec)
+        is_int = values.dtype.kind in 'iu'
+        if match and (is_int or not match.group(4)):
+            fill, align, width, __ = match.groups()
+            fill = fill or ' '
+            width = int(width)
+            if align == '>':
+                return np.char.rjust(_str(values), width, fill)
+            elif align == '<':
+                return np.char.ljust(_str(values), width, fill)
+
+    conv = {'r': repr, 's': str, 'a': ascii}.get(conversion, lambda v: v)
+    return np.array([format(conv(v), spec) for v in values.tolist()], dtype=str)
+
+
+def get_rows(columns, size):
+    ''' Convert a set of columns into a list of keyword dictionaries, one per row '''
+    np = import_numpy()
+    items = [(k, v.tolist() if isinstance(v, np.ndarray) else [v] * size)
+             for k, v in columns.items()]
+    return [dict(zip((k for k, __ in items), row)) for row in zip(*(v for __, v in items))]
+
+
+def resolve_columns(compiled, path, filetype, columns, size):
+    ''' Resolve a compiled template over columns of keyword values
+
+    Builds each part of the template as an array of strings, and joins them.  Special
+    functions with an array form are called once on the whole columns, while any
+    others are called per row.
+
+    Parameters:
+        compiled (CompiledTemplate):
+            The compiled path template
+        path (BasePath):
+            The path instance used to call any special functions
+        filetype (str):
+            The template name passed into the special functions
+        columns (dict):
+            The keyword arguments, as arrays of length ``size`` or scalars
+        size (int):
+            The number of paths to resolve
+
+    Returns:
+        An array of resolved, unnormalized, path strings
+    '''
+    np = import_numpy()
+    rows = None
+    result = np.full(size, '', dtype=str)
+    for literal, field, spec, conversion in _formatter.parse(compiled.format_string):
+        if literal:
+            result = np.char.add(result, literal)
+        if field is None:
+            continue
+
+        if field.isdigit():
+            # a special function
+            special = compiled.specials[int(field)]
+            registered = path._special_functions.get(special.__name__)
+            value = None
+            if registered and registered.array:
+                try:
+                    value = registered.array(filetype, **columns)
+                except (ValueError, TypeError, KeyError):
+                    value = None
+            if value is None:
+                rows = rows if rows is not None else get_rows(columns, size)
+                value = np.array([special(path, filetype, **row) for row in rows], dtype=str)
+        else:
+            value = columns[field]
+            if isinstance(value, np.ndarray):
+                value = format_column(value, spec, conversion)
+            else:
+                value = _formatter.format_field(_formatter.convert_field(value, conversion), spec)
+
+        result = np.char.add(result, value)
+    return result
+
+
+def normpath(paths):
+    ''' Normalize an array of paths, only calling os.path.normpath where needed '''
+    np = import_numpy()
+    if os.sep != '/':
+        return np.array([os.path.normpath(p) for p in paths.tolist()], dtype=str)
+
+    needs = ((np.char.find(paths, '//') >= 0) | (np.char.find(paths, '/.') >= 0) |
+             np.char.endswith(paths, '/') | (np.char.str_len(paths) == 0))
+    if needs.any():
+        paths = paths.copy() if paths.dtype.kind == 'U' else paths.astype(str)
+        index = np.flatnonzero(needs)
+        normed = [os.path.normpath(p) for p in paths[index].tolist()]
+        width = max(len(p) for p in normed)
+        if width > paths.dtype.itemsize // 4:
+            paths = paths.astype('<U{0}'.format(width))
+        paths[index] = normed
+    return paths
+
+
+def get_columns(table=None, **columns):
+    ''' Collect the keyword columns from a table and any keyword arguments
+
+    Parameters:
+        table (table-like):
+            A table of keyword columns, e.g. a pandas DataFrame, an astropy Table, a
+            numpy structured array or a dictionary
+        columns (dict):
+            Keyword values as arrays, lists or scalars.  These override any table columns.
+
+    Returns:
+        A tuple of the dictionary of columns, as 1-d arrays or scalars, and the
+        number of rows
+    '''
+    np = import_numpy()
+    data = {}
+    if table is not None:
+        names = table.dtype.names if isinstance(table, np.ndarray) else list(table.keys())
+        data.update((name, table[name]) for name in names)
+    data.update(columns)
+
+    size = None
+    for key, value in data.items():
+        if np.ndim(value) == 0:
+            data[key] = value.item() if isinstance(value, np.generic) else value
+            continue
+
+        value = np.asarray(value)
+        if value.ndim != 1:
+            raise ValueError('Column {0} must be one-dimensional'.format(key))
+        if size is not None and len(value) != size:
+            raise ValueError('All columns must have the same length; column {0} has '
+                             'length {1}, not {2}'.format(key, len(value), size))
+        size = len(value)
+        data[key] = value
+
+    return data, 1 if size is None else size
@@ -5,4 +5,5 @@ from .http import HttpAccess
 from .baseaccess import BaseAccess
 from .rsync import RsyncAccess
 from .curl import CurlAccess
+from .asynchttp import AsyncHttpAccess
 from .access import Access
\ No newline at end of file
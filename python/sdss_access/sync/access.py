@@ -1,11 +1,16 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 # The line above will help with 2to3 support.
-from sdss_access.sync import CurlAccess, RsyncAccess
-from sdss_access import is_posix
+from sdss_access.sync import CurlAccess, RsyncAccess, AsyncHttpAccess
+from sdss_access import is_posix, config
 
-Base = RsyncAccess if is_posix else CurlAccess
-access_mode = 'rsync' if is_posix else 'curl'
+# the access classes selectable with the access_mode config option
+_access_modes = {'rsync': RsyncAccess, 'curl': CurlAccess, 'async': AsyncHttpAccess}
+
+access_mode = config.get('access_mode') or ('rsync' if is_posix else 'curl')
+if access_mode not in _access_modes:
+    raise ValueError('access_mode must be one of {0}'.format(', '.join(_access_modes)))
+Base = _access_modes[access_mode]
 label = 'sdss_{0}'.format(access_mode)
 
 
@@ -0,0 +1,266 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+# The line above will help with 2to3 support.
+
+import asyncio
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from glob import has_magic
+from os.path import dirname, join
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+from sdss_access import AccessError
+from sdss_access.sync.baseaccess import BaseAccess
+from sdss_access.sync.curl import CurlAccess
+
+TransferResult = namedtuple('TransferResult',
+                            ['location', 'source', 'destination', 'size', 'error'])
+TransferResult.__doc__ = ''' The outcome of downloading a single file
+
+Parameters:
+    location (str):
+        The location of the file, relative to its sas module
+    source (str):
+        The url of the file
+    destination (str):
+        The local path of the file
+    size (int):
+        The number of bytes downloaded
+    error (str):
+        The reason the download failed, or None if it succeeded
+'''
+
+
+class AsyncHttpAccess(CurlAccess):
+    """Class for providing HTTP access to SDSS SAS Paths from a pool of threads
+
+    Downloads the files of the stream with blocking ``requests`` calls, run in a pool of
+    ``concurrency`` worker threads, each with its own pooled, keep-alive HTTP session,
+    instead of starting ``curl`` subprocesses.  The pool is driven from an asyncio event
+    loop only to collect each file as soon as it completes, and so `commit_async` can be
+    awaited from a running loop; the downloads themselves are not asynchronous I/O.
+    Paths with wildcards are expanded from the SAS directory listings, as in `.CurlAccess`.
+
+    Parameters
+    ----------
+    concurrency : int
+        The maximum number of files downloaded at once.  Default is 16.
+    timeout : float
+        The connect and read timeout of each request, in seconds.  Default is 60.
+    retries : int
+        The number of times to retry a request on a connection error or server error.
+        Default is 3.
+    """
+    remote_scheme = 'https'
+    access_mode = 'async'
+    _state_attrs = CurlAccess._state_attrs + ('concurrency', 'timeout', 'retries')
+
+    def __init__(self, label='sdss_async', stream_count=5, mirror=False, public=False,
+                 release=None, verbose=False, concurrency=16, timeout=60, retries=3):
+        # skip the check for the curl executable
+        super(CurlAccess, self).__init__(stream_count=stream_count, mirror=mirror, public=public,
+                                         release=release, verbose=verbose, label=label)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.results = []
+
+    def __repr__(self):
+        return '<AsyncHttpAccess(using="{0}")>'.format(self.netloc)
+
+    def _set_state(self, state):
+        ''' Set the state of a new access, with no authentication, stream or results '''
+        super(AsyncHttpAccess, self)._set_state(state)
+        self.results = []
+
+    def set_stream_task(self, task=None):
+        ''' sets the stream tasks, only listing the remote directories of wildcard paths '''
+        if task and has_magic(task['location']):
+            super(AsyncHttpAccess, self).set_stream_task(task=task)
+        else:
+            BaseAccess.set_stream_task(self, task=task)
+
+    def generate_stream_task(self, task=None, out=None):
+        ''' creates the task to put in the download stream '''
+        if not task:
+            return
+
+        if not has_magic(task['location']):
+            yield (task['sas_module'], task['location'], task['source'], task['destination'],
+                   task.get('size'))
+            return
+
+        listing = zip(self.file_size_list, self.file_date_list, self.url_list)
+        for file_size, file_date, url in listing:
+            location = url.split('/sas/')[-1]
+            destination = join(self.stream.destination, location)
+            sas_module, location = location.split('/', 1)
+            if not self.check_file_exists_locally(destination, file_size, file_date):
+                size = int(file_size) if file_size.isdigit() else None
+                yield (sas_module, location, url, destination, size)
+
+    def get_session(self):
+        ''' Return a pooled, keep-alive HTTP session for the downloads '''
+        session = requests.Session()
+        retry = Retry(total=self.retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if self.auth and self.auth.ready():
+            session.auth = (self.auth.username, self.auth.password)
+        return session
+
+    def download(self, session, task, follow_symlinks=True):
+        ''' Download the file of a stream task
+
+        Writes to a temporary file, moved into place once complete, and sets the file
+        modification time from the server, as with ``curl -R``.
+
+        Parameters
+        ----------
+        session : `requests.Session`
+            The session to download with
+        task : dict
+            The stream task, with the file source and destination
+        follow_symlinks : bool
+            If True, follows any redirects
+
+        Returns
+        -------
+        result : `TransferResult`
+            The outcome of the download
+        '''
+        source, destination = task['source'], task['destination']
+        partial = '{0}.part'.format(destination)
+        size = 0
+        try:
+            with session.get(source, stream=True, timeout=self.timeout,
+                             allow_redirects=follow_symlinks) as response:
+                response.raise_for_status()
+                os.makedirs(dirname(destination), exist_ok=True)
+                with open(partial, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1 << 20):
+                        f.write(chunk)
+                        size += len(chunk)
+                os.replace(partial, destination)
+
+                modified = response.headers.get('Last-Modified')
+                if modified:
+                    mtime = parsedate_to_datetime(modified).timestamp()
+                    os.utime(destination, (mtime, mtime))
+        except (requests.RequestException, OSError, ValueError) as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            return TransferResult(task['location'], source, destination, size, str(e))
+        return TransferResult(task['location'], source, destination, size, None)
+
+    async def commit_async(self, offset=None, limit=None, follow_symlinks=True, callback=None):
+        """ Download the files of the stream, from within a running event loop
+
+        Each file is downloaded in a worker thread of the pool, and awaited from the loop.
+
+        Parameters
+        ----------
+        offset : int
+            The index of the first stream task to download
+        limit : int
+            The maximum number of stream tasks to download
+        follow_symlinks : bool
+            If True, follows any redirects.  Default is True.
+        callback : callable
+            A function called with the `TransferResult` of each file as it completes
+
+        Returns
+        -------
+        results : list
+            The `TransferResult` of each file, in order of completion
+        """
+        if not self.stream:
+            raise AccessError('No stream to download.  Please use set_stream() first.')
+        tasks = self.stream.task[offset or 0:]
+        if limit is not None:
+            tasks = tasks[:limit]
+
+        # requests sessions are not thread-safe, so each worker thread has its own
+        local = threading.local()
+        sessions = []
+
+        def download(task):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = self.get_session()
+                sessions.append(session)
+            return self.download(session, task, follow_symlinks=follow_symlinks)
+
+        loop = asyncio.get_running_loop()
+        self.results = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor, \
+                    tqdm(total=len(tasks), unit='files', desc='Progress') as pbar:
+                futures = [loop.run_in_executor(executor, download, task) for task in tasks]
+                for future in asyncio.as_completed(futures):
+                    result = await future
+                    self.results.append(result)
+                    pbar.update(1)
+                    if result.error and self.verbose:
+                        tqdm.write('SDSS_ACCESS> Failed {0}: {1}'.format(result.source,
+                                                                         result.error))
+                    if callback:
+                        callback(result)
+        finally:
+            for session in sessions:
+                session.close()
+
+        failed = [result for result in self.results if result.error]
+        if failed:
+            print('SDSS_ACCESS> Failed! {0} of {1} files could not be downloaded.'.format(
+                len(failed), len(tasks)))
+        elif self.verbose:
+            print('SDSS_ACCESS> Done!')
+        return self.results
+
+    def commit(self, offset=None, limit=None, follow_symlinks=True, schedule=None,
+               batch_size=None, autotune=False, callback=None):
+        """ Start the download
+
+        Runs `commit_async` in a new event loop.  Within a running event loop, e.g. in
+        a Jupyter notebook, use ``await access.commit_async()`` instead.
+
+        Parameters
+        ----------
+        offset : int
+            The index of the first stream task to download
+        limit : int
+            The maximum number of stream tasks to download
+        follow_symlinks : bool
+            If True, follows any redirects.  Default is True.
+        schedule : str
+            Ignored.  Accepted for compatibility with `.BaseAccess.commit`, as every file is
+            pulled from a single pool of ``concurrency`` downloads.
+        batch_size : int
+            Ignored, as each file is scheduled on its own
+        autotune : bool
+            Ignored, as the number of downloads at once is set by ``concurrency``
+        callback : callable
+            A function called with the `TransferResult` of each file as it completes
+
+        Returns
+        -------
+        results : list
+            The `TransferResult` of each file, in order of completion
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.commit_async(offset=offset, limit=limit,
+                                                 follow_symlinks=follow_symlinks,
+                                                 callback=callback))
+        raise AccessError('An event loop is already running.  Please use '
+                          '"await access.commit_async()" instead.')
@@ -9,12 +9,16 @@ from sdss_access.sync.auth import Auth, AuthMixin
 from sdss_access.sync.stream import Stream
 from sdss_access import is_posix, AccessError
 
+# access modes downloading over https from the sas directory
+_http_modes = ('curl', 'async')
+
 
 class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
     """Class for providing Rsync or Curl access to SDSS SAS Paths
     """
     remote_scheme = None
     access_mode = 'rsync' if is_posix else 'curl'
+    _state_attrs = Path._state_attrs + ('label', 'stream_count')
 
     def __init__(self, label=None, stream_count=5, mirror=False, public=False, release=None,
                  verbose=False, force_modules=None, preserve_envvars=None):
@@ -30,6 +34,14 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
         self.verbose = verbose
         self.initial_stream = self.get_stream()
 
+    def _set_state(self, state):
+        ''' Set the state of a new access, with no authentication and a new empty stream '''
+        super(BaseAccess, self)._set_state(state)
+        self.auth = None
+        self.stream = None
+        self._stream_command = None
+        self.initial_stream = self.get_stream()
+
     def remote(self, username=None, password=None, inquire=None):
         """ Configures remote access """
         use_dtn = self.remote_scheme == 'rsync'
@@ -47,21 +59,21 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
     def add(self, filetype, **kwargs):
         """ Adds a filepath into the list of tasks to download"""
 
-        location = self.location(filetype, **kwargs)
-        sas_module, location = location.split(sep, 1) if location else (None, location)
-
         # set proper sasdir based on access method
-        sasdir = 'sas' if self.access_mode == 'curl' else ''
-        source = self.url(filetype, sasdir=sasdir, **kwargs)
+        sasdir = 'sas' if self.access_mode in _http_modes else ''
+        resolved = self.resolve(filetype, sasdir=sasdir, **kwargs)
+        if not resolved.url:
+            raise AccessError('Cannot construct url.  A path.location could not extracted. ')
+
+        location = resolved.location
+        sas_module, location = location.split(sep, 1) if location else (None, location)
+        source = resolved.url
 
         # raise error if attempting to add a software product path
         if 'svn.sdss.org' in source:
             raise AccessError('Rsync/Curl Access not allowed for svn paths.  Please use HttpAccess.')
 
-        if 'full' not in kwargs:
-            destination = self.full(filetype, **kwargs)
-        else:
-            destination = kwargs.get('full')
+        destination = resolved.full
 
         if sas_module and location and source and destination:
             self.initial_stream.append_task(
@@ -98,13 +110,16 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
                 input_type = 'location'
 
         # use the right sasdir based on mode
-        sasdir = 'sas' if self.access_mode == 'curl' else ''
+        sasdir = 'sas' if self.access_mode in _http_modes else ''
 
         # determine stream task info
         if input_type == 'filepath':
-            location = self.location('', full=path)
+            resolved = self.resolve('', sasdir=sasdir, full=path)
+            if not resolved.url:
+                raise AccessError('Cannot construct url.  A path.location could not extracted. ')
+            location = resolved.location
             sas_module, location = location.split(sep, 1) if location else (None, location)
-            source = self.url('', sasdir=sasdir, full=path)
+            source = resolved.url
             dest = path
         elif input_type == 'url':
             self.set_base_dir()
@@ -135,7 +150,7 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
             # set stream source based on access mode
             if self.access_mode == 'rsync':
                 self.stream.source = self.remote_base
-            elif self.access_mode == 'curl':
+            elif self.access_mode in _http_modes:
                 self.stream.source = join(self.remote_base, 'sas').replace(sep, '/')
 
             # set stream destination
@@ -144,7 +159,7 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
             # set client env dict based on access mode
             if self.access_mode == 'rsync':
                 key = 'RSYNC_PASSWORD'
-            elif self.access_mode == 'curl':
+            elif self.access_mode in _http_modes:
                 key = 'CURL_PASSWORD'
             self.stream.cli.env = {key: self.auth.password} if self.auth.ready() else None
 
@@ -205,11 +220,12 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
     def set_stream_task(self, task=None, out=None):
         ''' sets the path input dictionary for a task in a stream '''
         stream_has_task = False
-        for sas_module, location, source, destination in self.generate_stream_task(task=task, out=out):
+        stream_tasks = self.generate_stream_task(task=task, out=out)
+        for sas_module, location, source, destination, size in stream_tasks:
             if sas_module and location and source and destination:
                 stream_has_task = True
                 self.stream.append_task(sas_module=sas_module, location=location, source=source,
-                                        destination=destination)
+                                        destination=destination, size=size)
                 """if self.verbose:
                     print("SDSS_ACCESS> Preparing to download: %s" % join(sas_module, location))
                     print("SDSS_ACCESS> from: %s" % source)
@@ -223,12 +239,45 @@ class BaseAccess(six.with_metaclass(abc.ABCMeta, AuthMixin, Path)):
     def _get_stream_command(self):
         ''' gets the stream command used when committing the download '''
 
-    def commit(self, offset=None, limit=None, follow_symlinks: bool = True):
-        """ Start the download """
+    def commit(self, offset=None, limit=None, follow_symlinks: bool = True, schedule='static',
+               batch_size=None, autotune=False):
+        """ Start the download
+
+        Parameters
+        ----------
+        offset : int
+            The index of the first stream task to download
+        limit : int
+            The maximum number of stream tasks to download
+        follow_symlinks : bool
+            If True, follows symlinks.  Default is True.
+        schedule : str
+            How the tasks are spread over the streams.  With "static", the tasks are assigned
+            to the streams up front.  With "dynamic", each stream pulls the next batch of
+            tasks from a shared queue as soon as it finishes, listing each batch in its own
+            file in the log directory, and writing a ``report.json`` run report there.
+            Default is "static".
+        batch_size : int
+            The number of tasks per batch of the dynamic schedule.  Defaults to about four
+            batches per stream.
+        autotune : bool
+            If True, tunes the number of streams running at once, up to the
+            ``max_stream_count`` config option, from the measured throughput and error
+            rate.  Only used with the dynamic schedule.  Default is False.
+        """
 
         self.stream.command = self._get_stream_command(follow_symlinks=follow_symlinks)
         self.stream.sas_module = self._get_sas_module()
-        self.stream.append_tasks_to_streamlets(offset=offset, limit=limit)
-        self.stream.commit_streamlets()
-        self.stream.run_streamlets()
+        if schedule == 'dynamic':
+            self.stream.set_queue(offset=offset, limit=limit, batch_size=batch_size,
+                                  autotune=autotune)
+            self.stream.run_queue(autotune=autotune)
+        elif schedule == 'static' and autotune:
+            raise AccessError('autotune requires the dynamic schedule')
+        elif schedule == 'static':
+            self.stream.append_tasks_to_streamlets(offset=offset, limit=limit)
+            self.stream.commit_streamlets()
+            self.stream.run_streamlets()
+        else:
+            raise AccessError('schedule must be "dynamic" or "static"')
         self.stream.reset_streamlet()
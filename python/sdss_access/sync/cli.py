@@ -2,12 +2,13 @@ from __future__ import print_function
 
 from os import getenv, makedirs
 from os.path import exists, join, basename
-from math import log10
 from sys import exit
-from subprocess import Popen, STDOUT
+from subprocess import Popen, STDOUT, TimeoutExpired
 from shlex import split
 from tempfile import TemporaryFile
-from time import time, sleep
+from time import sleep, monotonic
+from threading import Thread
+from queue import Queue, Empty
 from glob import iglob
 from datetime import datetime
 from sdss_access import is_posix
@@ -32,6 +33,23 @@ class Cli(object):
         self.now = datetime.now().strftime("%Y%m%d")
         self.env = None
         self.verbose = verbose
+        # exit notifications of the background processes
+        self._exited = Queue()
+        self._watched = set()
+        self._finished = set()
+
+    def __getstate__(self):
+        ''' Copy or pickle the cli without the exit notifications of its background processes '''
+        state = self.__dict__.copy()
+        for attr in ('_exited', '_watched', '_finished'):
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._exited = Queue()
+        self._watched = set()
+        self._finished = set()
 
     def set_dir(self):
         if exists(self.data_dir) and self.label:
@@ -65,52 +83,127 @@ class Cli(object):
             with open(path, 'w') as file:
                 file.write("\n".join(lines) + "\n")
 
-    def get_background_process(self, command=None, logfile=None, errfile=None, pause=1):
+    def get_background_process(self, command=None, logfile=None, errfile=None, pause=0):
         if command:
             if self.verbose:
                 print("SDSS_ACCESS> [background]$ %r" % command)
             stdout = logfile if logfile else STDOUT
             stderr = errfile if errfile else STDOUT
             background_process = Popen(split(str(command), posix=is_posix), env=self.env if 'rsync -' in command else None, stdout=stdout, stderr=stderr)
+            self.watch(background_process)
             if pause:
                 sleep(pause)
         else:
             background_process = None
         return background_process
 
+    def watch(self, process=None):
+        ''' Start a thread notifying the exit of a background process
+
+        The thread blocks in `~subprocess.Popen.wait`, i.e. ``waitpid``, and puts the process
+        on the exit queue read by `wait_for_any` as soon as it exits.
+        '''
+        if process is not None and process not in self._watched:
+            self._watched.add(process)
+            Thread(target=self._notify_exit, args=(process,), daemon=True).start()
+
+    def _notify_exit(self, process):
+        process.wait()
+        self._exited.put(process)
+
     def wait_for_processes(self, processes, pause=5, n_tasks=None, tasks_per_stream=None):
-        running_processes = [process.poll() is None for process in processes]
-        pause_count = 0
+        ''' Wait for the background processes to finish
+
+        Updates the progress bar as soon as each process exits.
+
+        Parameters
+        ----------
+        processes : list
+            The background processes
+        pause : float
+            The interval between the status messages when verbose, in seconds.  Default is 5.
+        n_tasks : int
+            The total number of files downloaded by the processes
+        tasks_per_stream : list
+            The number of files downloaded by each process
+        '''
+        start = monotonic()
+        running = [process for process in processes if process is not None]
         postfix = {'n_files': n_tasks, 'n_streams': len(processes)} if n_tasks else {}
 
         # set a progress bar to monitor files/streams
         with tqdm(total=n_tasks, unit='files', desc='Progress', postfix=postfix) as pbar:
-            while any(running_processes):
-                running_count = sum(running_processes)
-                finished_files = sum([tasks_per_stream[i]
-                                      for i, r in enumerate(running_processes) if r is False])
-                running_files = n_tasks - finished_files
-
+            while running:
                 if self.verbose:
+                    running_files = sum(tasks_per_stream[processes.index(process)]
+                                        for process in running) if tasks_per_stream else None
                     tqdm.write("SDSS_ACCESS> syncing... please wait for {0} rsync streams ({1} "
-                               "files) to complete [running for {2} seconds]".format(running_count,
-                                                                                     running_files,
-                                                                                     pause_count * pause))
+                               "files) to complete [running for {2} seconds]".format(
+                                   len(running), running_files, int(monotonic() - start)))
 
-                # update the process polling
-                sleep(pause)
-                running_processes = [process.poll() is None for process in processes]
-                pause_count += 1
+                # wake on the next process exit, or for the next status message
+                for process in self.wait_for_any(running, timeout=pause if self.verbose else None):
+                    running.remove(process)
+                    if tasks_per_stream:
+                        pbar.update(tasks_per_stream[processes.index(process)])
 
-                # count the number of downloaded files
-                done_files = sum([tasks_per_stream[i]
-                                  for i, r in enumerate(running_processes) if r is False])
-                new_files = done_files - finished_files
+        self.returncode = tuple([process.returncode for process in processes])
+        self.forget_finished()
 
-                # update the progress bar
-                pbar.update(new_files)
+    def forget_finished(self):
+        ''' Forget the exit notifications of all background processes which have exited
 
-        self.returncode = tuple([process.returncode for process in processes])
+        Exits collected by `wait_for_any` are kept for any later call until then, so call
+        this once done waiting, to only keep track of the processes still running.
+        '''
+        while True:
+            try:
+                self._finished.add(self._exited.get_nowait())
+            except Empty:
+                break
+        self._watched.difference_update(self._finished)
+        self._finished.clear()
+
+    def wait_for_any(self, processes, timeout=None):
+        ''' Wait until at least one of the processes exits
+
+        Blocks on the exit notifications of the processes, see `watch`, rather than polling.
+
+        Parameters
+        ----------
+        processes : list
+            The running background processes
+        timeout : float
+            The maximum time to wait, in seconds.  Default is to wait until a process exits.
+
+        Returns
+        -------
+        finished : list
+            The processes that have exited, empty if the timeout was reached
+        '''
+        for process in processes:
+            self.watch(process)
+        deadline = None if timeout is None else monotonic() + timeout
+        finished = [process for process in processes if process in self._finished]
+        while not finished:
+            try:
+                wait = None if deadline is None else max(deadline - monotonic(), 0)
+                self._finished.add(self._exited.get(timeout=wait))
+            except Empty:
+                return []
+            finished = [process for process in processes if process in self._finished]
+
+        # collect any other processes which have exited meanwhile
+        while True:
+            try:
+                self._finished.add(self._exited.get_nowait())
+            except Empty:
+                break
+        finished = [process for process in processes if process in self._finished]
+        for process in finished:
+            self._finished.discard(process)
+            self._watched.discard(process)
+        return finished
 
     def foreground_run(self, command, test=False, logger=None, logall=False, message=None, outname=None, errname=None):
         """A convenient wrapper to log and perform system calls.
@@ -165,18 +258,12 @@ class Cli(object):
         else:
             errfile = open(errname, 'w+')
         proc = Popen(split(str(command)), stdout=outfile, stderr=errfile, env=self.env)
-        tstart = time()
-        while proc.poll() is None:
-            elapsed = time() - tstart
-            if elapsed > 500000:
-                message = "Process still running after more than 5 days!"
-                proc.kill()
-                break
-            tsleep = 10**(int(log10(elapsed)) - 1)
-            if tsleep < 1:
-                tsleep = 1
-            sleep(tsleep)
-        # proc.wait()
+        try:
+            proc.wait(timeout=500000)
+        except TimeoutExpired:
+            message = "Process still running after more than 5 days!"
+            proc.kill()
+            proc.wait()
         status = proc.returncode
         outfile.seek(0)
         out = outfile.read()
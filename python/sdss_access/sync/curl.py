@@ -156,7 +156,9 @@ class CurlAccess(BaseAccess):
                     destination = destination.replace('/', sep)
                     location = location.replace('/', sep)
                 if not self.check_file_exists_locally(destination, file_size, file_date):
-                    yield (location, source, destination)
+                    sas_module = location.split(sep, 1)[0]
+                    size = int(file_size) if file_size.isdigit() else None
+                    yield (sas_module, location, source, destination, size)
 
     def check_file_exists_locally(self, destination=None, url_file_size=None, url_file_time=None):
         """Checks if file already exists (note that time check is only accurate to the minute)"""
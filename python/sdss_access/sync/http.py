@@ -11,7 +11,7 @@ except:
 
 from os import makedirs
 from os.path import isfile, exists, dirname
-from sdss_access import Path
+from sdss_access import Path, AccessError
 from sdss_access.sync.auth import Auth, AuthMixin
 from tqdm import tqdm
 
@@ -19,6 +19,7 @@ from tqdm import tqdm
 class HttpAccess(AuthMixin, Path):
     """Class for providing HTTP access via urllib.request (python3) or urllib2 (python2) to SDSS SAS Paths
     """
+    _state_attrs = Path._state_attrs + ('label',)
 
     def __init__(self, verbose=None, public=None, release=None, label='sdss_http'):
         super(HttpAccess, self).__init__(public=public, release=release, verbose=verbose)
@@ -26,6 +27,11 @@ class HttpAccess(AuthMixin, Path):
         self.label = label
         self._remote = False
 
+    def _set_state(self, state):
+        ''' Set the state of a new access, configured for local access '''
+        super(HttpAccess, self)._set_state(state)
+        self._remote = False
+
     def remote(self, remote_base=None, username=None, password=None):
         """
         Configures remote access
@@ -71,11 +77,16 @@ class HttpAccess(AuthMixin, Path):
         Path templates are defined in $DIMAGE_DIR/data/dimage_paths.ini
         """
 
-        path = self.full(filetype, **kwargs)
+        # resolve the local path and url together when downloading
+        resolved = self.resolve(filetype, **kwargs) if self._remote else None
+        path = resolved.full if resolved else self.full(filetype, **kwargs)
 
         if path:
             if self._remote:
-                self.download_url_to_path(self.url(filetype, **kwargs), path)
+                if not resolved.url:
+                    raise AccessError('Cannot construct url.  '
+                                      'A path.location could not extracted. ')
+                self.download_url_to_path(resolved.url, path)
         else:
             print("There is no file with filetype=%r to access in the tree module loaded" % filetype)
 
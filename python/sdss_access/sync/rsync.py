@@ -51,10 +51,15 @@ class RsyncAccess(BaseAccess):
                         location = search(r"^.*\s{1,3}(.+)$", result).group(1)
                     except Exception:
                         location = None
+                    # the file length, from the %l of the output format
+                    try:
+                        size = int(search(r"^\S+\s+(\d+)\s", result).group(1))
+                    except Exception:
+                        size = None
                     if  sas_module and location and location.count('/') == depth:
                         source = join(self.stream.source, sas_module, location) if self.remote_base else None
                         destination = join(self.stream.destination, sas_module, location)
-                        yield (sas_module, location, source, destination)
+                        yield (sas_module, location, source, destination, size)
 
     def set_stream_task(self, task=None):
         out = self.get_task_out(task=task)
@@ -0,0 +1,292 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+# The line above will help with 2to3 support.
+
+import heapq
+import time
+from collections import deque
+from math import ceil
+
+
+def get_batch_size(n_tasks, stream_count, batches_per_stream=4):
+    ''' Get the default number of tasks per batch of a task queue
+
+    Parameters:
+        n_tasks (int):
+            The number of tasks to download
+        stream_count (int):
+            The number of streams pulling from the queue
+        batches_per_stream (int):
+            The number of batches to aim for per stream.  Default is 4.
+
+    Returns:
+        The number of tasks per batch, at least 1
+    '''
+    return max(1, int(ceil(n_tasks / (max(stream_count, 1) * batches_per_stream))))
+
+
+def fill_sizes(sizes=None):
+    ''' Fill in the unknown sizes of a list of files
+
+    Parameters:
+        sizes (list):
+            The size of each file, or None where unknown
+
+    Returns:
+        The sizes, with the unknown sizes set to the mean of the known sizes, or None if no
+        size is known
+    '''
+    known = [size for size in sizes or [] if size is not None]
+    if not known:
+        return None
+    mean = sum(known) / len(known)
+    return [mean if size is None else size for size in sizes]
+
+
+def lpt_partition(sizes, n_bins):
+    ''' Partition files into bins of roughly equal total size
+
+    Uses the largest processing time first (LPT) rule, placing each file, largest first,
+    into the bin with the smallest total so far.  The largest bin is at most 4/3 of the
+    optimal.
+
+    Parameters:
+        sizes (list):
+            The size of each file
+        n_bins (int):
+            The number of bins
+
+    Returns:
+        A list of the indices of the files in each bin, in their original order
+    '''
+    n_bins = max(1, n_bins)
+    bins = [[] for _ in range(n_bins)]
+    loads = [(0, index) for index in range(n_bins)]
+    for item in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        load, index = heapq.heappop(loads)
+        bins[index].append(item)
+        heapq.heappush(loads, (load + sizes[item], index))
+    return [sorted(items) for items in bins]
+
+
+class TaskQueue(object):
+    """A shared queue of batches of stream tasks
+
+    Each stream pulls the next batch from the queue as soon as its previous batch finishes,
+    so a stream downloading a few large files does not hold back the rest of the download.
+    When the sizes of the files are known, the largest files are queued first, and each
+    batch holds at most ``batch_size`` tasks and about an equal share of the bytes, so
+    large files get a batch of their own.
+
+    Parameters
+    ----------
+    tasks : list
+        The stream tasks to download, in order
+    batch_size : int
+        The number of tasks in each batch.  Defaults to about ``batches_per_stream`` batches
+        per stream, see `get_batch_size`.
+    stream_count : int
+        The number of streams pulling from the queue
+    sizes : list
+        The size of the file of each task, or None where unknown
+    """
+    batches_per_stream = 4
+
+    def __init__(self, tasks=None, batch_size=None, stream_count=1, sizes=None):
+        tasks = list(tasks or [])
+        self.n_tasks = len(tasks)
+        self.batch_size = batch_size or get_batch_size(self.n_tasks, stream_count,
+                                                       self.batches_per_stream)
+        sizes = fill_sizes(sizes)
+        self.sized = sizes is not None
+        if sizes:
+            self.batches = deque(self._get_sized_batches(tasks, sizes, stream_count))
+        else:
+            self.batches = deque(tasks[i:i + self.batch_size]
+                                 for i in range(0, self.n_tasks, self.batch_size))
+
+    def _get_sized_batches(self, tasks, sizes, stream_count):
+        ''' Split the tasks, largest first, into batches capped in count and bytes '''
+        max_bytes = sum(sizes) / (max(stream_count, 1) * self.batches_per_stream)
+        batch, batch_bytes = [], 0
+        for index in sorted(range(len(tasks)), key=lambda i: sizes[i], reverse=True):
+            if batch and (len(batch) >= self.batch_size or batch_bytes + sizes[index] > max_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(tasks[index])
+            batch_bytes += sizes[index]
+        if batch:
+            yield batch
+
+    def __repr__(self):
+        return '<TaskQueue(n_tasks={0}, n_batches={1})>'.format(self.n_tasks, len(self))
+
+    def __len__(self):
+        return len(self.batches)
+
+    def get(self):
+        ''' Pull the next batch of tasks, or None if the queue is empty '''
+        return self.batches.popleft() if self.batches else None
+
+
+class Autotuner(object):
+    """Tunes the number of concurrent streams from the measured throughput
+
+    Measures the aggregate throughput and error rate of the completed batches over windows
+    of at least ``interval`` seconds.  At the end of each window, the number of streams is
+    stepped up or down by one, up to ``max_level``: it keeps moving in the same direction
+    while the throughput improves by more than ``tolerance``, reverses when the throughput
+    drops by more than ``tolerance``, and otherwise steps down, as more streams bring no
+    gain.  It also steps down when the error rate exceeds ``max_error_rate``.  Each window
+    is recorded in `curve`.
+
+    Parameters
+    ----------
+    level : int
+        The initial number of streams
+    max_level : int
+        The maximum number of streams
+    enabled : bool
+        If False, only measures the throughput, keeping the number of streams fixed.
+        Default is True.
+    interval : float
+        The minimum length of a measurement window, in seconds.  Default is 5.
+    max_error_rate : float
+        The fraction of failed batches above which the number of streams is reduced.
+        Default is 0.1.
+    tolerance : float
+        The relative drop in throughput treated as a decrease.  Default is 0.05.
+    clock : callable
+        The clock used to time the windows.  Default is `time.monotonic`.
+    """
+
+    def __init__(self, level=1, max_level=5, enabled=True, interval=5.0, max_error_rate=0.1,
+                 tolerance=0.05, clock=time.monotonic):
+        self.max_level = max(1, max_level)
+        self.level = min(max(1, level), self.max_level)
+        self.enabled = enabled
+        self.interval = interval
+        self.max_error_rate = max_error_rate
+        self.tolerance = tolerance
+        self.clock = clock
+        self.direction = 1
+        self.curve = []
+        self.total = 0
+        self.start = self.clock()
+        self._reset_window(self.start)
+        self._last_throughput = None
+
+    def __repr__(self):
+        return '<Autotuner(level={0}, max_level={1})>'.format(self.level, self.max_level)
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._amount = 0
+        self._done = 0
+        self._errors = 0
+
+    def _record(self, now):
+        ''' Record the throughput and error rate of the current window '''
+        elapsed = now - self._window_start
+        point = {'time': now - self.start, 'level': self.level,
+                 'throughput': self._amount / elapsed if elapsed > 0 else None,
+                 'error_rate': self._errors / self._done}
+        self.curve.append(point)
+        self.total += self._amount
+        self._reset_window(now)
+        return point
+
+    def update(self, amount=0, error=False):
+        ''' Record a completed batch
+
+        Parameters:
+            amount (float):
+                The number of bytes, or files, transferred by the batch
+            error (bool):
+                If True, the batch failed
+
+        Returns:
+            The number of streams to run
+        '''
+        self._amount += amount
+        self._done += 1
+        self._errors += bool(error)
+        now = self.clock()
+        if now - self._window_start < self.interval or now <= self._window_start:
+            return self.level
+
+        point = self._record(now)
+        if self.enabled:
+            last = self._last_throughput
+            if point['error_rate'] > self.max_error_rate:
+                self.direction = -1
+            elif last is not None and point['throughput'] < last * (1 - self.tolerance):
+                self.direction = -self.direction
+            elif last is not None and point['throughput'] <= last * (1 + self.tolerance):
+                # no gain from the last step, so prefer fewer streams
+                self.direction = -1
+            self.level = min(max(1, self.level + self.direction), self.max_level)
+        self._last_throughput = point['throughput']
+        return self.level
+
+    def finish(self):
+        ''' Record the last, partial, window, and return the overall throughput '''
+        now = self.clock()
+        if self._done:
+            self._record(now)
+        elapsed = now - self.start
+        return self.total / elapsed if elapsed > 0 else None
+
+
+def simulate_makespan(durations, stream_count, schedule='dynamic', batch_size=1, overhead=0.0,
+                      sized=False):
+    ''' Simulate the time to download a set of files over several streams
+
+    Replays the assignment of files to streams, without transferring anything.  The
+    ``static`` schedule assigns the files to the streams up front, as
+    `.Stream.append_tasks_to_streamlets`.  The ``dynamic`` schedule pulls batches of files
+    from a `TaskQueue` onto the first stream to become free.
+
+    Parameters:
+        durations (list):
+            The transfer time of each file, e.g. its size over the bandwidth of a stream
+        stream_count (int):
+            The number of streams
+        schedule (str):
+            The scheduling method, "static" or "dynamic".  Default is "dynamic".
+        batch_size (int):
+            The number of files per batch of the dynamic schedule.  Default is 1.
+        overhead (float):
+            The time to start each process, paid once per stream with the static schedule
+            and once per batch with the dynamic schedule.  Default is 0.
+        sized (bool):
+            If True, the schedules know the size of each file, taken as its duration.  The
+            static schedule then balances the streams with `lpt_partition` rather than
+            round-robin, and the dynamic schedule queues the largest files first.
+
+    Returns:
+        The makespan, the time until the last stream finishes
+    '''
+    durations = list(durations)
+    if not durations:
+        return 0.0
+
+    stream_count = min(stream_count, len(durations))
+    if schedule == 'static' and sized:
+        bins = lpt_partition(durations, stream_count)
+        return max(sum(durations[i] for i in items) + overhead for items in bins)
+    elif schedule == 'static':
+        # append_streamlet increments the streamlet index before each assignment
+        loads = [0.0] * stream_count
+        for index, duration in enumerate(durations):
+            loads[(index + 1) % stream_count] += duration
+        return max(load + overhead for load in loads)
+    elif schedule == 'dynamic':
+        queue = TaskQueue(durations, batch_size=batch_size, stream_count=stream_count,
+                          sizes=durations if sized else None)
+        free = [0.0] * stream_count
+        batch = queue.get()
+        while batch is not None:
+            heapq.heappush(free, heapq.heappop(free) + overhead + sum(batch))
+            batch = queue.get()
+        return max(free)
+    raise ValueError('schedule must be "static" or "dynamic"')
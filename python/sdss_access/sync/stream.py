@@ -2,18 +2,24 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 # The line above will help with 2to3 support.
 
 import re
+import json
 from sdss_access.sync import Cli
+from sdss_access.sync.scheduler import TaskQueue, Autotuner, fill_sizes, lpt_partition
 from random import shuffle
 from os.path import sep, join
-from sdss_access import is_posix
+from sdss_access import is_posix, config
+from tqdm import tqdm
 
 
 class Stream(object):
 
     max_stream_count = 5
 
-    def __init__(self, stream_count=None, verbose=False):
+    def __init__(self, stream_count=None, verbose=False, max_stream_count=None):
         self.verbose = verbose
+        # the upper bound on the number of streams, from the config file by default
+        self.max_stream_count = int(max_stream_count or config.get('max_stream_count') or
+                                    self.max_stream_count)
         try:
             self.stream_count = min(int(stream_count), self.max_stream_count)
         except Exception:
@@ -25,6 +31,8 @@ class Stream(object):
         self.env = None
         self.source = None
         self.destination = None
+        self.queue = None
+        self.report = None
         self.cli = Cli(verbose=verbose)
 
     def reset(self):
@@ -35,7 +43,7 @@ class Stream(object):
         self.task = []
 
     def reset_streamlet(self):
-        for index in range(0, self.stream_count):
+        for index in range(0, len(self.streamlet)):
             self.set_streamlet(index=index, sas_module=[], location=[], source=[], destination=[])
 
     def set_streamlet(self, index=None, sas_module=None, location=None, source=None, destination=None):
@@ -87,12 +95,17 @@ class Stream(object):
         subset = filter(lambda i: r.search(i), locations)
         self.task = [self.task[locations.index(s)] for s in subset]
 
-    def append_task(self, sas_module=None, location=None, source=None, destination=None):
+    def append_task(self, sas_module=None, location=None, source=None, destination=None,
+                    size=None):
         if sas_module and location and source and destination:
             task = {'sas_module': sas_module, 'location': location, 'source': source,
-                    'destination': destination, 'exists': None}
+                    'destination': destination, 'exists': None, 'size': size}
             self.task.append(task)
 
+    def get_sizes(self, tasks=None):
+        ''' gets the file sizes of the tasks, with unknown sizes filled in, or None if unknown '''
+        return fill_sizes([task.get('size') for task in tasks])
+
     def append_tasks_to_streamlets(self, offset=None, limit=None):
         tasks = []
         ntasks = 0
@@ -102,8 +115,16 @@ class Stream(object):
                 ntasks += 1
             if limit is not None and ntasks >= limit:
                 break
-        for task in tasks:
-            self.append_streamlet(task=task)
+
+        # balance the bytes of the streamlets when the file sizes are known
+        sizes = self.get_sizes(tasks)
+        if sizes and self.stream_count:
+            for index, items in enumerate(lpt_partition(sizes, self.stream_count)):
+                for item in items:
+                    self.append_streamlet(index=index, task=tasks[item])
+        else:
+            for task in tasks:
+                self.append_streamlet(task=task)
 
     def append_streamlet(self, index=None, task=None):
         streamlet = self.get_streamlet(index=index)
@@ -129,16 +150,20 @@ class Stream(object):
             streamlet['command'] = self.command.format(path=path_txt, sas_module=self.sas_module,
                                                         source=self.source, destination=self.destination)
 
-            if 'rsync -' in self.command:
-                lines = [location for location in streamlet['location']]
+            self.cli.write_lines(path=path_txt, lines=self.get_lines(streamlet['location']))
+
+    def get_lines(self, locations=None):
+        ''' gets the lines of the file list read by the stream command '''
+        if 'rsync -' in self.command:
+            lines = [location for location in locations]
+        else:
+            if not is_posix:
+                lines = ['url ' + join(self.source, location).replace(sep,'/')+'\n'+'output ' +
+                        join(self.destination, location) for location in locations]
             else:
-                if not is_posix:
-                    lines = ['url ' + join(self.source, location).replace(sep,'/')+'\n'+'output ' +
-                            join(self.destination, location) for location in streamlet['location']]
-                else:
-                    lines = ['url ' + join(self.source, location)+'\n'+'output ' +
-                            join(self.destination, location) for location in streamlet['location']]
-            self.cli.write_lines(path=path_txt, lines=lines)
+                lines = ['url ' + join(self.source, location)+'\n'+'output ' +
+                        join(self.destination, location) for location in locations]
+        return lines
 
     def run_streamlets(self):
         for streamlet in self.streamlet:
@@ -155,8 +180,12 @@ class Stream(object):
         self.cli.wait_for_processes(list(streamlet['process'] for streamlet in self.streamlet),
                                     n_tasks=len(self.task), tasks_per_stream=tasks_per_stream)
 
+        self.report_streamlets(self.streamlet)
+
+    def report_streamlets(self, streamlets=None):
+        ''' reports the outcome of the streams and closes their log files '''
         if any(self.cli.returncode):
-            path = self.streamlet[0]['path'][:-3]
+            path = streamlets[0]['path'][:-3]
             if self.verbose:
                 print("SDSS_ACCESS> return code {returncode}".format(
                     returncode=self.cli.returncode))
@@ -164,6 +193,114 @@ class Stream(object):
         else:
             print("SDSS_ACCESS> Done!")
 
-        for streamlet in self.streamlet:
-            streamlet['logfile'].close()
-            streamlet['errfile'].close()
+        for streamlet in streamlets:
+            if streamlet.get('logfile'):
+                streamlet['logfile'].close()
+                streamlet['errfile'].close()
+
+    def set_queue(self, offset=None, limit=None, batch_size=None, autotune=False):
+        ''' sets a shared queue of task batches, pulled by the streams as they finish '''
+        tasks = self.task[offset or 0:]
+        if limit is not None:
+            tasks = tasks[:limit]
+        stream_count = self.max_stream_count if autotune else self.stream_count
+        self.queue = TaskQueue(tasks, batch_size=batch_size, stream_count=stream_count,
+                               sizes=[task.get('size') for task in tasks])
+
+    def start_batch(self, streamlet=None):
+        ''' starts the stream command on the next batch of tasks in the queue '''
+        batch = self.queue.get() if self.queue else None
+        if not batch:
+            streamlet['process'] = None
+            return None
+
+        if not streamlet.get('logfile'):
+            streamlet['logfile'] = open("{0}.log".format(streamlet['path']), "w")
+            streamlet['errfile'] = open("{0}.err".format(streamlet['path']), "w")
+            if self.verbose:
+                print("SDSS_ACCESS> stream %s logging to %s" % (streamlet['index'],
+                                                                 streamlet['logfile'].name))
+
+        for key in ('sas_module', 'location', 'source', 'destination'):
+            streamlet[key].extend(task[key] for task in batch)
+        streamlet['batch'].append(len(batch))
+        streamlet['current'] = batch
+        path_txt = "{0}_{1:03d}.txt".format(streamlet['path'], len(streamlet['batch']))
+        streamlet['command'] = self.command.format(path=path_txt, sas_module=self.sas_module,
+                                                   source=self.source,
+                                                   destination=self.destination)
+        lines = self.get_lines([task['location'] for task in batch])
+        self.cli.write_lines(path=path_txt, lines=lines)
+        streamlet['process'] = self.cli.get_background_process(
+            streamlet['command'], logfile=streamlet['logfile'], errfile=streamlet['errfile'])
+        return streamlet['process']
+
+    def run_queue(self, autotune=False):
+        ''' runs the streams, each starting on the next batch in the queue as soon as it finishes
+
+        Each batch is listed in its own ``<label>_<stream>_<batch>.txt`` file in the log
+        directory.  With autotune, the number of streams running at once is tuned between one
+        and max_stream_count from the measured throughput, see `.Autotuner`.  The throughput
+        of each measurement window and the final number of streams are kept in the run
+        report, also written to ``report.json`` in the log directory.
+        '''
+        if not self.command or not self.queue:
+            return
+
+        self.cli.set_dir()
+        max_level = min(self.max_stream_count if autotune else self.stream_count, len(self.queue))
+        for index in range(len(self.streamlet), max_level):
+            self.streamlet.append({'index': index, 'sas_module': [], 'location': [], 'source': [],
+                                   'destination': []})
+        streamlets = self.streamlet[:max_level]
+        for streamlet in streamlets:
+            streamlet['path'] = self.cli.get_path(index=streamlet['index'])
+            streamlet['logfile'] = streamlet['errfile'] = None
+            streamlet['batch'] = []
+
+        n_tasks = self.queue.n_tasks
+        sized = self.queue.sized
+        tuner = Autotuner(level=self.stream_count, max_level=max_level, enabled=autotune)
+        returncode = []
+        idle = streamlets[::-1]
+        running = {}
+        postfix = {'n_files': n_tasks, 'n_streams': max_level}
+        with tqdm(total=n_tasks, unit='files', desc='Progress', postfix=postfix) as pbar:
+            while True:
+                # start streams on the next batches, up to the tuned number of streams
+                while idle and len(running) < tuner.level and self.start_batch(idle[-1]):
+                    streamlet = idle.pop()
+                    running[streamlet['process']] = streamlet
+                if not running:
+                    break
+
+                for process in self.cli.wait_for_any(list(running)):
+                    streamlet = running.pop(process)
+                    idle.append(streamlet)
+                    returncode.append(process.returncode)
+                    batch = streamlet['current']
+                    pbar.update(len(batch))
+                    amount = sum(task.get('size') or 0 for task in batch) if sized else len(batch)
+                    tuner.update(amount, error=bool(process.returncode))
+
+        throughput = tuner.finish()
+        self.cli.forget_finished()
+        self.cli.returncode = tuple(returncode)
+        self.queue = None
+        self.report = {'n_files': n_tasks, 'n_batches': len(returncode),
+                       'elapsed': tuner.clock() - tuner.start,
+                       'unit': 'bytes' if sized else 'files',
+                       'throughput': throughput, 'autotune': autotune, 'stream_count': tuner.level,
+                       'max_stream_count': max_level, 'curve': tuner.curve,
+                       'returncode': self.cli.returncode}
+        self.write_report()
+        if autotune or self.verbose:
+            print("SDSS_ACCESS> {0} streams, {1:.3g} {2}/s".format(
+                tuner.level, throughput or 0, self.report['unit']))
+        self.report_streamlets([streamlet for streamlet in streamlets if streamlet['batch']])
+
+    def write_report(self):
+        ''' writes the run report to the log directory '''
+        if self.report and self.cli.dir:
+            with open(join(self.cli.dir, 'report.json'), 'w') as f:
+                json.dump(self.report, f, indent=2)
@@ -94,7 +94,8 @@ def inittask(expdata):
     ''' fixture to yield expected initial stream task based on test data '''
 
     task = [{'sas_module': expdata['sas_module'], 'location': expdata['location'],
-             'source': expdata['source'], 'destination': expdata['destination'], 'exists': None}]
+             'source': expdata['source'], 'destination': expdata['destination'], 'exists': None,
+             'size': None}]
     yield task
     task = None
 
@@ -0,0 +1,65 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_import.py
+# Project: misc
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import re
+import subprocess
+import sys
+import pytest
+
+
+def run_python(code, *options):
+    ''' run python code in a fresh interpreter and return the result '''
+    return subprocess.run([sys.executable, *options, '-c', code], capture_output=True,
+                          text=True, check=True)
+
+
+def import_time():
+    ''' the cumulative import time of sdss_access, in microseconds '''
+    result = run_python('import sdss_access', '-X', 'importtime')
+    match = re.search(r'import time:\s+\d+ \|\s+(\d+) \| sdss_access$', result.stderr, re.M)
+    return int(match.group(1))
+
+
+class TestLazyImport(object):
+
+    def test_nothing_loaded(self):
+        result = run_python('import sys, sdss_access; '
+                            'print(sorted(m for m in sys.modules if m.split(".")[0] in '
+                            '("tree", "sdsstools", "requests", "tqdm", "sdss_access")))')
+        assert result.stdout.strip() == "['sdss_access']"
+
+    def test_path(self):
+        result = run_python('import sys, sdss_access; path = sdss_access.Path(release="dr17"); '
+                            'print(path.release, "sdss_access.sync" in sys.modules, '
+                            'sdss_access.tree is sdss_access.path.path.tree)')
+        assert result.stdout.split() == ['dr17', 'False', 'True']
+
+    @pytest.mark.parametrize('name', ['Path', 'AccessError', 'Access', 'HttpAccess', 'RsyncAccess',
+                                      'CurlAccess', 'BaseAccess', 'tree', 'log', 'config',
+                                      '__version__'])
+    def test_attributes(self, name):
+        import sdss_access
+        assert getattr(sdss_access, name) is not None
+        assert name in dir(sdss_access)
+
+    def test_missing(self):
+        import sdss_access
+        with pytest.raises(AttributeError, match='has no attribute'):
+            sdss_access.NotAThing
+
+
+@pytest.mark.slow
+def test_benchmark_import():
+    ''' benchmark the import time of sdss_access, against importing the tree '''
+    after = min(import_time() for __ in range(5))
+    before = min(int(re.search(r'(\d+) \| tree$', run_python('import tree', '-X', 'importtime').stderr,
+                               re.M).group(1)) for __ in range(5))
+    print('\nimport time: {0} us for the tree, {1} us for sdss_access'.format(before, after))
+    assert after < 50000
+    assert after * 10 < before
@@ -0,0 +1,236 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_cache.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import os
+import glob
+import pytest
+from sdss_access.path import Path
+from sdss_access.path.cache import LRUCache, DirectoryCache, PathCache
+
+
+class FakeTimer(object):
+    ''' a manually advanced clock '''
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+cube = {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG'}
+
+
+@pytest.fixture()
+def files(tmp_path):
+    ''' fixture to create a directory of test files '''
+    for name in ['a.fits', 'b.fits.gz', 'c.fits', '.hidden.fits']:
+        (tmp_path / name).touch()
+    (tmp_path / 'sub').mkdir()
+    yield tmp_path
+
+
+class TestLRUCache(object):
+
+    def test_get_set(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.cache_info() == (1, 1, 2, 1)
+
+    def test_evict(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')
+        cache['c'] = 3
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert len(cache) == 2
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = LRUCache(ttl=10, timer=timer)
+        cache['a'] = 1
+        timer.now = 9
+        assert cache['a'] == 1
+        timer.now = 10
+        with pytest.raises(KeyError):
+            cache['a']
+        assert cache.misses == 1
+
+    def test_get_or_set(self):
+        cache = LRUCache()
+        assert cache.get_or_set('a', lambda: 1) == 1
+        assert cache.get_or_set('a', lambda: 2) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache['a'] = 1
+        cache.get('a')
+        cache.clear()
+        assert cache.cache_info() == (0, 0, 128, 0)
+
+
+class TestDirectoryCache(object):
+
+    def test_isfile(self, files):
+        cache = DirectoryCache()
+        assert cache.isfile(str(files / 'a.fits'))
+        assert not cache.isfile(str(files / 'sub'))
+        assert not cache.isfile(str(files / 'd.fits'))
+        assert not cache.isfile(str(files / 'nodir' / 'a.fits'))
+        assert cache.cache_info().misses == 2
+        assert cache.cache_info().hits == 2
+
+    @pytest.mark.parametrize('pattern', ['*.fits', '*', '.*', 'b.fits*', 'c.fits', 'd.fits',
+                                         's*/*', 'nodir/*'])
+    def test_glob(self, files, pattern):
+        cache = DirectoryCache()
+        pattern = str(files / pattern)
+        assert sorted(cache.glob(pattern)) == sorted(glob.glob(pattern))
+
+    def test_ttl(self, files):
+        timer = FakeTimer()
+        cache = DirectoryCache(ttl=60, timer=timer)
+        assert not cache.isfile(str(files / 'd.fits'))
+        (files / 'd.fits').touch()
+        assert not cache.isfile(str(files / 'd.fits'))
+        timer.now = 60
+        assert cache.isfile(str(files / 'd.fits'))
+
+
+class TestPathCache(object):
+
+    def test_default(self, path):
+        assert path.dir_cache is None
+
+    def test_shared(self):
+        cache = DirectoryCache(maxsize=10)
+        path = Path(release='DR17', dir_cache=cache)
+        assert path.dir_cache is cache
+
+    def test_compression(self, files, mocker):
+        path = Path(release='DR17')
+        paths = [str(files / p) for p in ['a.fits', 'a.fits.gz', 'b.fits', 'c.fits.fz', 'd.fits']]
+        exp = [path._check_compression(p) for p in paths]
+
+        path = Path(release='DR17', dir_cache=True)
+        spy = mocker.spy(os, 'scandir')
+        assert [path._check_compression(p) for p in paths] == exp
+        assert path.resolve_compression(paths) == exp
+        assert spy.call_count == 1
+        assert path.dir_cache.cache_info().hits == len(paths)
+
+    def test_exists_expand(self, files):
+        path = Path(release='DR17', dir_cache=True)
+        assert path.exists('', full=str(files / 'a.fits'))
+        assert not path.exists('', full=str(files / 'd.fits'))
+        assert sorted(path.expand('', full=str(files / '*.fits'))) == \
+            sorted(str(files / p) for p in ['a.fits', 'b.fits.gz', 'c.fits'])
+        assert path.dir_cache.cache_info().misses == 1
+
+
+class TestMemoizedPaths(object):
+
+    def test_default(self, path):
+        assert path.path_cache is None
+
+    def test_shared(self):
+        cache = PathCache(maxsize=10)
+        path = Path(release='DR17', path_cache=cache)
+        assert path.path_cache is cache
+
+    def test_hits(self):
+        exp = Path(release='DR17').full('mangacube', **cube)
+        path = Path(release='DR17', path_cache=True)
+        assert path.full('mangacube', **cube) == exp
+        assert path.full('mangacube', **dict(reversed(list(cube.items())))) == exp
+        assert path.path_cache.cache_info()[:2] == (1, 1)
+
+    def test_normalized(self):
+        path = Path(release='DR17', path_cache=True)
+        exp = path.full('mangacube', **cube)
+        assert path.full('mangacube', **dict(cube, plate='8485', ifu='1901')) == exp
+        assert path.full('mangacube', pure=True, **cube) == exp
+        assert path.path_cache.cache_info()[:2] == (2, 1)
+
+    def test_resolve(self):
+        exp = Path(release='DR17').resolve('mangacube', **cube)
+        path = Path(release='DR17', path_cache=True)
+        assert path.resolve('mangacube', **cube) == exp
+        assert path.resolve('mangacube', **dict(cube, plate='8485')) == exp
+        assert path.url('mangacube', **cube) == exp.url
+        assert path.path_cache.cache_info()[:2] == (1, 2)
+        base_dir = os.path.join(os.environ['SAS_BASE_DIR'], 'dr17')
+        assert path.resolve('mangacube', base_dir=base_dir, **cube).location.startswith('manga/')
+
+    def test_resolve_compression(self, files):
+        path = Path(release='DR17', path_cache=True, isolated=True)
+        path.add_temp_path('testfile', '$TEST_DIR/{name}.fits', envvar_path=str(files))
+        assert path.resolve('testfile', name='d').full == str(files / 'd.fits')
+        (files / 'd.fits.gz').touch()
+        assert path.resolve('testfile', name='d').full == str(files / 'd.fits.gz')
+        assert path.resolve('testfile', name='d', pure=True).full == str(files / 'd.fits')
+        assert path.path_cache.cache_info().hits == 2
+
+    def test_resolve_product_root(self, monkeypatch, tmp_path):
+        path = Path(release='DR17', path_cache=True)
+        monkeypatch.setitem(path.templates, 'testfile', str(tmp_path / 'data' / '{name}.fits'))
+        monkeypatch.setenv('PRODUCT_ROOT', str(tmp_path))
+        assert path.resolve('testfile', name='b').location == 'data/b.fits'
+        path.product_root = None
+        assert path.resolve('testfile', name='b').location == 'data/b.fits'
+        assert path.product_root == str(tmp_path)
+        monkeypatch.setenv('PRODUCT_ROOT', str(tmp_path / 'data'))
+        assert path.resolve('testfile', name='b').location == 'b.fits'
+
+    def test_unhashable(self):
+        path = Path(release='DR17', path_cache=True)
+        exp = path.full('mangacube', **cube)
+        assert path.full('mangacube', extra=[1], **cube) == exp
+        assert len(path.path_cache) == 1
+
+    def test_compression(self, files, mocker):
+        path = Path(release='DR17', path_cache=True, isolated=True)
+        path.add_temp_path('testfile', '$TEST_DIR/{name}.fits', envvar_path=str(files))
+        spy = mocker.spy(path, '_check_compression')
+        assert path.full('testfile', name='b') == str(files / 'b.fits.gz')
+        assert path.full('testfile', name='d') == str(files / 'd.fits')
+        (files / 'd.fits.gz').touch()
+        assert path.full('testfile', name='d') == str(files / 'd.fits.gz')
+        assert spy.call_count == 3
+        assert path.path_cache.cache_info().hits == 1
+
+    def test_template_changed(self):
+        path = Path(release='DR17', path_cache=True)
+        path.full('mangacube', **cube)
+        path.templates = dict(path.templates, mangacube='$MANGA_SPECTRO_REDUX/{drpver}/{plate}.fits')
+        assert path.full('mangacube', **cube).endswith('v2_4_3/8485.fits')
+
+    @pytest.mark.parametrize('reset', [lambda p: p.replant_tree('dr17'),
+                                       lambda p: p.set_base_dir('/tmp/sas'),
+                                       lambda p: p.add_temp_path('testfile', '$SAS_BASE_DIR/{name}'),
+                                       lambda p: setattr(p, 'force_modules', True)],
+                             ids=['replant', 'base_dir', 'temp_path', 'force_modules'])
+    def test_invalidate(self, reset):
+        path = Path(release='DR17', path_cache=True)
+        path.full('mangacube', **cube)
+        assert len(path.path_cache) == 1
+        reset(path)
+        assert len(path.path_cache) == 0
+
+    def test_releases(self):
+        cache = PathCache()
+        dr17 = Path(release='DR17', path_cache=cache, isolated=True)
+        work = Path(release='sdsswork', path_cache=cache, isolated=True)
+        assert dr17.full('allCal', apred='r12') != work.full('allCal', apred='r12')
+        assert dr17.full('allCal', apred='r12') == Path(release='DR17').full('allCal', apred='r12')
+        assert cache.cache_info()[:2] == (1, 2)
@@ -0,0 +1,266 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_compiled.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import os
+import pathlib
+import time
+import pytest
+from sdss_access.path import Path
+from sdss_access.path.compiled import CompiledTemplate, CompiledExtractor
+
+
+def get_kwargs(path, name):
+    ''' yield sets of test keyword arguments for a given path name '''
+    keys = path.lookup_keys(name)
+    yield {k: 1234 for k in keys}
+    yield {k: '1234' for k in keys}
+    special = {'telescope': 'apo25m', 'instrument': 'apogee-n', 'run2d': 'v6_1_3',
+               'coadd': 'allepoch', 'obs': 'apo', 'ftype': 'fits', 'num': 3}
+    yield {**{k: '1234' for k in keys}, **special}
+
+
+@pytest.mark.parametrize('release', ['dr17', 'sdsswork'])
+def test_compiled_matches_uncompiled(release):
+    ''' test the compiled templates resolve the same paths as the raw templates '''
+    path = Path(release=release)
+    for name in path.templates:
+        for kwargs in get_kwargs(path, name):
+            try:
+                exp = path._full_uncompiled(name, **kwargs)
+            except Exception:
+                continue
+            assert path.full(name, **kwargs) == exp
+            break
+
+
+class TestCompiled(object):
+
+    def test_compiled_template(self, path):
+        compiled = path._get_compiled('plateLines')
+        assert isinstance(compiled, CompiledTemplate)
+        assert compiled.keys == {'plateid'}
+        assert [s.__name__ for s in compiled.specials] == ['platedir', 'plateid6']
+        assert '$' not in compiled.format_string
+        assert path._get_compiled('plateLines') is compiled
+
+    def test_missing_keys(self, path):
+        with pytest.raises(KeyError, match='Missing required keyword arguments:'):
+            path.full('plateLines')
+
+    def test_template_change(self, path, monkeypatch, tmp_path):
+        path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+        monkeypatch.setitem(path.templates, 'mangacube', str(tmp_path / '{plate}.fits'))
+        full = path.full('mangacube', plate=8485)
+        assert full == str(tmp_path / '8485.fits')
+
+    def test_replant(self, path, monkeypatch, tmp_path):
+        full = path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+        assert full.startswith(os.environ['SAS_BASE_DIR'])
+        monkeypatch.setenv('SAS_BASE_DIR', str(tmp_path))
+        path.replant_tree()
+        full = path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+        assert full.startswith(str(tmp_path))
+
+    @pytest.mark.parametrize('path_cache', [False, True])
+    def test_environ_change(self, monkeypatch, tmp_path, path_cache):
+        path = Path(release='dr17', path_cache=path_cache)
+        kwargs = dict(drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+        path.full('mangacube', **kwargs)
+        path.url('mangacube', **kwargs)
+        redux = os.path.join(os.environ['SAS_BASE_DIR'], 'test', 'redux')
+        monkeypatch.setenv('MANGA_SPECTRO_REDUX', redux)
+        assert path.full('mangacube', **kwargs).startswith(redux)
+        assert path.location('mangacube', **kwargs).startswith('test/redux/v2_4_3')
+        assert '/test/redux/v2_4_3' in path.url('mangacube', **kwargs)
+        monkeypatch.setenv('SAS_BASE_DIR', str(tmp_path))
+        monkeypatch.delenv('MANGA_SPECTRO_REDUX')
+        full = path.full('mangacube', **kwargs)
+        assert full == path._full_uncompiled('mangacube', **kwargs)
+
+    def test_environ_change_classify(self, path, monkeypatch, tmp_path):
+        kwargs = dict(drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+        path.classify(path.full('mangacube', **kwargs))
+        monkeypatch.setenv('MANGA_SPECTRO_REDUX', str(tmp_path / 'redux'))
+        full = path.full('mangacube', **kwargs)
+        assert path.extract('mangacube', full)['plate'] == '8485'
+        assert 'mangacube' in [match.name for match in path.classify(full)]
+
+    def test_force_module(self, path, mocker):
+        spy = mocker.spy(path, '_full_uncompiled')
+        path.full('mangapreimg', designid=8405, designgrp='D0084XX', mangaid='1-42007',
+                  force_module=True)
+        assert spy.call_count == 1
+
+
+class TestCompiledExtractor(object):
+
+    def test_compiled_extractor(self, path):
+        extractor = path._get_extractor('mangacube')
+        assert isinstance(extractor, CompiledExtractor)
+        assert ('drpver',) in extractor.groups
+        assert path._get_extractor('mangacube') is extractor
+
+    def test_no_keywords(self, path):
+        assert path._get_extractor('platePlans') is None
+        assert path.extract_many('platePlans', ['a', 'b']) is None
+
+    def test_no_extract_template(self):
+        path = Path(release='sdsswork')
+        full = path.full('confSummary', obs='apo', configid=1234, pure=True)
+        assert path._get_extractor('confSummary') is None
+        assert path.extract('confSummary', full) is None
+        assert path.extract_many('confSummary', [full]) is None
+
+    def test_replant(self, path, monkeypatch, tmp_path):
+        extractor = path._get_extractor('mangacube')
+        monkeypatch.setenv('SAS_BASE_DIR', str(tmp_path))
+        path.replant_tree()
+        assert path._get_extractor('mangacube') is not extractor
+        full = path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+        assert path.extract('mangacube', full)['plate'] == '8485'
+
+    def test_extract_many(self, path):
+        fulls = [path.full('mangacube', drpver='v2_4_3', plate=plate, ifu=ifu, wave='LOG')
+                 for plate, ifu in [(8485, 1901), (7443, 12701)]]
+        examples = fulls + ['/not/a/manga/path.fits', pathlib.Path(fulls[0])]
+        columns = path.extract_many('mangacube', examples)
+        assert columns == {'drpver': ['v2_4_3', 'v2_4_3', None, 'v2_4_3'],
+                           'plate': ['8485', '7443', None, '8485'],
+                           'ifu': ['1901', '12701', None, '1901'],
+                           'wave': ['LOG', 'LOG', None, 'LOG']}
+
+    def test_extract_many_matches_extract(self):
+        path = Path(release='dr17')
+        for name in path.templates:
+            kwargs = next(get_kwargs(path, name))
+            try:
+                full = path.full(name, **kwargs)
+                exp = path.extract(name, full)
+            except Exception:
+                continue
+            columns = path.extract_many(name, [full, full])
+            assert columns == ({k: [v, v] for k, v in exp.items()} if exp is not None else None)
+
+
+def calls_per_second(func, number=2000):
+    ''' time a function and return the calls per second '''
+    start = time.perf_counter()
+    for __ in range(number):
+        func()
+    return number / (time.perf_counter() - start)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('name, kwargs',
+                         [('mangacube', {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG'}),
+                          ('plateLines', {'plateid': 8485})],
+                         ids=['mangacube', 'plateLines'])
+def test_benchmark_full(path, monkeypatch, name, kwargs):
+    ''' benchmark the calls per second of the compiled and uncompiled templates '''
+    # isolate the template resolution from the filesystem compression check
+    monkeypatch.setattr(path, '_check_compression', lambda template: template)
+    # take the best of several interleaved runs, to smooth out any load on the machine
+    before = after = 0
+    for __ in range(7):
+        before = max(before, calls_per_second(lambda: path._full_uncompiled(name, **kwargs)))
+        after = max(after, calls_per_second(lambda: path.full(name, **kwargs)))
+    print('\n{0} resolution: {1:.0f} calls/s before, {2:.0f} calls/s after'.format(
+        name, before, after))
+
+    # the compiled path still checks the current values of the template environment variables
+    assert after > 1.25 * before
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('force_module', [False, True], ids=['compiled', 'module'])
+def test_benchmark_path_cache(force_module):
+    ''' benchmark resolving paths through the path cache against resolving them each time '''
+    kwargs = {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG', 'pure': True,
+              'force_module': force_module}
+    path = Path(release='dr17')
+    cached = Path(release='dr17', path_cache=True)
+
+    before = after = 0
+    for __ in range(7):
+        before = max(before, calls_per_second(lambda: path.resolve('mangacube', **kwargs)))
+        after = max(after, calls_per_second(lambda: cached.resolve('mangacube', **kwargs)))
+    print('\nmangacube resolve: {0:.0f} calls/s uncached, {1:.0f} calls/s cached'.format(
+        before, after))
+
+    assert cached.resolve('mangacube', **kwargs) == path.resolve('mangacube', **kwargs)
+    assert after > 1.25 * before
+
+
+@pytest.mark.slow
+def test_benchmark_extract(path):
+    ''' benchmark extract_many against looping over the uncompiled extract '''
+    fulls = [path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=ifu, wave='LOG', pure=True)
+             for ifu in range(20000)]
+
+    start = time.perf_counter()
+    exp = [path.extract('mangacube', full) for full in fulls]
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = path.extract_many('mangacube', fulls)
+    after = time.perf_counter() - start
+    print('\nmangacube: {0:.0f} paths/s with extract, {1:.0f} paths/s with extract_many'.format(
+        len(fulls) / before, len(fulls) / after))
+
+    assert columns['ifu'] == [e['ifu'] for e in exp]
+    assert before > after
+
+
+@pytest.mark.slow
+def test_benchmark_classify():
+    ''' benchmark classifying paths against trying extract with every template '''
+    path = Path(release='dr17')
+    fulls = [path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=ifu, wave='LOG', pure=True)
+             for ifu in range(200)]
+
+    def brute(full):
+        return [name for name in path.templates if path.extract(name, full)]
+
+    start = time.perf_counter()
+    exp = [brute(full) for full in fulls]
+    before = time.perf_counter() - start
+
+    path.classify(fulls[0])
+    start = time.perf_counter()
+    matches = path.classify_many(fulls)
+    after = time.perf_counter() - start
+    print('\nclassify: {0:.0f} paths/s with extract, {1:.0f} paths/s with classify_many'.format(
+        len(fulls) / before, len(fulls) / after))
+
+    assert all('mangacube' in e for e in exp)
+    assert all(m[0].name == 'mangacube' for m in matches)
+    assert before > 10 * after
+
+
+@pytest.mark.slow
+def test_benchmark_construct(monkeypatch):
+    ''' benchmark constructing paths for already planted releases against replanting the tree '''
+    from sdss_access.path import path as pathmod
+    for release in ['dr17', 'sdsswork']:
+        Path(release=release)
+
+    after = calls_per_second(lambda: Path(release='dr17') and Path(release='sdsswork'), number=200)
+    plant_tree = pathmod._plant_tree
+
+    def replant_tree(release, preserve_envvars=None, isolated=False):
+        ''' replant the tree from its configuration on every call '''
+        pathmod._tree_cache.clear()
+        return plant_tree(release, preserve_envvars=preserve_envvars, isolated=isolated)
+
+    monkeypatch.setattr(pathmod, '_tree_cache', pathmod._TreeCache())
+    monkeypatch.setattr(pathmod, '_plant_tree', replant_tree)
+    before = calls_per_second(lambda: Path(release='dr17') and Path(release='sdsswork'), number=20)
+    print('\nPath construction: {0:.0f} us before, {1:.0f} us after'.format(
+        0.5e6 / before, 0.5e6 / after))
+    assert after > 20 * before
@@ -0,0 +1,131 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_parallel.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import os
+import copy
+import pickle
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from sdss_access import tree, RsyncAccess, HttpAccess
+from sdss_access.path import Path
+from sdss_access.path import path as path_module
+from sdss_access.path.parallel import map_paths
+
+
+cube = {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG'}
+
+
+def restore(path):
+    ''' rebuild a path from its pickled compact state '''
+    return type(path).from_state(pickle.loads(pickle.dumps(path.get_state())))
+
+
+class TestState(object):
+
+    @pytest.mark.parametrize('isolated', [False, True])
+    @pytest.mark.parametrize('release', ['dr17', 'sdsswork'])
+    def test_roundtrip(self, release, isolated):
+        path = Path(release=release, isolated=isolated)
+        unpickled = restore(path)
+        assert unpickled.isolated is True
+        assert unpickled.release == path.release
+        assert unpickled.public == path.public
+        assert unpickled.templates == path.templates
+        for name in ['allCal', 'spAll', 'allPlates']:
+            kwargs = {k: '1234' for k in path.lookup_keys(name)}
+            assert unpickled.full(name, **kwargs) == path.full(name, **kwargs)
+            assert unpickled.url(name, **kwargs) == path.url(name, **kwargs)
+
+    def test_no_replant(self, mocker):
+        path = Path(release='dr17')
+        path.full('mangacube', **cube)
+        data = pickle.dumps(path.get_state())
+        replant = mocker.spy(tree, 'replant_tree')
+        compile_spy = mocker.spy(path_module, 'compile_template')
+        unpickled = Path.from_state(pickle.loads(data))
+        assert unpickled.full('mangacube', **cube) == path.full('mangacube', **cube)
+        assert replant.call_count == 0
+        assert compile_spy.call_count == 0
+
+    def test_options(self):
+        path = Path(release='dr17', pure=True, path_cache=True)
+        path.set_base_dir('/tmp/sas')
+        unpickled = restore(path)
+        assert unpickled.pure is True
+        assert unpickled.base_dir == '/tmp/sas/'
+        assert unpickled.path_cache is not path.path_cache
+        assert unpickled.path_cache.maxsize == path.path_cache.maxsize
+        assert unpickled.dir_cache is None
+
+    def test_environ(self):
+        path = Path(release='dr17')
+        unpickled = restore(path)
+        assert unpickled.environ['MANGA_SPECTRO_REDUX'] == os.environ['MANGA_SPECTRO_REDUX']
+        assert 'PATH' not in unpickled.environ
+
+    def test_temp_path(self):
+        path = Path(release='dr17', isolated=True)
+        path.add_temp_path('testFile', '$TEST_PICKLE_DIR/test_file_{ver}.fits', envvar_path='/tmp/p/')
+        unpickled = restore(path)
+        assert unpickled.full('testFile', ver=1) == '/tmp/p/test_file_1.fits'
+
+    @pytest.mark.parametrize('cls', [RsyncAccess, HttpAccess])
+    def test_access(self, cls):
+        access = cls(release='dr17', label='test_pickle')
+        unpickled = restore(access)
+        assert type(unpickled) is cls
+        assert unpickled.label == 'test_pickle'
+        assert unpickled.url('mangacube', **cube) == access.url('mangacube', **cube)
+        if cls is RsyncAccess:
+            assert unpickled.auth is None
+            unpickled.add('mangacube', **cube)
+            assert len(unpickled.initial_stream.task) == 1
+            assert not access.initial_stream.task
+
+
+class TestCopy(object):
+
+    @pytest.mark.parametrize('copier', [copy.copy, copy.deepcopy])
+    def test_path(self, copier):
+        path = Path(release='dr17')
+        copied = copier(path)
+        assert copied.isolated is False
+        assert copied.environ is os.environ
+        assert copied.full('mangacube', **cube) == path.full('mangacube', **cube)
+
+    def test_access(self):
+        access = RsyncAccess(release='dr17', label='test_copy')
+        access.auth = 'auth'
+        access.add('mangacube', **cube)
+        copied = copy.deepcopy(access)
+        assert copied.isolated is False
+        assert copied.auth == 'auth'
+        assert len(copied.initial_stream.task) == 1
+
+
+class TestMapPaths(object):
+
+    rows = [dict(cube, ifu=ifu) for ifu in range(1901, 1931)]
+
+    @pytest.mark.parametrize('method', ['full', 'url', 'location'])
+    def test_map(self, method):
+        path = Path(release='dr17')
+        exp = [getattr(path, method)('mangacube', **row) for row in self.rows]
+        assert map_paths(path, 'mangacube', self.rows, method=method, chunksize=7, max_workers=2) == exp
+
+    def test_executor(self):
+        path = Path(release='dr17')
+        exp = [path.full('mangacube', **row) for row in self.rows]
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+            assert map_paths(path, 'mangacube', self.rows, chunksize=10, executor=pool) == exp
+
+    def test_empty(self):
+        assert map_paths(Path(release='dr17'), 'mangacube', []) == []
@@ -13,9 +13,13 @@ import os
 import re
 import pytest
 import datetime
+import random
+import collections
 from sdss_access import tree
-from sdss_access.path import Path
-from sdss_access.path.path import check_public_release
+from sdss_access.path import Path, AccessError
+from sdss_access.path.path import check_public_release, special_function, clear_tree_cache
+from sdss_access.path.path import _expandvars, _expandvars_recursive, _plant_tree
+from sdss_access.path import path as path_module
 from tests.conftest import gzcompress, gzuncompress
 
 
@@ -51,6 +55,51 @@ class TestPath(object):
         realkeys = path.lookup_keys(name)
         assert set(keys) == set(realkeys)
 
+    def test_lookup_keys_cached(self, path, mocker):
+        keys = path.lookup_keys('plateLines')
+        spy = mocker.spy(path, '_check_special_kwargs')
+        assert path.lookup_keys('plateLines') == keys
+        assert spy.call_count == 0
+
+        # replanting the tree resets the cache
+        path.replant_tree()
+        assert path.lookup_keys('plateLines') == keys
+        assert spy.call_count == 1
+
+    def test_lookup_keys_temp_path(self, path):
+        path.add_temp_path('testFile', '$LVM_DATA_S/test_file_{ver}.fits')
+        assert path.lookup_keys('testFile') == ['ver']
+        path.add_temp_path('testFile', '$LVM_DATA_S/test_file_{ver}_{num}.fits')
+        assert set(path.lookup_keys('testFile')) == {'ver', 'num'}
+
+    def test_special_registry(self, path, mocker):
+        assert path._special_functions['platedir'].keys == ('plateid',)
+        assert path._special_functions['apgprefix'].keys == ()
+        spy = mocker.spy(path, '_find_source')
+        path.replant_tree()
+        assert path.lookup_keys('plateLines') == ['plateid']
+        assert spy.call_count == 0
+
+    def test_special_registry_subclass(self, monkeypatch):
+        class MyPath(Path):
+            @special_function('plateid', extract='{plateid}')
+            def myplate(self, filetype, **kwargs):
+                return str(kwargs['plateid'])
+
+            def plateid6(self, filetype, **kwargs):
+                return '{0:0>6d}'.format(int(kwargs['plateid']))
+
+        assert 'myplate' in MyPath._special_functions
+        assert 'plateid6' not in MyPath._special_functions
+        assert 'plateid6' in Path._special_functions
+
+        path = MyPath(release='dr17')
+        monkeypatch.setitem(path.templates, 'test', '$SAS_BASE_DIR/@myplate|/{mjd}.fits')
+        assert set(path.lookup_keys('test')) == {'plateid', 'mjd'}
+        assert path.full('test', plateid=1234, mjd=55555).endswith('/1234/55555.fits')
+        assert path.extract('test', path.full('test', plateid=1234, mjd=55555)) == \
+            {'plateid': '1234', 'mjd': '55555'}
+
     @pytest.mark.parametrize('name, special, keys, exp',
                              [('plateLines', '@platedir', {'plateid': 8485},
                                '0084XX/008485/plateLines-008485.png'),
@@ -156,9 +205,75 @@ class TestPath(object):
         realkeys = pp.extract(name, fullpath)
         assert keys == realkeys
 
+    @pytest.mark.parametrize('name, example, keys',
+                             [('mangacube', 'dr17/manga/spectro/redux/v2_4_3/8485/stack/manga-8485-1901-LOGCUBE.fits.gz',
+                               {'drpver': 'v2_4_3', 'plate': '8485', 'ifu': '1901', 'wave': 'LOG'}),
+                              ('spec-lite', 'dr17/eboss/spectro/redux/v5_10_0/spectra/lite/3606/spec-3606-55182-0537.fits',
+                               {'fiberid': '0537', 'mjd': '55182', 'plateid': '3606', 'run2d': 'v5_10_0'})],
+                             ids=['mangacube', 'speclite'])
+    def test_classify(self, path, name, example, keys):
+        fullpath = os.path.join(os.environ['SAS_BASE_DIR'], example)
+        matches = path.classify(fullpath)
+        assert matches[0].name == name
+        assert matches[0].kwargs == keys
+
+    @pytest.mark.parametrize('name, kwargs',
+                             [('spAll', {'run2d': 'v6_2_0'}),
+                              ('spAll', {'run2d': 'v5_13_2'}),
+                              ('fieldlist', {'run2d': 'v6_0_9'}),
+                              ('spAllField', {'run2d': 'v6_2_0', 'fieldid': 1234, 'mjd': 59000}),
+                              ('spAllField', {'run2d': 'v6_0_9', 'fieldid': 1234, 'mjd': 59000})],
+                             ids=['spall', 'spall_nofolder', 'fieldlist_nofolder', 'spallfield',
+                                  'spallfield_nofolder'])
+    def test_classify_sptypefolder(self, name, kwargs):
+        path = Path(release='sdsswork')
+        assert '@sptypefolder' in path.templates[name]
+        full = path.full(name, pure=True, **kwargs)
+        matches = path.classify(full)
+        assert matches[0].name == name
+        assert matches[0].kwargs == {k: str(v).zfill(6) if k == 'fieldid' else str(v)
+                                     for k, v in kwargs.items()}
+        assert path.extract(name, full) == matches[0].kwargs
+
+    def test_classify_rank(self):
+        ''' templates matching more of the path literally rank first '''
+        path = Path(release='sdsswork')
+        full = path.full('spAllField', pure=True, run2d='v6_0_9', fieldid=1234, mjd=59000)
+        names = [match.name for match in path.classify(full)]
+        assert names[0] == 'spAllField'
+        assert 'spAll' in names
+
+    def test_classify_nomatch(self, path):
+        assert path.classify('/not/an/sdss/file.fits') == []
+
+    def test_classify_many(self, path):
+        fulls = [path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=ifu, wave='LOG')
+                 for ifu in [1901, 1902]]
+        fulls.append(path.full('mangarss', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG'))
+        matches = path.classify_many(fulls)
+        assert [m[0].name for m in matches] == ['mangacube', 'mangacube', 'mangarss']
+        assert matches[1][0].kwargs['ifu'] == '1902'
+
+    def test_classifier_many(self, path):
+        classifier = path._get_classifier()
+        cube = path._remove_compression(path.full('mangacube', drpver='v2_4_3', plate=8485,
+                                                  ifu=1901, wave='LOG', pure=True))
+        classifier.add_literal('testLiteral', '/test/literal.fits')
+        matches = classifier.classify_many([cube, '/test/literal.fits', '/not/an/sdss/file'])
+        assert matches[0][0].name == 'mangacube'
+        assert matches[1] == [('testLiteral', {})]
+        assert matches[2] == []
+        assert classifier.classify(cube) == matches[0]
+
+    def test_classify_temp_path(self, path):
+        path.classify('/not/an/sdss/file.fits')
+        path.add_temp_path('testFile', '$SAS_BASE_DIR/test/test_file_{ver}.fits')
+        matches = path.classify(os.path.join(os.environ['SAS_BASE_DIR'], 'test/test_file_1.fits'))
+        assert matches == [('testFile', {'ver': '1'})]
+
     def test_extract_source(self, path):
-        code = path._find_source(path.full)
-        assert 'def full(self' in code
+        code = path._find_source(path._full_uncompiled)
+        assert 'def _full_uncompiled(self' in code
         assert 'template = self._call_special_functions' in code
 
     def full(self, path, name='mangacube'):
@@ -185,6 +300,71 @@ class TestPath(object):
         url = path.url('', full=full)
         assert 'https://data.sdss.org/sas/dr17/manga/spectro/redux/' in url
 
+    @pytest.mark.parametrize('name, kwargs',
+                             [('mangacube', {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG'}),
+                              ('plateLines', {'plateid': 8485}),
+                              ('spAll', {'run2d': 'v5_13_2'})])
+    def test_resolve(self, path, name, kwargs, mocker):
+        exp = (path.full(name, **kwargs), path.location(name, **kwargs), path.url(name, **kwargs))
+        spy = mocker.spy(path, '_resolve_full')
+        resolved = path.resolve(name, **kwargs)
+        assert spy.call_count == 1
+        assert (resolved.full, resolved.location, resolved.url) == exp
+        assert resolved.sas_module == resolved.location.split(os.sep)[0]
+
+    def test_resolve_full(self, path):
+        full = self.full(path)
+        resolved = path.resolve('', full=full)
+        assert resolved.full == full
+        assert resolved.location == path.location('', full=full)
+        assert resolved.url == path.url('', full=full)
+
+    def test_resolve_svn_tags(self):
+        path = Path(release='DR15')
+        kwargs = {'designid': 8405, 'designgrp': 'D0084XX', 'mangaid': '1-42007'}
+        resolved = path.resolve('mangapreimg', **kwargs)
+        assert resolved.full == path.full('mangapreimg', **kwargs)
+        assert resolved.location == path.location('mangapreimg', **kwargs)
+        assert resolved.url == path.url('mangapreimg', **kwargs)
+        assert 'mangapreim/tags/v2_5/data' in resolved.url
+
+    def test_location_base_dir(self, path):
+        base_dir = path.base_dir
+        assert base_dir == os.environ['SAS_BASE_DIR'] + '/'
+        assert path.location('', full='/product/root/data/file.fits', base_dir='/product/root') == 'data/file.fits'
+        assert path.location('', full='/other/root/data/file.fits', base_dir='/other') == 'root/data/file.fits'
+        assert path.base_dir == base_dir
+
+        path.set_base_dir('/my/base')
+        assert path.base_dir == '/my/base/'
+        path.set_base_dir()
+        assert path.base_dir == base_dir
+
+    def test_location_product_root(self, path, monkeypatch, tmp_path):
+        outer, inner = str(tmp_path / 'software'), str(tmp_path / 'software' / 'svn')
+        monkeypatch.setenv('PRODUCT_ROOT', outer)
+        monkeypatch.setenv('SDSS_SVN_ROOT', inner)
+        full = os.path.join(inner, 'platelist', 'trunk', 'plates.par')
+        assert path.location('', full=full) == 'platelist/trunk/plates.par'
+        assert path.find_location('', full=full) == 'platelist/trunk/plates.par'
+        assert path.product_root == inner
+        path.product_root = None
+        assert path.location('', full=full) == 'platelist/trunk/plates.par'
+        assert path.product_root == inner
+
+        # the index follows any changes to the product roots
+        monkeypatch.delenv('SDSS_SVN_ROOT')
+        assert path.location('', full=full) == 'svn/platelist/trunk/plates.par'
+        assert path.location('', full='/not/a/root/file.fits') is None
+
+    def test_resolve_nolocation(self, path):
+        resolved = path.resolve('', full='/not/on/sas/file.fits')
+        assert resolved.location is None
+        assert resolved.sas_module is None
+        assert resolved.url is None
+        with pytest.raises(AccessError, match='Cannot construct url'):
+            path.url('', full='/not/on/sas/file.fits')
+
     @pytest.mark.parametrize('method', [('one'), ('random')])
     def test_onerandom(self, path, method):
         full = self.full(path)
@@ -194,12 +374,76 @@ class TestPath(object):
             data = one if method == 'one' else one[0]
             assert re.search(r'(.*?)manga-8485-(\d+)-LOGCUBE(.*?)', data)
 
+    @pytest.fixture()
+    def cubes(self, tmp_path):
+        ''' fixture to create a directory of test cubes '''
+        for ifu in range(100):
+            (tmp_path / 'manga-8485-{0}-LOGCUBE.fits.gz'.format(ifu)).touch()
+        yield str(tmp_path / 'manga-8485-*-LOGCUBE.fits.gz')
+
+    def test_random_sample(self, path, cubes, mocker):
+        spy = mocker.spy(path, 'iexpand')
+        files = path.random('', full=cubes, num=10)
+        assert spy.call_count == 1
+        assert len(set(files)) == 10
+        assert set(files) <= set(path.expand('', full=cubes))
+
+    @pytest.mark.parametrize('method, kwargs', [('one', {}), ('random', {'num': 5})])
+    def test_random_seed(self, path, cubes, method, kwargs):
+        meth = path.__getattribute__(method)
+        assert meth('', full=cubes, seed=42, **kwargs) == meth('', full=cubes, seed=42, **kwargs)
+        rng_a, rng_b = random.Random(7), random.Random(7)
+        assert meth('', full=cubes, rng=rng_a, **kwargs) == meth('', full=cubes, rng=rng_b, **kwargs)
+
+    def test_random_uniform(self, path, cubes):
+        counts = collections.Counter(path.one('', full=cubes, rng=random.Random(i)) for i in range(2000))
+        assert len(counts) == 100
+        assert max(counts.values()) < 50
+
+    def test_random_nofiles(self, path, tmp_path):
+        full = str(tmp_path / '*.fits')
+        assert path.one('', full=full) is None
+        assert path.random('', full=full, num=2) is None
+        assert path.any('', full=full) is False
+
+    def test_random_toomany(self, path, cubes):
+        with pytest.raises(AssertionError, match='Requested number must be larger'):
+            path.random('', full=cubes, num=101)
+
     def test_expand(self, path):
         full = self.full(path)
         ex = path.expand('', full=full)
         if ex:
             assert len(ex) > 1
 
+    @pytest.mark.parametrize('pattern', ['*/stack/*.fits', '84*/*/manga-*', '8485/stack/*-19*',
+                                         '*/*', '*/', 'nodir/*', '8485/stack/manga-8485-1901.fits',
+                                         '.*/*', '8485/*/'])
+    def test_iexpand(self, path, tmp_path, pattern):
+        for name in ['8485/stack/manga-8485-1901.fits', '8485/stack/manga-8485-1902.fits.gz',
+                     '8486/stack/manga-8486-1901.fits', '8486/images/1901.png',
+                     '.hidden/stack/a.fits', '8485/stack/.b.fits']:
+            (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / name).touch()
+
+        full = str(tmp_path / pattern)
+        assert sorted(path.iexpand('', full=full)) == sorted(path.expand('', full=full))
+
+    def test_iexpand_refine(self, path, tmp_path):
+        for ifu in [1901, 1902, 3701]:
+            (tmp_path / 'manga-8485-{0}.fits'.format(ifu)).touch()
+        full = str(tmp_path / 'manga-8485-*.fits')
+        files = sorted(path.iexpand('', full=full, refine=r'-19\d{2}'))
+        assert files == sorted(path.expand('', full=full, refine=r'-19\d{2}'))
+        assert len(files) == 2
+        assert len(list(path.iexpand('', full=full, refine=r'-19\d{2}', filterdir='in'))) == 1
+
+    def test_iexpand_lazy(self, path, tmp_path):
+        for ifu in range(10):
+            (tmp_path / 'manga-8485-{0}.fits'.format(ifu)).touch()
+        files = path.iexpand('', full=str(tmp_path / '*.fits'))
+        assert next(files).endswith('.fits')
+
     def test_any(self, path):
         full = self.full(path)
         a = path.any('', full=full)
@@ -260,6 +504,35 @@ class TestPath(object):
         assert full.endswith('.gz')
         assert full.count('.gz') == 1
 
+    @pytest.mark.parametrize('pure, kwargs', [(True, {}), (False, {'pure': True})],
+                             ids=['instance', 'call'])
+    def test_pure(self, mocker, pure, kwargs):
+        path = Path(release='DR17', pure=pure)
+        spy = mocker.spy(path, '_check_compression')
+        full = path.full('mangaimage', drpver='v2_5_3', plate=8485, ifu=1901, **kwargs)
+        assert full.endswith('8485/images/1901.png')
+        assert spy.call_count == 0
+
+    def test_resolve_compression(self, path, tmp_path, mocker):
+        names = ['plain.fits', 'zipped.fits.gz', 'unzipped.fits', 'other.fits.fz']
+        for name in names:
+            (tmp_path / name).touch()
+        (tmp_path / 'sub').mkdir()
+        (tmp_path / 'sub' / 'wild-1.fits.gz').touch()
+
+        paths = [str(tmp_path / p) for p in ['plain.fits', 'zipped.fits', 'unzipped.fits.gz',
+                                             'other.fits', 'missing.fits', 'missing.fits.gz',
+                                             'nodir/missing.fits', 'sub/wild-*.fits']]
+        exp = [path._check_compression(p) for p in paths]
+        assert [os.path.basename(e) for e in exp[:4]] == names
+
+        assert path.resolve_compression(paths) == exp
+
+        # each parent directory is listed once
+        spy = mocker.spy(os, 'scandir')
+        assert path.resolve_compression(paths[:-1]) == exp[:-1]
+        assert spy.call_count == 2
+
     @pytest.mark.parametrize('mirror', [(True), (False)])
     def test_netloc(self, mirror):
         ''' test the net location and remote_base '''
@@ -390,6 +663,183 @@ class TestPath(object):
             path.add_temp_path(name, temp)
 
 
+class TestPlantedTree(object):
+
+    def test_cached(self, mocker):
+        clear_tree_cache()
+        spy = mocker.spy(tree, 'replant_tree')
+        Path(release='dr17')
+        Path(release='sdsswork')
+        Path(release='dr17')
+        Path(release='sdsswork')
+        assert spy.call_count == 2
+
+    def test_environ(self):
+        path = Path(release='dr17')
+        redux = os.environ['APOGEE_REDUX']
+        full = path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+
+        work = Path(release='sdsswork')
+        assert os.environ['APOGEE_REDUX'] != redux
+        assert tree.config_name == 'sdsswork'
+
+        path = Path(release='dr17')
+        assert os.environ['APOGEE_REDUX'] == redux
+        assert tree.config_name == 'dr17'
+        assert path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG') == full
+        assert set(path.templates) != set(work.templates)
+
+    def test_templates_copied(self):
+        path = Path(release='dr17')
+        path.add_temp_path('testFile', '$SAS_BASE_DIR/test_file_{ver}.fits')
+        assert 'testFile' not in Path(release='dr17').templates
+
+    def test_clear_cache(self, mocker):
+        path = Path(release='dr17')
+        path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG',
+                  force_module=True)
+        cache = path_module._tree_cache
+        assert cache.planted and cache.prefixes
+        spy = mocker.spy(tree, 'replant_tree')
+        path.replant_tree(clear_cache=True)
+        assert spy.call_count == 1
+        assert not cache.prefixes
+        assert len(cache.planted) == 1
+
+    def test_prefix_size(self):
+        cache = path_module._TreeCache(prefix_size=2)
+        for index in range(3):
+            cache.add_prefix(('TEST_DIR', str(index)), (str(index), ()))
+        assert list(cache.prefixes) == [('TEST_DIR', '1'), ('TEST_DIR', '2')]
+
+    def test_inputs(self, monkeypatch, tmp_path, mocker):
+        Path(release='dr17')
+        spy = mocker.spy(tree, 'replant_tree')
+        monkeypatch.setenv('SAS_BASE_DIR', str(tmp_path))
+        path = Path(release='dr17')
+        assert spy.call_count == 1
+        assert path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG').startswith(str(tmp_path))
+
+
+class TestIsolated(object):
+
+    cube = {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG'}
+
+    def test_no_global_changes(self):
+        Path(release='sdsswork')
+        environ = dict(os.environ)
+        path = Path(release='dr17', isolated=True)
+        assert dict(os.environ) == environ
+        assert tree.config_name == 'sdsswork'
+        assert path.environ['SAS_ROOT'] != os.environ['SAS_ROOT']
+        with pytest.raises(TypeError):
+            path.environ['SAS_ROOT'] = '/tmp'
+
+    def test_first_plant(self, mocker):
+        import threading
+        Path(release='sdsswork')
+        environ = dict(os.environ)
+        changed = []
+        done = threading.Event()
+
+        def watch():
+            while not done.is_set():
+                if dict(os.environ) != environ:
+                    changed.append(True)
+
+        clear_tree_cache()
+        spy = mocker.spy(tree, 'replant_tree')
+        watcher = threading.Thread(target=watch)
+        watcher.start()
+        try:
+            paths = [Path(release=release, isolated=True) for release in ['dr15', 'dr17']]
+        finally:
+            done.set()
+            watcher.join()
+        assert not changed
+        assert spy.call_count == 0
+        assert tree.config_name == 'sdsswork'
+        assert paths[0].environ['MANGA_SPECTRO_REDUX'] != paths[1].environ['MANGA_SPECTRO_REDUX']
+
+    @pytest.mark.parametrize('release', ['dr15', 'dr17', 'sdsswork'])
+    def test_first_plant_matches_global(self, release):
+        clear_tree_cache()
+        state, environ = _plant_tree(release, isolated=True)
+        clear_tree_cache()
+        Path(release=release)
+        assert {k: os.environ.get(k) for k in environ} == environ
+        assert state['paths'] == tree.paths
+        assert state['config_name'] == tree.config_name
+
+    @pytest.mark.parametrize('release', ['dr17', 'sdsswork'])
+    def test_matches_global(self, release):
+        isolated = Path(release=release, isolated=True)
+        path = Path(release=release)
+        assert isolated.templates == path.templates
+        for name, kwargs in [('mangacube', self.cube), ('spAll', {'run2d': '26'}),
+                             ('spAll', {'run2d': 'v5_13_2'})]:
+            if name in path.templates:
+                assert isolated.full(name, **kwargs) == path.full(name, **kwargs)
+                assert isolated.url(name, **kwargs) == path.url(name, **kwargs)
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        paths = {release: Path(release=release, isolated=True) for release in ['dr15', 'dr17']}
+        exp = {release: [path.full('mangacube', **dict(self.cube, ifu=ifu)) for ifu in range(50)]
+               for release, path in paths.items()}
+
+        def resolve(release):
+            path = paths[release]
+            return release, [path.full('mangacube', **dict(self.cube, ifu=ifu)) for ifu in range(50)]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for release, fulls in pool.map(resolve, ['dr15', 'dr17'] * 10):
+                assert fulls == exp[release]
+        assert exp['dr15'] != exp['dr17']
+
+    def test_add_temp_path(self):
+        path = Path(release='dr17', isolated=True)
+        path.add_temp_path('testFile', '$TEST_ISO_DIR/test_file_{ver}.fits', envvar_path='/tmp/iso/')
+        assert 'TEST_ISO_DIR' not in os.environ
+        assert path.full('testFile', ver=1) == '/tmp/iso/test_file_1.fits'
+
+
+class TestExpandvars(object):
+
+    @pytest.mark.parametrize('release', ['dr17', 'sdsswork'])
+    def test_matches_recursive(self, release):
+        for environ in [None, Path(release=release, isolated=True).environ]:
+            Path(release=release)
+            for template in Path(release=release).templates.values():
+                assert _expandvars(template, environ) == _expandvars_recursive(template, environ)
+
+    @pytest.mark.parametrize('template', ['$TEST_EXP-DIR/file.fits', '${TEST_EXP}/file.fits',
+                                          '$TEST_EXP$TEST_EXP/file.fits', '$TEST_EXP/$TEST_EXP.fits',
+                                          '$TEST_MISSING/file.fits'])
+    def test_prefixes(self, template):
+        environ = {'TEST_EXP': '/tmp/exp', 'TEST_EXP-DIR': '/tmp/exp-dir'}
+        assert _expandvars(template, environ) == _expandvars_recursive(template, environ)
+
+    def test_environ_changes(self, monkeypatch):
+        monkeypatch.setenv('TEST_EXP_ROOT', '/tmp/root')
+        monkeypatch.setenv('TEST_EXP_DIR', '$TEST_EXP_ROOT/exp')
+        assert _expandvars('$TEST_EXP_DIR/file.fits') == '/tmp/root/exp/file.fits'
+        monkeypatch.setenv('TEST_EXP_ROOT', '/tmp/other')
+        assert _expandvars('$TEST_EXP_DIR/file.fits') == '/tmp/other/exp/file.fits'
+        monkeypatch.setenv('TEST_EXP_DIR', '/tmp/new')
+        assert _expandvars('$TEST_EXP_DIR/file.fits') == '/tmp/new/file.fits'
+
+    def test_add_temp_path(self, monkeypatch):
+        # restores the unset envvar afterwards
+        monkeypatch.setenv('TEST_EXP_DIR', '')
+        monkeypatch.delenv('TEST_EXP_DIR')
+        path = Path(release='dr17')
+        path.add_temp_path('testFile', '$TEST_EXP_DIR/test_file_{ver}.fits', envvar_path='/tmp/a/')
+        assert path.full('testFile', ver=1, force_module=True) == '/tmp/a/test_file_1.fits'
+        monkeypatch.setenv('TEST_EXP_DIR', '/tmp/b')
+        assert path.full('testFile', ver=1, force_module=True) == '/tmp/b/test_file_1.fits'
+
+
 @pytest.fixture()
 def monkeyoos(monkeypatch, mocker):
     ''' monkeypatch the original os environ from tree '''
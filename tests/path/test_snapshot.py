@@ -0,0 +1,83 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_snapshot.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import json
+import pytest
+from sdss_access import tree, config
+from sdss_access.path import Path
+from sdss_access.path.path import clear_tree_cache
+from sdss_access.path.snapshot import write_snapshot, read_snapshot, load_snapshot
+
+
+cube = {'drpver': 'v2_4_3', 'plate': 8485, 'ifu': 1901, 'wave': 'LOG'}
+
+
+@pytest.fixture()
+def snapshot(tmp_path):
+    ''' fixture to write a snapshot file, and reset the planted trees afterwards '''
+    filename = str(tmp_path / 'snapshot.json')
+    write_snapshot(filename, releases=['DR17', 'sdsswork'])
+    clear_tree_cache()
+    yield filename
+    clear_tree_cache()
+    Path(release='dr17')
+
+
+class TestSnapshot(object):
+
+    def test_write(self, snapshot):
+        data = read_snapshot(snapshot)
+        assert list(data['releases']) == ['dr17', 'sdsswork']
+        assert data['class'] == 'sdss_access.path.path.Path'
+        assert data['releases']['dr17']['keys']['mangacube'][0] == Path(release='dr17').templates['mangacube']
+
+    def test_load(self, snapshot, mocker):
+        exp = Path(release='dr17', isolated=True).full('mangacube', **cube)
+        clear_tree_cache()
+
+        assert load_snapshot(snapshot) == ['dr17', 'sdsswork']
+        replant = mocker.spy(tree, 'replant_tree')
+        special = mocker.spy(Path, '_check_special_kwargs')
+        path = Path(release='dr17')
+        assert path.full('mangacube', **cube) == exp
+        assert set(path.lookup_keys('mangacube')) == set(cube)
+        assert path.public is True
+        assert Path(release='sdsswork').public is False
+        assert replant.call_count == 0
+        assert special.call_count == 0
+
+    def test_isolated(self, snapshot, mocker):
+        load_snapshot(snapshot)
+        replant = mocker.spy(tree, 'replant_tree')
+        path = Path(release='sdsswork', isolated=True)
+        assert path.environ['SAS_ROOT'].endswith('sdsswork')
+        assert replant.call_count == 0
+
+    @pytest.mark.parametrize('key, value', [('tree_version', '0.0.1'), ('snapshot_version', 0),
+                                            ('inputs', {'SAS_BASE_DIR': '/other/sas'})])
+    def test_stale(self, snapshot, key, value):
+        with open(snapshot) as f:
+            data = json.load(f)
+        data[key] = value
+        with open(snapshot, 'w') as f:
+            json.dump(data, f)
+        assert read_snapshot(snapshot) is None
+        assert load_snapshot(snapshot) == []
+
+    def test_missing(self, tmp_path):
+        assert load_snapshot(str(tmp_path / 'nofile.json')) == []
+
+    def test_config(self, snapshot, monkeypatch, mocker):
+        monkeypatch.setitem(config, 'snapshot', snapshot)
+        replant = mocker.spy(tree, 'replant_tree')
+        Path(release='dr17')
+        Path(release='sdsswork')
+        assert replant.call_count == 0
+        Path(release='dr15')
+        assert replant.call_count == 1
@@ -0,0 +1,154 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_vectorized.py
+# Project: path
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import sys
+import time
+import pytest
+from sdss_access.path import Path
+from sdss_access.path import vectorized
+
+np = pytest.importorskip('numpy')
+
+
+def get_columns(path, name):
+    ''' yield sets of test keyword columns for a given path name '''
+    keys = path.lookup_keys(name)
+    special = {'telescope': ['apo25m', 'lco25m', 'apo1m'], 'run2d': ['v6_1_3', 'v6_0_2', '26'],
+               'coadd': ['allepoch', 'daily', 'epoch'], 'obs': ['apo', 'lco', 'apo'],
+               'instrument': 'apogee-n', 'ftype': 'fits', 'num': [3, 4, 5]}
+    for columns in ({k: [1234, 5, 987654] for k in keys}, {k: ['1234', '0', '12'] for k in keys}):
+        yield columns
+        yield {**columns, **{k: v for k, v in special.items() if k in keys}}
+
+
+def get_rows(columns, size=3):
+    ''' convert a set of test columns into a list of keyword arguments '''
+    return [{k: v[i] if isinstance(v, list) else v for k, v in columns.items()} for i in range(size)]
+
+
+@pytest.mark.parametrize('release', ['dr17', 'sdsswork'])
+def test_full_many_matches_full(release):
+    ''' test the array paths match the paths resolved one at a time '''
+    path = Path(release=release)
+    for name in path.templates:
+        if not path.lookup_keys(name):
+            continue
+        for columns in get_columns(path, name):
+            try:
+                exp = [path.full(name, **row) for row in get_rows(columns)]
+            except Exception:
+                continue
+            assert path.full_many(name, **columns).tolist() == exp
+
+
+class TestFullMany(object):
+
+    def test_scalars(self, path):
+        full = path.full_many('mangacube', drpver='v2_4_3', plate=8485, ifu=[1901, 1902], wave='LOG')
+        assert full.tolist() == [path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=ifu, wave='LOG')
+                                 for ifu in [1901, 1902]]
+
+    def test_table(self, path):
+        table = np.array([(8485, 1901), (7443, 12701)], dtype=[('plate', int), ('ifu', int)])
+        full = path.full_many('mangacube', table=table, drpver='v2_4_3', wave='LOG')
+        assert full[1].endswith('7443/stack/manga-7443-12701-LOGCUBE.fits.gz')
+
+    def test_table_override(self, path):
+        table = {'plate': [8485, 7443], 'ifu': [1901, 12701], 'wave': ['LIN', 'LIN']}
+        full = path.full_many('mangacube', table=table, drpver='v2_4_3', wave='LOG')
+        assert all('LOGCUBE' in f for f in full)
+
+    def test_missing_keys(self, path):
+        with pytest.raises(KeyError, match='Missing required keyword arguments:'):
+            path.full_many('mangacube', plate=[8485, 7443])
+
+    def test_length_mismatch(self, path):
+        with pytest.raises(ValueError, match='All columns must have the same length'):
+            path.full_many('mangacube', drpver='v2_4_3', plate=[8485, 7443], ifu=[1901], wave='LOG')
+
+    def test_no_array_form(self, path, mocker):
+        spy = mocker.spy(vectorized, 'get_rows')
+        full = path.full_many('spAll', run2d=['v5_13_2', '26'])
+        assert spy.call_count == 1
+        assert full.tolist() == [path.full('spAll', run2d=r) for r in ['v5_13_2', '26']]
+
+    def test_no_numpy(self, path, monkeypatch):
+        assert not hasattr(vectorized, 'np')
+        monkeypatch.setitem(sys.modules, 'numpy', None)
+        with pytest.raises(ImportError, match='numpy is required'):
+            path.full_many('mangacube', drpver='v2_4_3', plate=[8485], ifu=1901, wave='LOG')
+        assert path.full('mangacube', drpver='v2_4_3', plate=8485, ifu=1901, wave='LOG')
+
+    def test_force_module(self, path, mocker):
+        spy = mocker.spy(path, 'full')
+        path.full_many('mangapreimg', designid=[8405, 8406], designgrp='D0084XX',
+                       mangaid='1-42007', force_module=True)
+        assert spy.call_count == 2
+
+    @pytest.mark.parametrize('spec, values, exp',
+                             [('', [1, 22], ['1', '22']),
+                              ('0>4', [1, 22], ['0001', '0022']),
+                              ('0>4', ['a', 'bb'], ['000a', '00bb']),
+                              ('0>3d', [1, 22], ['001', '022']),
+                              ('.2', ['abc', 'defg'], ['ab', 'de']),
+                              ('.2f', [1.234, 2.5], ['1.23', '2.50'])],
+                             ids=['none', 'pad', 'padstr', 'padint', 'truncate', 'float'])
+    def test_format_column(self, spec, values, exp):
+        assert vectorized.format_column(np.array(values), spec).tolist() == exp
+
+
+@pytest.mark.parametrize('func, kwargs',
+                         [('plategrp', {'plate': [0, 5, 8485, 123456]}),
+                          ('healpixgrp', {'healpix': [0, 999, 1000, 49151]}),
+                          ('cat_id_groups', {'cat_id': [1, 1234, 27021597765612345]}),
+                          ('cat_id_groups', {'catid': [1, 1234, 27021597765612345]}),
+                          ('sdss_id_groups', {'sdss_id': [0, 99, 123456789]}),
+                          ('pad_fieldid', {'fieldid': [15000, 100123, '*'],
+                                           'run2d': ['v6_1_3', 'v6_0_4', 'v6_1_3']}),
+                          ('plateid6', {'plateid': [0, 5, 9999, 10000, 123456]}),
+                          ('platedir', {'plateid': [0, 5, 8485, 123456]}),
+                          ('configgrp', {'configid': [0, 5, 8485, 123456]}),
+                          ('configsubmodule', {'configid': ['0', '5', '8485', '123456']}),
+                          ('tilegrp', {'tileid': [0, 1000, 1027345]}),
+                          ('tilegrp', {'tileid': ['', '1000', '1027*']}),
+                          ('fieldgrp', {'fieldid': [0, 15000, 100123, 101],
+                                        'run2d': ['v6_2_0', 'v6_2_0', 'v6_1_3', 'master']}),
+                          ('fieldgrp', {'fieldid': ['', '015000', '*', '101'],
+                                        'run2d': ['v6_2_0', '26', 'v6_2_0', 'master']}),
+                          ('mos_target_num', {'num': [0, 3, '*'], 'ftype': 'fits'}),
+                          ('mos_target_num2', {'num': [0, 3, 123], 'ftype': ['fits', 'parquet', 'FITS']}),
+                          ('mos_target_num3', {'num': [-1, 3, 123]}),
+                          ('mos_target_num_underscore', {'num': [1, 3, 12]})])
+def test_array_special_functions(path, func, kwargs):
+    ''' test the array special functions match the scalar methods '''
+    arrays = {k: np.array(v) for k, v in kwargs.items()}
+    full = getattr(vectorized, func)('', **arrays)
+    exp = [getattr(path, func)('', **row) for row in get_rows(kwargs, len(full))]
+    assert full.tolist() == exp
+
+
+@pytest.mark.slow
+def test_benchmark_full_many():
+    ''' benchmark full_many against looping over full '''
+    path = Path(release='sdsswork')
+    sdss_ids = np.arange(20000) * 37
+    kwargs = {'v_astra': '0.5.0', 'component': ''}
+
+    start = time.perf_counter()
+    exp = [path.full('mwmStar', sdss_id=int(i), **kwargs) for i in sdss_ids]
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full = path.full_many('mwmStar', sdss_id=sdss_ids, pure=True, **kwargs)
+    after = time.perf_counter() - start
+    print('\nmwmStar: {0:.0f} paths/s with full, {1:.0f} paths/s with full_many'.format(
+        len(sdss_ids) / before, len(sdss_ids) / after))
+
+    assert full.tolist() == exp
+    assert before > 10 * after
@@ -0,0 +1,163 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_asynchttp.py
+# Project: sync
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import os
+import pickle
+import subprocess
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import pytest
+from sdss_access import AccessError
+from sdss_access.sync import AsyncHttpAccess
+
+
+locations = ['dr17/manga/spectro/test/file_{0}.txt'.format(i) for i in range(40)]
+
+
+class Handler(SimpleHTTPRequestHandler):
+    ''' file server with keep-alive connections, counting the connections made '''
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def setup(self):
+        super(Handler, self).setup()
+        self.connections.add(self.client_address)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def server(tmp_path):
+    ''' fixture to serve a directory of sas files over http '''
+    root = tmp_path / 'remote'
+    for location in locations:
+        filename = root / 'sas' / location
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        filename.write_text(location * 100)
+
+    Handler.connections = set()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=str(root)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{0}'.format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture()
+def access(server, tmp_path, monkeypatch):
+    ''' fixture to create an async access, downloading from the local server '''
+    monkeypatch.setenv('SAS_BASE_DIR', str(tmp_path / 'sas'))
+    access = AsyncHttpAccess(release='dr17', concurrency=4)
+    access.remote()
+    access.remote_base = server
+    access.set_base_dir(str(tmp_path / 'sas'))
+    yield access
+    access.reset()
+
+
+class TestAsyncHttp(object):
+
+    def test_download(self, access, tmp_path, mocker):
+        popen = mocker.spy(subprocess, 'Popen')
+        for location in locations:
+            access.add_file(location, input_type='location')
+        access.set_stream()
+        results = access.commit()
+
+        assert popen.call_count == 0
+        assert len(results) == len(locations)
+        assert all(result.error is None for result in results)
+        for location in locations:
+            filename = tmp_path / 'sas' / location
+            assert filename.read_text() == location * 100
+            assert not os.path.exists('{0}.part'.format(filename))
+
+    @pytest.mark.parametrize('verbose', [False, True])
+    def test_done(self, access, capsys, verbose):
+        access.verbose = verbose
+        access.add_file(locations[0], input_type='location')
+        access.set_stream()
+        access.commit()
+        assert ('SDSS_ACCESS> Done!' in capsys.readouterr().out) is verbose
+
+    def test_keep_alive(self, access):
+        for location in locations:
+            access.add_file(location, input_type='location')
+        access.set_stream()
+        access.commit()
+        assert 0 < len(Handler.connections) <= access.concurrency
+
+    def test_missing(self, access, tmp_path):
+        access.add_file(locations[0], input_type='location')
+        access.add_file('dr17/manga/spectro/test/nofile.txt', input_type='location')
+        access.set_stream()
+        results = access.commit()
+        failed = [result for result in results if result.error]
+        assert len(failed) == 1
+        assert failed[0].location.endswith('nofile.txt')
+        assert not (tmp_path / 'sas' / 'dr17/manga/spectro/test/nofile.txt').exists()
+        assert not (tmp_path / 'sas' / 'dr17/manga/spectro/test/nofile.txt.part').exists()
+
+    def test_callback(self, access):
+        for location in locations[:10]:
+            access.add_file(location, input_type='location')
+        access.set_stream()
+        completed = []
+        access.commit(callback=completed.append)
+        assert completed == access.results
+        assert len(completed) == 10
+
+    def test_offset_limit(self, access):
+        for location in locations[:10]:
+            access.add_file(location, input_type='location')
+        access.set_stream()
+        results = access.commit(offset=2, limit=3)
+        assert sorted(result.location for result in results) == \
+            sorted(task['location'] for task in access.stream.task[2:5])
+
+    def test_commit_options(self, access):
+        for location in locations[:5]:
+            access.add_file(location, input_type='location')
+        access.set_stream()
+        results = access.commit(schedule='dynamic', batch_size=2, autotune=True)
+        assert len(results) == 5
+        assert all(result.error is None for result in results)
+
+    def test_session_per_worker(self, access, mocker):
+        sessions = []
+        get_session = access.get_session
+
+        def new_session():
+            session = get_session()
+            sessions.append(session)
+            mocker.spy(session, 'close')
+            return session
+
+        mocker.patch.object(access, 'get_session', side_effect=new_session)
+        for location in locations:
+            access.add_file(location, input_type='location')
+        access.set_stream()
+        access.commit()
+        assert 0 < len(sessions) <= access.concurrency
+        assert all(session.close.call_count == 1 for session in sessions)
+
+    def test_no_stream(self):
+        access = AsyncHttpAccess(release='dr17')
+        with pytest.raises(AccessError, match='No stream to download'):
+            access.commit()
+
+    def test_state(self):
+        access = AsyncHttpAccess(release='dr17', concurrency=8, retries=1)
+        unpickled = AsyncHttpAccess.from_state(pickle.loads(pickle.dumps(access.get_state())))
+        assert unpickled.concurrency == 8
+        assert unpickled.retries == 1
+        assert unpickled.results == []
@@ -0,0 +1,127 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_cli.py
+# Project: sync
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import copy
+import time
+from subprocess import Popen
+import pytest
+from sdss_access.sync import Cli
+from sdss_access.sync import cli as cli_module
+
+
+@pytest.fixture()
+def cli(tmp_path):
+    ''' fixture to create a cli, starting background processes logging to a temporary file '''
+    cli = Cli(data_dir=str(tmp_path))
+    with open(str(tmp_path / 'test.log'), 'w') as log:
+        cli.start = lambda command: cli.get_background_process(command, logfile=log, errfile=log)
+        yield cli
+
+
+class TestBackgroundProcess(object):
+
+    def test_no_pause(self, cli, mocker):
+        sleep = mocker.spy(cli_module, 'sleep')
+        process = cli.start('true')
+        process.wait()
+        assert sleep.call_count == 0
+        assert process in cli._watched
+
+    def test_no_command(self, cli):
+        assert cli.get_background_process(None) is None
+
+    def test_copy(self, cli):
+        process = cli.start('true')
+        copied = copy.deepcopy(cli)
+        assert copied.data_dir == cli.data_dir
+        assert not copied._watched
+        assert cli.wait_for_any([process]) == [process]
+
+
+class TestWaitForProcesses(object):
+
+    def test_wait(self, cli, mocker):
+        sleep = mocker.spy(cli_module, 'sleep')
+        start = time.monotonic()
+        processes = [cli.start('sleep {0}'.format(t)) for t in (0.1, 0.2, 0.3)]
+        cli.wait_for_processes(processes, n_tasks=6, tasks_per_stream=[1, 2, 3])
+        assert time.monotonic() - start < 2
+        assert cli.returncode == (0, 0, 0)
+        assert sleep.call_count == 0
+        assert not cli._watched
+        assert not cli._finished
+
+    def test_failed(self, cli):
+        processes = [cli.start('true'), cli.start('false')]
+        cli.wait_for_processes(processes, n_tasks=2, tasks_per_stream=[1, 1])
+        assert cli.returncode == (0, 1)
+
+    def test_verbose(self, cli, capsys):
+        cli.verbose = True
+        processes = [cli.start('sleep 0.3')]
+        cli.wait_for_processes(processes, pause=0.1, n_tasks=1, tasks_per_stream=[1])
+        assert cli.returncode == (0,)
+        assert capsys.readouterr().out.count('syncing... please wait for 1 rsync streams (1 files)') >= 2
+
+
+class TestWaitForAny(object):
+
+    def test_first(self, cli):
+        fast = cli.start('sleep 0.1')
+        slow = cli.start('sleep 30')
+        start = time.monotonic()
+        assert cli.wait_for_any([fast, slow]) == [fast]
+        assert time.monotonic() - start < 5
+        slow.kill()
+        assert cli.wait_for_any([slow]) == [slow]
+        assert not cli._watched
+
+    def test_timeout(self, cli):
+        slow = cli.start('sleep 30')
+        assert cli.wait_for_any([slow], timeout=0.1) == []
+        slow.kill()
+        assert cli.wait_for_any([slow]) == [slow]
+
+    def test_other_process(self, cli):
+        ''' exits of processes not waited on are kept for later '''
+        first = cli.start('true')
+        second = cli.start('sleep 0.2')
+        first.wait()
+        assert cli.wait_for_any([second]) == [second]
+        assert cli.wait_for_any([first], timeout=1) == [first]
+
+    def test_forget_finished(self, cli):
+        first = cli.start('true')
+        second = cli.start('sleep 30')
+        third = cli.start('true')
+        while cli._exited.qsize() < 2:
+            time.sleep(0.01)
+        assert cli.wait_for_any([first]) == [first]
+        assert cli._finished == {third}
+        cli.forget_finished()
+        assert cli._watched == {second}
+        assert not cli._finished
+        second.kill()
+        assert cli.wait_for_any([second]) == [second]
+        assert not cli._watched
+
+    def test_unwatched(self, cli):
+        process = Popen(['true'])
+        assert cli.wait_for_any([process]) == [process]
+        assert process.returncode == 0
+
+
+class TestForegroundRun(object):
+
+    def test_run(self, cli, mocker):
+        sleep = mocker.spy(cli_module, 'sleep')
+        status, out, err = cli.foreground_run('echo hello')
+        assert status == 0
+        assert out.strip() == b'hello'
+        assert sleep.call_count == 0
@@ -37,7 +37,7 @@ class TestCurl(object):
 
         expout = {'sas_module': expdata['sas_module'], 'location': expdata['location'],
                   'source': source, 'destination': expdata['destination'],
-                  'exists': None}
+                  'exists': None, 'size': None}
 
         curl.add_file(path, input_type=input_type)
         task = curl.initial_stream.task[0]
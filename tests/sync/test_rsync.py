@@ -110,5 +110,7 @@ class TestStream(object):
         assert task[0] == inittask[0]
 
     def test_final_stream(self, rstream, finaltask):
-        task = rstream.stream.task
-        assert task[0] == finaltask[0]
+        task = dict(rstream.stream.task[0])
+        # the file size is read from the rsync listing
+        assert isinstance(task.pop('size'), int)
+        assert task == finaltask[0]
@@ -0,0 +1,349 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Filename: test_scheduler.py
+# Project: sync
+# License: BSD 3-clause "New" or "Revised" License
+
+
+from __future__ import print_function, division, absolute_import
+import glob
+import json
+import os
+import random
+import pytest
+from sdss_access import config, AccessError
+from sdss_access.sync import Stream, RsyncAccess, CurlAccess
+from sdss_access.sync.scheduler import (TaskQueue, Autotuner, get_batch_size, simulate_makespan,
+                                        fill_sizes, lpt_partition)
+
+
+def skewed_sizes(seed, n_files=200, n_large=4):
+    ''' file sizes in MB, mostly small files with a few large spAll or LOGCUBE like files '''
+    rng = random.Random(seed)
+    sizes = [rng.lognormvariate(1, 1) for _ in range(n_files - n_large)]
+    sizes += [rng.uniform(1000, 4000) for _ in range(n_large)]
+    rng.shuffle(sizes)
+    return sizes
+
+
+@pytest.fixture()
+def stream(tmp_path, monkeypatch):
+    ''' fixture to create a stream of tasks, logging to a temporary directory '''
+    monkeypatch.setenv('SDSS_ACCESS_DATA_DIR', str(tmp_path))
+    stream = Stream(stream_count=3)
+    stream.source = 'https://data.sdss.org/sas'
+    stream.destination = str(tmp_path / 'sas')
+    stream.sas_module = 'sas'
+    for i in range(20):
+        stream.append_task(sas_module='dr17', location='dr17/test/file_{0}.txt'.format(i),
+                           source='source_{0}'.format(i), destination='destination_{0}'.format(i))
+    yield stream
+    stream.reset()
+
+
+class TestTaskQueue(object):
+
+    @pytest.mark.parametrize('n_tasks, batch_size, exp', [(20, 3, [3, 3, 3, 3, 3, 3, 2]),
+                                                          (5, 10, [5]), (0, 2, [])])
+    def test_batches(self, n_tasks, batch_size, exp):
+        queue = TaskQueue(list(range(n_tasks)), batch_size=batch_size)
+        assert len(queue) == len(exp)
+        batches = []
+        batch = queue.get()
+        while batch is not None:
+            batches.append(batch)
+            batch = queue.get()
+        assert [len(batch) for batch in batches] == exp
+        assert [task for batch in batches for task in batch] == list(range(n_tasks))
+
+    @pytest.mark.parametrize('n_tasks, stream_count, exp', [(100, 5, 5), (3, 5, 1), (0, 5, 1), (10, 0, 3)])
+    def test_batch_size(self, n_tasks, stream_count, exp):
+        assert get_batch_size(n_tasks, stream_count) == exp
+
+
+    def test_sized_batches(self):
+        sizes = [1, 1, 50, 1, 1, 30, 1, 1, None]
+        queue = TaskQueue(list('abcdefghi'), batch_size=4, stream_count=2, sizes=sizes)
+        # the unknown size is the mean size 11, and batches hold at most 99 / 8 bytes
+        assert list(queue.batches) == [['c'], ['f'], ['i', 'a'], ['b', 'd', 'e', 'g'], ['h']]
+
+
+class TestSizes(object):
+
+    def test_fill_sizes(self):
+        assert fill_sizes([None, 2, 4]) == [3, 2, 4]
+        assert fill_sizes([None, None]) is None
+        assert fill_sizes([]) is None
+
+    def test_lpt_partition(self):
+        assert lpt_partition([7, 5, 4, 3, 1], 2) == [[0, 3], [1, 2, 4]]
+        assert lpt_partition([1, 2], 3) == [[1], [0], []]
+
+    def test_streamlets(self, stream):
+        for task, size in zip(stream.task, [1000, 900] + [10] * 18):
+            task['size'] = size
+        stream.append_tasks_to_streamlets()
+        loads = [sum(task['size'] for task in stream.task if task['location'] in streamlet['location'])
+                 for streamlet in stream.streamlet]
+        assert sorted(loads) == [180, 900, 1000]
+
+    def test_round_robin(self, stream):
+        stream.append_tasks_to_streamlets()
+        assert [len(streamlet['location']) for streamlet in stream.streamlet] == [6, 7, 7]
+
+    def test_queue(self, stream):
+        for task in stream.task:
+            task['size'] = 10
+        stream.task[7]['size'] = 10 ** 6
+        stream.set_queue(batch_size=5)
+        assert stream.queue.get() == [stream.task[7]]
+
+    def test_rsync_sizes(self):
+        rsync = RsyncAccess(release='dr17')
+        rsync.stream = rsync.get_stream()
+        rsync.stream.source = rsync.remote_base
+        rsync.stream.destination = '/tmp/sas/'
+        out = (b"-rw-r--r--         123456 2021/05/04 12:00:00 manga/test/file_1.fits\n"
+               b"-rw-r--r--             42 2021/05/04 12:00:00 manga/test/file_2.fits\n")
+        task = {'sas_module': 'dr17', 'location': 'manga/test/file_*.fits'}
+        tasks = list(rsync.generate_stream_task(task=task, out=out))
+        assert [(location, size) for _, location, _, _, size in tasks] == \
+            [('manga/test/file_1.fits', 123456), ('manga/test/file_2.fits', 42)]
+
+    def test_curl_sizes(self, tmp_path):
+        curl = CurlAccess(release='dr17')
+        curl.stream = curl.get_stream()
+        curl.stream.source = 'https://data.sdss.org/sas'
+        curl.stream.destination = str(tmp_path)
+        curl.url_list = ['https://data.sdss.org/sas/dr17/manga/test/file_1.fits',
+                         'https://data.sdss.org/sas/dr17/manga/test/file_2.fits']
+        curl.file_line_list = ['file_1.fits', 'file_2.fits']
+        curl.file_size_list = ['123456', '']
+        curl.file_date_list = ['2021-May-04 12:00', '2021-May-04 12:00']
+        tasks = list(curl.generate_stream_task(task={'location': 'manga/test/file_*.fits'}))
+        assert [(sas_module, size) for sas_module, _, _, _, size in tasks] == [('dr17', 123456), ('dr17', None)]
+
+
+class TestSimulate(object):
+
+    def test_static(self):
+        # round-robin starting from the second stream
+        assert simulate_makespan([1, 2, 3, 4], 2, schedule='static') == 6
+
+    def test_dynamic(self):
+        assert simulate_makespan([4, 1, 1, 1, 1], 2, schedule='dynamic') == 4
+        assert simulate_makespan([4, 1, 1, 1, 1], 2, schedule='dynamic', overhead=1) == 7
+
+    def test_empty(self):
+        assert simulate_makespan([], 5) == 0
+
+    def test_bad_schedule(self):
+        with pytest.raises(ValueError, match='schedule must be'):
+            simulate_makespan([1], 1, schedule='other')
+
+    def test_skewed(self):
+        static = sum(simulate_makespan(skewed_sizes(seed), 5, schedule='static') for seed in range(20))
+        dynamic = sum(simulate_makespan(skewed_sizes(seed), 5, schedule='dynamic') for seed in range(20))
+        assert dynamic < static
+
+    def test_lpt(self):
+        # LPT: [4, 1], [3, 2]
+        assert simulate_makespan([1, 2, 3, 4], 2, schedule='static', sized=True) == 5
+        assert simulate_makespan([1, 1, 1, 4, 3], 2, schedule='static', sized=True) == 5
+        assert simulate_makespan([1, 1, 1, 4, 3], 2, schedule='dynamic', sized=True) == 5
+
+    @pytest.mark.slow
+    def test_benchmark(self):
+        ''' compare the makespans of the static and dynamic schedules for skewed file sizes '''
+        bandwidth = 50.0
+        overhead = 1.0
+        batch_size = get_batch_size(200, 5)
+        makespans = {'static': [], 'dynamic': [], 'static (sized)': [], 'dynamic (sized)': []}
+        for seed in range(200):
+            durations = [size / bandwidth for size in skewed_sizes(seed)]
+            for name, values in makespans.items():
+                values.append(simulate_makespan(durations, 5, schedule=name.split()[0],
+                                                overhead=overhead, batch_size=batch_size,
+                                                sized='sized' in name))
+        mean = {name: sum(values) / len(values) for name, values in makespans.items()}
+        print('\nmean makespan: ' + ', '.join('{0} {1:.1f}s'.format(name, value)
+                                              for name, value in mean.items()))
+        assert mean['dynamic'] < 0.9 * mean['static']
+        assert mean['static (sized)'] < mean['static']
+        assert mean['dynamic (sized)'] < mean['dynamic']
+
+
+class Clock(object):
+    ''' a manually advanced clock '''
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_tuner(tuner, clock, throughput, n_windows=100, error_rate=0.0):
+    ''' feed a tuner one batch per window, with a throughput depending on the number of streams '''
+    levels = []
+    for window in range(n_windows):
+        clock.now += tuner.interval
+        tuner.update(throughput(tuner.level) * tuner.interval, error=random.random() < error_rate)
+        levels.append(tuner.level)
+    return levels
+
+
+class TestAutotuner(object):
+
+    def test_converge(self):
+        # a link saturating at 12 streams, degrading with more
+        clock = Clock()
+        tuner = Autotuner(level=5, max_level=32, clock=clock)
+        levels = run_tuner(tuner, clock, lambda level: min(level, 12) - 0.5 * max(level - 12, 0))
+        assert levels[:7] == [6, 7, 8, 9, 10, 11, 12]
+        assert all(11 <= level <= 13 for level in levels[7:])
+        assert len(tuner.curve) == 100
+        assert tuner.curve[0] == {'time': 5.0, 'level': 5, 'throughput': 5.0, 'error_rate': 0.0}
+
+    def test_max_level(self):
+        clock = Clock()
+        tuner = Autotuner(level=2, max_level=8, clock=clock)
+        levels = run_tuner(tuner, clock, lambda level: level, n_windows=20)
+        assert max(levels) == 8
+        # probes one step down from the maximum when there is no gain
+        assert min(levels[5:]) == 7
+
+    def test_errors(self):
+        clock = Clock()
+        tuner = Autotuner(level=5, max_level=32, clock=clock)
+        levels = run_tuner(tuner, clock, lambda level: level, n_windows=10, error_rate=1)
+        assert levels == [4, 3, 2, 1, 1, 1, 1, 1, 1, 1]
+
+    def test_disabled(self):
+        clock = Clock()
+        tuner = Autotuner(level=5, max_level=32, enabled=False, clock=clock)
+        levels = run_tuner(tuner, clock, lambda level: level, n_windows=10)
+        assert set(levels) == {5}
+        assert len(tuner.curve) == 10
+
+    def test_window(self):
+        clock = Clock()
+        tuner = Autotuner(level=5, max_level=32, interval=5, clock=clock)
+        clock.now = 1
+        assert tuner.update(100) == 5
+        clock.now = 4
+        assert tuner.update(100) == 5
+        assert tuner.curve == []
+        assert tuner.finish() == 50
+        assert tuner.curve == [{'time': 4, 'level': 5, 'throughput': 50, 'error_rate': 0}]
+
+
+class TestMaxStreamCount(object):
+
+    def test_default(self):
+        assert Stream(stream_count=20).stream_count == 5
+
+    def test_option(self):
+        stream = Stream(stream_count=20, max_stream_count=32)
+        assert stream.stream_count == 20
+        assert len(stream.streamlet) == 20
+
+    def test_config(self, monkeypatch):
+        monkeypatch.setitem(config, 'max_stream_count', 8)
+        assert Stream(stream_count=20).stream_count == 8
+
+
+class TestStreamQueue(object):
+
+    def test_run_queue(self, stream):
+        stream.command = 'cat {path}'
+        stream.set_queue(batch_size=2)
+        assert len(stream.queue) == 10
+        stream.run_queue()
+
+        assert stream.cli.returncode == (0,) * 10
+        assert not stream.cli._watched
+        assert stream.queue is None
+        assert sorted(sum((streamlet['batch'] for streamlet in stream.streamlet), [])) == [2] * 10
+        assert sorted(sum((streamlet['location'] for streamlet in stream.streamlet), [])) == \
+            sorted(task['location'] for task in stream.task)
+
+        logs = ''.join(open(log).read() for log in glob.glob(stream.cli.dir + '/*.log'))
+        for task in stream.task:
+            assert 'output {0}/{1}\n'.format(stream.destination, task['location']) in logs
+        assert len(glob.glob(stream.cli.dir + '/*.txt')) == 10
+
+    def test_offset_limit(self, stream):
+        stream.command = 'cat {path}'
+        stream.set_queue(offset=5, limit=4, batch_size=3)
+        assert [len(batch) for batch in stream.queue.batches] == [3, 1]
+        assert stream.queue.batches[0][0] == stream.task[5]
+
+    def test_fewer_batches(self, stream):
+        stream.command = 'cat {path}'
+        stream.set_queue(batch_size=10)
+        stream.run_queue()
+        assert stream.cli.returncode == (0, 0)
+        assert stream.streamlet[2]['location'] == []
+
+    def test_failed(self, stream, capsys):
+        stream.command = 'sh -c "exit 3" {path}'
+        stream.set_queue(batch_size=5)
+        stream.run_queue()
+        assert stream.cli.returncode == (3,) * 4
+        assert 'Failed!' in capsys.readouterr().out
+
+    def test_report(self, stream):
+        stream.command = 'cat {path}'
+        stream.set_queue(batch_size=2)
+        stream.run_queue()
+        assert stream.report['n_files'] == 20
+        assert stream.report['n_batches'] == 10
+        assert stream.report['unit'] == 'files'
+        assert stream.report['stream_count'] == 3
+        assert stream.report['autotune'] is False
+        assert stream.report['curve'][-1]['level'] == 3
+        with open(os.path.join(stream.cli.dir, 'report.json')) as f:
+            assert json.load(f)['n_files'] == 20
+
+    def test_autotune(self, stream, capsys):
+        stream.max_stream_count = 8
+        stream.command = 'cat {path}'
+        stream.set_queue(autotune=True)
+        assert stream.queue.batch_size == 1
+        stream.run_queue(autotune=True)
+        assert stream.report['autotune'] is True
+        assert stream.report['max_stream_count'] == 8
+        assert 1 <= stream.report['stream_count'] <= 8
+        assert len(stream.streamlet) == 8
+        assert stream.cli.returncode == (0,) * 20
+        assert sorted(sum((streamlet['location'] for streamlet in stream.streamlet), [])) == \
+            sorted(task['location'] for task in stream.task)
+        assert '{0} streams'.format(stream.report['stream_count']) in capsys.readouterr().out
+
+
+class TestCommitSchedule(object):
+
+    @pytest.fixture()
+    def access(self, stream, mocker):
+        access = RsyncAccess(release='dr17')
+        access.stream = stream
+        mocker.patch.object(access, '_get_stream_command', return_value='cat {path}')
+        mocker.patch.object(access, '_get_sas_module', return_value='sas')
+        yield access
+
+    def test_static_default(self, access, mocker):
+        run_queue = mocker.spy(access.stream, 'run_queue')
+        run_streamlets = mocker.spy(access.stream, 'run_streamlets')
+        access.commit()
+        assert run_queue.call_count == 0
+        assert run_streamlets.call_count == 1
+
+    def test_dynamic(self, access, mocker):
+        run_queue = mocker.spy(access.stream, 'run_queue')
+        access.commit(schedule='dynamic', batch_size=4)
+        assert run_queue.call_count == 1
+        assert access.stream.report['n_batches'] == 5
+
+    def test_autotune_static(self, access):
+        with pytest.raises(AccessError, match='autotune requires the dynamic schedule'):
+            access.commit(autotune=True)